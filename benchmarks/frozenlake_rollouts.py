@@ -0,0 +1,48 @@
+"""
+Random rollouts per second on FrozenLake 8x8 (slippery): one at a time through `step` (as in `MCTS._evaluate`) and in
+batches with `FrozenLakeRolloutEngine`.
+
+Usage: python -m benchmarks.frozenlake_rollouts [time_budget]
+"""
+import sys
+import time
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from src import MCTS
+
+
+def sequential(env, time_budget):
+    planner = MCTS(env, seed=0, adversarial=False, max_depth=100)
+    planner.t = 0
+    rollouts = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < time_budget:
+        checkpoint = env.backup()
+        planner._evaluate()
+        env.load(checkpoint)
+        rollouts += 1
+    return rollouts / time_budget
+
+
+def batched(env, batch_size, time_budget):
+    rollouts = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < time_budget:
+        env.batch_rollout(batch_size, 100)
+        rollouts += batch_size
+    return rollouts / time_budget
+
+
+def main(time_budget=1.0):
+    env = MyFrozenLakeEnv(is_slippery=True, map_name='8x8')
+    env.reset(seed=0)
+    base = sequential(env, time_budget)
+    print(f"{'batch size':<12}{'rollouts/s':>14}{'speedup':>10}")
+    print(f"{'sequential':<12}{base:>14.0f}{1:>10.2f}")
+    for batch_size in (1, 16, 256, 4096):
+        rate = batched(env, batch_size, time_budget)
+        print(f"{batch_size:<12}{rate:>14.0f}{rate / base:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""
+Random moves per second of `TowersOfHanoiEnv` through `step` and through `push`/`pop` (as in the search), and MCTS
+iterations per second, for an increasing number of disks.
+
+Usage: python -m benchmarks.hanoi [time_budget]
+"""
+import random
+import sys
+import time
+
+from envs.hanoi_env import TowersOfHanoiEnv
+from src import MCTS
+
+
+def moves_per_second(num_disks, time_budget, undo):
+    env = TowersOfHanoiEnv(num_disks=num_disks)
+    env.reset()
+    rng = random.Random(0)
+    moves = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < time_budget:
+        # a random walk of at most 100 moves from the initial state
+        depth = 0
+        while depth < 100 and not env.done:
+            if undo:
+                env.push(rng.choice(env.legal_actions))
+            else:
+                env.step(rng.choice(env.legal_actions))
+            depth += 1
+        moves += depth
+        if undo:
+            for _ in range(depth):
+                env.pop()
+        else:
+            env.reset()
+    return moves / time_budget
+
+
+def iterations_per_second(num_disks, time_budget):
+    env = TowersOfHanoiEnv(num_disks=num_disks)
+    env.reset()
+    planner = MCTS(env, seed=0, adversarial=False, gamma=0.95, keep_subtree=False, max_depth=200)
+    planner._search(float('inf'), time_budget)
+    return planner.tree.root.visits / time_budget
+
+
+def main(time_budget=1.0):
+    print(f"{'disks':<8}{'step/s':>12}{'push/s':>12}{'iterations/s':>14}")
+    for num_disks in (3, 6, 10, 16):
+        step = moves_per_second(num_disks, time_budget, False)
+        push = moves_per_second(num_disks, time_budget, True)
+        iterations = iterations_per_second(num_disks, time_budget)
+        print(f"{num_disks:<8}{step:>12.0f}{push:>12.0f}{iterations:>14.0f}")
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,40 @@
+"""
+Memory-capped search (`max_nodes`): size and traced memory of the tree, and speed of the search from the empty
+TicTacToe board, with and without a cap.
+
+Usage: python -m benchmarks.memory_cap [iterations]
+"""
+import sys
+import time
+import tracemalloc
+
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+
+
+def measure(max_nodes, pruning, iterations):
+    env = TicTacToeEnv()
+    env.reset(human_first=False)
+
+    tracemalloc.start()
+    agent = MCTS(env, seed=0, max_nodes=max_nodes, pruning=pruning)
+    start = time.perf_counter()
+    agent._search(iterations, float('inf'))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(agent.tree), current, peak, iterations / elapsed
+
+
+def main(iterations=20000):
+    print(f"{'max_nodes':>10}  {'pruning':<15}{'nodes':>8}{'bytes':>12}{'peak':>12}{'it/s':>10}")
+    for max_nodes, pruning in ((None, 'least_visited'),
+                               (5000, 'least_visited'), (5000, 'lowest_value'),
+                               (1000, 'least_visited'), (1000, 'lowest_value')):
+        n_nodes, current, peak, speed = measure(max_nodes, pruning, iterations)
+        print(f"{str(max_nodes):>10}  {pruning:<15}{n_nodes:>8}{current:>12}{peak:>12}{speed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,80 @@
+"""
+Allocation micro-benchmark for the tree nodes: memory, live allocated blocks and time per node while searching
+TicTacToe (`MCTS`) and slippery FrozenLake 8x8 (`ChanceMCTS`) with the object backend.
+
+Usage: python -m benchmarks.node_alloc [tictactoe_iterations] [frozenlake_iterations]
+"""
+import sys
+import time
+import tracemalloc
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS, Node
+from src.ai.chance_mcts import ChanceMCTS
+
+
+def tictactoe_agent():
+    env = TicTacToeEnv()
+    env.reset(human_first=False)
+    return MCTS(env, seed=0)
+
+
+def frozenlake_agent():
+    env = MyFrozenLakeEnv(is_slippery=True, map_name='8x8')
+    env.reset(seed=0)
+    return ChanceMCTS(env, seed=0, max_depth=200)
+
+
+def measure(build_agent, iterations):
+    agent = build_agent()
+
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        agent._plan_iteration()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+
+    return len(agent.tree), current, blocks, elapsed
+
+
+def measure_leaves(n_nodes, n_actions=9):
+    """
+    Memory of `n_nodes` bare leaves (no game data), i.e. the overhead of the node itself.
+    """
+    legal_actions = [list(range(n_actions)) for _ in range(n_nodes)]
+    root = Node(None, 0, list(range(n_nodes)), None, None)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    nodes = [Node(root, i + 1, legal_actions[i], None, i) for i in range(n_nodes)]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(nodes) == n_nodes
+    return current, elapsed
+
+
+def main(tictactoe_iterations=5000, frozenlake_iterations=600):
+    print(f"{'search':<12}{'nodes':>8}{'bytes/node':>12}{'blocks/node':>13}{'us/iter':>10}")
+    searches = (
+        ('tictactoe', tictactoe_agent, tictactoe_iterations),
+        ('frozenlake', frozenlake_agent, frozenlake_iterations),
+    )
+    for name, build_agent, iterations in searches:
+        n_nodes, current, blocks, elapsed = measure(build_agent, iterations)
+        print(f"{name:<12}{n_nodes:>8}{current / n_nodes:>12.1f}{blocks / n_nodes:>13.2f}"
+              f"{1e6 * elapsed / iterations:>10.1f}")
+
+    n_nodes = 100000
+    current, elapsed = measure_leaves(n_nodes)
+    print(f"\n{n_nodes} bare leaves: {current / n_nodes:.1f} bytes/node, {1e9 * elapsed / n_nodes:.0f} ns/node")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
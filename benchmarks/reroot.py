@@ -0,0 +1,37 @@
+"""
+Cost of re-rooting the object tree after a search from the empty TicTacToe board: `keep_subtree` itself, and the
+deferred reclamation of the discarded nodes (which `keep_subtree` used to do eagerly).
+
+Usage: python -m benchmarks.reroot [iterations]
+"""
+import sys
+import time
+
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+
+
+def main(iterations=50000):
+    env = TicTacToeEnv()
+    env.reset(human_first=False)
+    agent = MCTS(env, seed=0)
+    agent._search(iterations, float('inf'))
+    tree = agent.tree
+    n_nodes = len(tree)
+
+    start = time.perf_counter()
+    tree.keep_subtree(agent.root_best_child())
+    reroot = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_reclaimed = tree.reclaim()
+    reclaim = time.perf_counter() - start
+
+    print(f"nodes:        {n_nodes}")
+    print(f"kept:         {len(tree)}")
+    print(f"keep_subtree: {reroot * 1e6:.1f} us")
+    print(f"reclaim:      {reclaim * 1e3:.1f} ms ({n_reclaimed} nodes)")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
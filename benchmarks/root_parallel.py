@@ -0,0 +1,57 @@
+"""
+Scaling of root-parallel planning: iterations per second of `MCTS.plan` with a fixed time budget, from 1 to N worker
+processes, on the opening position of tic-tac-toe and on FrozenLake 8x8 (with `ChanceMCTS`).
+
+NB: the worker processes are created on the first call to `plan`, so a warm-up call is excluded from the timings.
+
+Usage: python -m benchmarks.root_parallel [max_workers] [time_budget]
+"""
+import os
+import sys
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+
+
+def tictactoe():
+    env = TicTacToeEnv()
+    env.reset(human_first=False, seed=0)
+    return env, MCTS, {}
+
+
+def frozenlake():
+    env = MyFrozenLakeEnv(is_slippery=True, map_name='8x8')
+    env.reset(seed=0)
+    return env, ChanceMCTS, {'max_depth': 100}
+
+
+def root_visits(planner, time_budget):
+    # total number of iterations (= root visits) run by the workers in `time_budget` seconds
+    if planner._n_workers == 1:
+        planner._search(float('inf'), time_budget)
+        iterations = sum(visits for visits, _ in planner.root_statistics().values())
+        planner._reset()
+        return iterations
+    seeds = list(range(planner._n_workers))
+    statistics = planner._parallel_search.run(planner.transition_model.backup(), float('inf'), time_budget, seeds)
+    return sum(visits for visits, _ in statistics.values())
+
+
+def main(max_workers=os.cpu_count(), time_budget=1.0):
+    print(f"{os.cpu_count()} CPUs available")
+    print(f"{'env':<12}{'workers':>8}{'iterations/s':>14}{'scaling':>10}")
+    for name, make in (('tictactoe', tictactoe), ('frozenlake', frozenlake)):
+        base = None
+        for n_workers in range(1, max_workers + 1):
+            env, planner_class, kwargs = make()
+            with planner_class(env, seed=0, keep_subtree=False, n_workers=n_workers, **kwargs) as planner:
+                planner.plan(iterations_budget=50 * n_workers)
+                rate = root_visits(planner, time_budget) / time_budget
+            base = base or rate
+            print(f"{name:<12}{n_workers:>8}{rate:>14.0f}{rate / base:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*(f(a) for f, a in zip((int, float), sys.argv[1:])))
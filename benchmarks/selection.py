@@ -0,0 +1,43 @@
+"""
+Cost of one selection step: the scalar `MCTS.select_ucb` against `VectorizedUCB`, on a node with k visited children,
+for both tree backends.
+
+Usage: python -m benchmarks.selection [repeats]
+"""
+import random
+import sys
+import timeit
+
+from src import MCTS, Tree
+from src.ai.selection import VectorizedUCB
+from src.tree.array_tree import ArrayTree
+
+
+def build_node(backend, k):
+    tree = backend(list(range(k)), {'done': False, 'reward': 0, 'player': 'Agent'})
+    rng = random.Random(0)
+    total = 0
+    for action in range(k):
+        child = tree.insert_node(tree.root.id, action, [], {'done': False, 'reward': 0, 'player': 'Human'})
+        visits = rng.randint(1, 100)
+        child.visit(visits)
+        child.update_score(rng.uniform(-visits, visits))
+        total += visits
+    tree.root.visit(total)
+    return tree.root
+
+
+def main(repeats=2000):
+    vectorized_ucb = VectorizedUCB()
+    print(f"{'backend':<10}{'children':>10}{'select_ucb (us)':>18}{'vectorized (us)':>18}{'speedup':>10}")
+    for name, backend in (('object', Tree), ('array', ArrayTree)):
+        for k in (4, 9, 64, 512):
+            node = build_node(backend, k)
+            assert MCTS.select_ucb(node) == vectorized_ucb(node)
+            scalar = min(timeit.repeat(lambda: MCTS.select_ucb(node), number=repeats, repeat=3)) / repeats
+            vector = min(timeit.repeat(lambda: vectorized_ucb(node), number=repeats, repeat=3)) / repeats
+            print(f"{name:<10}{k:>10}{1e6 * scalar:>18.2f}{1e6 * vector:>18.2f}{scalar / vector:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""
+Load test of the planning server (`src.server`): concurrent clients, each with its own TicTacToe session, play games
+against the planner (a random move, then a plan request with a fixed iterations budget) and the latency of every
+request is recorded.
+
+Usage: python -m benchmarks.server_load [clients] [requests per client] [workers] [iterations budget]
+"""
+import asyncio
+import random
+import sys
+import time
+
+import numpy as np
+
+from src.server import PlanningServer, PlanningClient
+
+
+async def play(client, n_requests, iterations_budget, latencies, rng):
+    session = None
+    legal_actions, done = [], True
+    for _ in range(n_requests):
+        if done:
+            if session is not None:
+                await client.request(op='close', session=session)
+            response = await client.request(op='new', game='tictactoe', options={'human_first': True})
+            session, legal_actions = response['session'], response['legal_actions']
+            response = {'done': False}
+        else:
+            start = time.perf_counter()
+            response = await client.request(op='move', session=session, action=rng.choice(legal_actions))
+            latencies.append(time.perf_counter() - start)
+        if not response['done']:
+            start = time.perf_counter()
+            response = await client.request(op='plan', session=session, iterations_budget=iterations_budget)
+            latencies.append(time.perf_counter() - start)
+        legal_actions, done = response['legal_actions'], response['done']
+
+
+async def run(n_clients, n_requests, n_workers, iterations_budget):
+    server = PlanningServer(port=0, n_workers=n_workers)
+    await server.start()
+    clients = [await PlanningClient.connect(server.host, server.port) for _ in range(n_clients)]
+    latencies = []
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(play(client, n_requests, iterations_budget, latencies, random.Random(i))
+                               for i, client in enumerate(clients)))
+        elapsed = time.perf_counter() - start
+    finally:
+        for client in clients:
+            await client.close()
+        await server.close()
+    return latencies, elapsed
+
+
+def main(n_clients=16, n_requests=20, n_workers=1, iterations_budget=100):
+    latencies, elapsed = asyncio.run(run(n_clients, n_requests, n_workers, iterations_budget))
+    latencies = np.array(latencies) * 1e3
+    print(f"clients: {n_clients}, workers: {n_workers}, iterations per plan: {iterations_budget}")
+    print(f"requests:     {len(latencies)} in {elapsed:.2f} s ({len(latencies) / elapsed:.1f} requests/s)")
+    print(f"latency p50:  {np.percentile(latencies, 50):.1f} ms")
+    print(f"latency p99:  {np.percentile(latencies, 99):.1f} ms")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
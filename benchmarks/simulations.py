@@ -0,0 +1,32 @@
+"""
+Rollouts per second of `MCTS.plan` with a fixed time budget, for different numbers of rollouts per expanded node
+(`n_simulations`): the higher it is, the less time goes in the tree phases (selection, expansion, backpropagation) per
+rollout.
+
+Usage: python -m benchmarks.simulations [time_budget]
+"""
+import sys
+
+from benchmarks.root_parallel import tictactoe, frozenlake
+
+
+def rollouts_per_second(make, n_simulations, time_budget):
+    env, planner_class, kwargs = make()
+    planner = planner_class(env, seed=0, keep_subtree=False, n_simulations=n_simulations, **kwargs)
+    planner._search(float('inf'), time_budget)
+    # every iteration visits the root `n_simulations` times
+    return planner.tree.root.visits / time_budget
+
+
+def main(time_budget=1.0):
+    print(f"{'env':<12}{'n_simulations':>14}{'rollouts/s':>12}{'speedup':>10}")
+    for name, make in (('tictactoe', tictactoe), ('frozenlake', frozenlake)):
+        base = None
+        for n_simulations in (1, 4, 16, 64):
+            rate = rollouts_per_second(make, n_simulations, time_budget)
+            base = base or rate
+            print(f"{name:<12}{n_simulations:>14}{rate:>12.0f}{rate / base:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,203 @@
+"""
+Throughput benchmark suite: fixed-seed searches of `MCTS` and `ChanceMCTS` on every environment, from the initial
+state and without re-rooting, so that the same code always does the same work.
+
+For each case it reports:
+- iterations/s, rollout steps/s (the environment steps of the simulations) and nodes/s, the best of `--repeat` runs
+- the peak traced memory and the bytes per node of the tree, measured with `tracemalloc` in a separate run (which
+  would slow down the timed ones)
+
+The results can be saved as JSON (`--output`) and compared with a previous run (`--baseline`): a throughput lower
+than the baseline, or a memory usage higher than the baseline, by more than `--tolerance` is flagged as a regression
+(and the exit code is 1).
+
+Usage: python -m benchmarks.suite [--iterations N] [--repeat R] [--cases NAME ...] [--output FILE]
+                                  [--baseline FILE] [--tolerance T]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.hanoi_env import TowersOfHanoiEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+
+
+def tictactoe():
+    env = TicTacToeEnv()
+    env.reset(human_first=False, seed=0)
+    return MCTS(env, seed=0, keep_subtree=False)
+
+
+def hanoi():
+    env = TowersOfHanoiEnv(num_disks=4)
+    env.reset()
+    return MCTS(env, seed=0, adversarial=False, gamma=0.95, max_depth=100, keep_subtree=False)
+
+
+def frozenlake(map_name, is_slippery):
+    def build():
+        env = MyFrozenLakeEnv(is_slippery=is_slippery, map_name=map_name)
+        env.reset(seed=0)
+        return ChanceMCTS(env, seed=0, max_depth=200, keep_subtree=False)
+    return build
+
+
+# name -> function that builds the planner
+CASES = {
+    'tictactoe': tictactoe,
+    'hanoi4': hanoi,
+    'frozenlake4x4': frozenlake('4x4', False),
+    'frozenlake4x4-slippery': frozenlake('4x4', True),
+    'frozenlake8x8': frozenlake('8x8', False),
+    'frozenlake8x8-slippery': frozenlake('8x8', True),
+}
+
+# metric -> True if higher is better
+METRICS = {
+    'iterations_per_second': True,
+    'rollout_steps_per_second': True,
+    'nodes_per_second': True,
+    'peak_bytes': False,
+    'bytes_per_node': False,
+}
+
+
+def _count_rollout_steps(planner):
+    """
+    Wraps the simulations of `planner` to count their steps (each one increments `planner.t`).
+
+    :return: a dict whose 'steps' are updated by the simulations
+    """
+    counter = {'steps': 0}
+    evaluate = planner._evaluate
+
+    def counting_evaluate():
+        t = planner.t
+        ret = evaluate()
+        counter['steps'] += planner.t - t
+        return ret
+
+    planner._evaluate = counting_evaluate
+    return counter
+
+
+def run_case(build, iterations, repeat):
+    """
+    :return: a dict with the metrics of a case
+    """
+    best = None
+    for _ in range(repeat):
+        planner = build()
+        counter = _count_rollout_steps(planner)
+        start = time.perf_counter()
+        planner._search(iterations, float('inf'))
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = elapsed, counter['steps'], len(planner.tree)
+    elapsed, steps, n_nodes = best
+
+    tracemalloc.start()
+    planner = build()
+    planner._search(iterations, float('inf'))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'nodes': n_nodes,
+        'iterations_per_second': iterations / elapsed,
+        'rollout_steps_per_second': steps / elapsed,
+        'nodes_per_second': n_nodes / elapsed,
+        'peak_bytes': peak,
+        'bytes_per_node': current / n_nodes,
+    }
+
+
+def run(cases=None, iterations=2000, repeat=3):
+    """
+    :return: the results of the suite, as saved by `--output`
+    """
+    cases = list(CASES) if cases is None else cases
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'iterations': iterations,
+            'repeat': repeat,
+        },
+        'results': {name: run_case(CASES[name], iterations, repeat) for name in cases},
+    }
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compares the results of two runs of the suite, on the cases and the metrics they have in common.
+
+    :return: a list of (case, metric, value, baseline value, ratio, regression) tuples
+    """
+    rows = []
+    for name, metrics in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            value, reference = metrics[metric], baseline['results'][name][metric]
+            ratio = value / reference if reference else float('inf')
+            if higher_is_better:
+                regression = ratio < 1 - tolerance
+            else:
+                regression = ratio > 1 + tolerance
+            rows.append((name, metric, value, reference, ratio, regression))
+    return rows
+
+
+def print_results(results):
+    print(f"{'case':<24}{'it/s':>10}{'steps/s':>12}{'nodes/s':>10}{'peak':>12}{'bytes/node':>12}")
+    for name, m in results['results'].items():
+        print(f"{name:<24}{m['iterations_per_second']:>10.0f}{m['rollout_steps_per_second']:>12.0f}"
+              f"{m['nodes_per_second']:>10.0f}{m['peak_bytes']:>12}{m['bytes_per_node']:>12.1f}")
+
+
+def print_comparison(rows):
+    print(f"{'case':<24}{'metric':<26}{'value':>12}{'baseline':>12}{'ratio':>8}")
+    for name, metric, value, reference, ratio, regression in rows:
+        flag = '  REGRESSION' if regression else ''
+        print(f"{name:<24}{metric:<26}{value:>12.1f}{reference:>12.1f}{ratio:>8.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=2000, help="iterations of each search")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs of each case (the best one is kept)")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), help="the cases to run (default: all)")
+    parser.add_argument('--output', help="save the results to this JSON file")
+    parser.add_argument('--baseline', help="compare the results with this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, args.iterations, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance)
+        print()
+        print_comparison(rows)
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Random rollouts per second from the empty board for `TicTacToeEnv` and `BitboardTicTacToeEnv`, and iterations per
+second of `MCTS` on each of them.
+
+Usage: python -m benchmarks.tictactoe [time_budget]
+"""
+import random
+import sys
+import time
+
+from envs.bitboard_tictactoe_env import BitboardTicTacToeEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+
+
+def rollouts_per_second(env, time_budget):
+    rng = random.Random(0)
+    rollouts = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < time_budget:
+        env.reset(human_first=True)
+        done = False
+        while not done:
+            _, _, done, _, _ = env.step(rng.choice(env.legal_actions))
+        rollouts += 1
+    return rollouts / time_budget
+
+
+def iterations_per_second(env, time_budget):
+    env.reset(human_first=False, seed=0)
+    planner = MCTS(env, seed=0, keep_subtree=False)
+    planner._search(float('inf'), time_budget)
+    return planner.tree.root.visits / time_budget
+
+
+def main(time_budget=1.0):
+    print(f"{'':<14}{'TicTacToeEnv':>14}{'Bitboard':>14}{'speedup':>10}")
+    for name, measure in (('rollouts/s', rollouts_per_second), ('iterations/s', iterations_per_second)):
+        base = measure(TicTacToeEnv(), time_budget)
+        bitboard = measure(BitboardTicTacToeEnv(), time_budget)
+        print(f"{name:<14}{base:>14.0f}{bitboard:>14.0f}{bitboard / base:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
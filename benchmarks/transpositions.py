@@ -0,0 +1,77 @@
+"""
+Effect of transpositions (`tree_backend='transposition'`) on the search:
+- number of nodes after a number of iterations, from the empty tic-tac-toe board and from the initial state of Hanoi
+- iterations needed to find the right move in two tic-tac-toe positions, i.e. the smallest budget (doubling from 16)
+  for which the planner chooses it with every seed
+
+Usage: python -m benchmarks.transpositions [n_seeds]
+"""
+import sys
+
+from envs.hanoi_env import TowersOfHanoiEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+
+BACKENDS = ('object', 'transposition')
+
+# moves from the empty board (human first) and the right answers of the agent
+POSITIONS = {
+    'block': ((0, 4, 2), {1}),
+    'win': ((0, 2, 1, 5, 3), {8}),
+    # opposite corners: only an edge avoids the fork
+    'avoid fork': ((0, 4, 8), {1, 3, 5, 7}),
+}
+
+
+def tictactoe(moves=(), seed=0):
+    env = TicTacToeEnv()
+    env.reset(human_first=True, seed=seed)
+    for action in moves:
+        env.step(action)
+    return env, {}
+
+
+def hanoi(seed=0):
+    env = TowersOfHanoiEnv(num_disks=5)
+    env.reset()
+    return env, {'adversarial': False, 'gamma': 0.95, 'max_depth': 100}
+
+
+def node_counts(make, iterations):
+    counts = []
+    for backend in BACKENDS:
+        env, kwargs = make()
+        planner = MCTS(env, seed=0, tree_backend=backend, **kwargs)
+        for _ in range(iterations):
+            planner._plan_iteration()
+        counts.append(len(planner.tree))
+    return counts
+
+
+def iterations_to_solve(moves, answers, backend, n_seeds):
+    budget = 16
+    while True:
+        for seed in range(n_seeds):
+            env, _ = tictactoe(moves, seed)
+            if MCTS(env, seed=seed, tree_backend=backend).plan(iterations_budget=budget) not in answers:
+                break
+        else:
+            return budget
+        budget *= 2
+
+
+def main(n_seeds=10):
+    print(f"{'nodes':<24}{'object':>14}{'transposition':>14}")
+    for name, make in (('tictactoe', tictactoe), ('hanoi', hanoi)):
+        for iterations in (1000, 5000):
+            counts = node_counts(make, iterations)
+            print(f"{f'{name}, {iterations} it.':<24}{counts[0]:>14}{counts[1]:>14}")
+
+    print(f"{'iterations to solve':<24}{'object':>14}{'transposition':>14}")
+    for name, (moves, answers) in POSITIONS.items():
+        budgets = [iterations_to_solve(moves, answers, backend, n_seeds) for backend in BACKENDS]
+        print(f"{name:<24}{budgets[0]:>14}{budgets[1]:>14}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,37 @@
+"""
+Memory per node of the tree backends of `MCTS`, measured with `tracemalloc` while searching TicTacToe from the empty
+board.
+
+Usage: python -m benchmarks.tree_memory [iterations]
+"""
+import sys
+import tracemalloc
+
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+
+
+def measure(backend, iterations):
+    env = TicTacToeEnv()
+    env.reset(human_first=False)
+
+    tracemalloc.start()
+    agent = MCTS(env, seed=0, tree_backend=backend)
+    for _ in range(iterations):
+        agent._plan_iteration()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n_nodes = len(agent.tree)
+    return n_nodes, current, peak
+
+
+def main(iterations=20000):
+    print(f"{'backend':<10}{'nodes':>10}{'bytes':>14}{'bytes/node':>14}{'peak':>14}")
+    for backend in ('object', 'array'):
+        n_nodes, current, peak = measure(backend, iterations)
+        print(f"{backend:<10}{n_nodes:>10}{current:>14}{current / n_nodes:>14.1f}{peak:>14}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,43 @@
+"""
+Scaling of tree-parallel planning: iterations per second with a fixed time budget, for the sequential planner and for
+1 to N worker threads sharing the tree, on the opening position of tic-tac-toe and on FrozenLake 8x8 (with
+`ChanceMCTS`).
+
+NB: with the GIL the simulations of the threads do not run in parallel, a speedup needs a free-threaded interpreter.
+
+Usage: python -m benchmarks.tree_parallel [max_workers] [time_budget]
+"""
+import os
+import sys
+import sysconfig
+
+from benchmarks.root_parallel import tictactoe, frozenlake
+from src.ai.parallel import TreeParallelSearch
+
+
+def iterations_per_second(make, n_workers, time_budget):
+    # n_workers=0 is the sequential planner
+    env, planner_class, kwargs = make()
+    planner = planner_class(env, seed=0, keep_subtree=False, **kwargs)
+    if n_workers == 0:
+        planner._search(float('inf'), time_budget)
+    else:
+        TreeParallelSearch(planner, n_workers).run(float('inf'), time_budget)
+    # every iteration visits the root once
+    return planner.tree.root.visits / time_budget
+
+
+def main(max_workers=os.cpu_count(), time_budget=1.0):
+    free_threaded = bool(sysconfig.get_config_var('Py_GIL_DISABLED'))
+    print(f"{os.cpu_count()} CPUs available, free-threaded interpreter: {free_threaded}")
+    print(f"{'env':<12}{'workers':>10}{'iterations/s':>14}{'scaling':>10}")
+    for name, make in (('tictactoe', tictactoe), ('frozenlake', frozenlake)):
+        sequential = iterations_per_second(make, 0, time_budget)
+        print(f"{name:<12}{'sequential':>10}{sequential:>14.0f}{1:>10.2f}")
+        for n_workers in range(1, max_workers + 1):
+            rate = iterations_per_second(make, n_workers, time_budget)
+            print(f"{name:<12}{n_workers:>10}{rate:>14.0f}{rate / sequential:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*(f(a) for f, a in zip((int, float), sys.argv[1:])))
@@ -0,0 +1,37 @@
+"""
+Iterations per second of the search when the moves are undone with `push`/`pop` and when the state is saved and
+restored with `backup`/`load` at every iteration, for the bundled environments.
+
+Usage: python -m benchmarks.undo [time_budget]
+"""
+import sys
+
+from benchmarks.root_parallel import tictactoe, frozenlake
+from envs.hanoi_env import TowersOfHanoiEnv
+from src import MCTS
+
+
+def hanoi():
+    env = TowersOfHanoiEnv(num_disks=6)
+    env.reset()
+    return env, MCTS, {'adversarial': False, 'gamma': 0.95, 'max_depth': 200}
+
+
+def iterations_per_second(make, undo, time_budget):
+    env, planner_class, kwargs = make()
+    planner = planner_class(env, seed=0, keep_subtree=False, **kwargs)
+    planner._undo = undo
+    planner._search(float('inf'), time_budget)
+    return planner.tree.root.visits / time_budget
+
+
+def main(time_budget=1.0):
+    print(f"{'env':<12}{'backup/load':>14}{'push/pop':>12}{'speedup':>10}")
+    for name, make in (('tictactoe', tictactoe), ('hanoi', hanoi), ('frozenlake', frozenlake)):
+        backup = iterations_per_second(make, False, time_budget)
+        undo = iterations_per_second(make, True, time_budget)
+        print(f"{name:<12}{backup:>14.0f}{undo:>12.0f}{undo / backup:>10.2f}")
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""
+Leaf value cache (`value_cache_size`): speed of the search and counters of the cache on small state spaces, with
+caches of different sizes.
+
+Usage: python -m benchmarks.value_cache [iterations]
+"""
+import sys
+import time
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.hanoi_env import TowersOfHanoiEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+
+GAMES = {
+    'frozenlake4x4': (lambda: MyFrozenLakeEnv(is_slippery=True, map_name='4x4'), ChanceMCTS),
+    'hanoi3': (lambda: TowersOfHanoiEnv(num_disks=3), MCTS),
+}
+
+
+def measure(game, size, iterations):
+    make_env, planner_class = GAMES[game]
+    env = make_env()
+    env.reset(seed=0)
+    agent = planner_class(env, seed=0, adversarial=False, max_depth=100, value_cache_size=size)
+
+    start = time.perf_counter()
+    agent._search(iterations, float('inf'))
+    elapsed = time.perf_counter() - start
+
+    statistics = agent.value_cache.statistics() if agent.value_cache is not None else {}
+    return iterations / elapsed, statistics
+
+
+def main(iterations=5000):
+    print(f"{'game':<15}{'size':>6}{'it/s':>10}{'hit rate':>10}{'truncations':>13}{'evictions':>11}")
+    for game in GAMES:
+        for size in (None, 8, 1000):
+            speed, statistics = measure(game, size, iterations)
+            print(f"{game:<15}{str(size):>6}{speed:>10.0f}{statistics.get('hit_rate', 0.):>10.2f}"
+                  f"{statistics.get('truncations', 0):>13}{statistics.get('evictions', 0):>11}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -2,6 +2,13 @@ from abc import ABC, abstractmethod
 
 
 class BaseEnv(ABC):
+    # set to True by the environments that implement `batch_rollout`
+    supports_batch_rollout = False
+    # set to True by the environments that implement `push` and `pop`
+    supports_undo = False
+    # set to True by the environments that implement `state_hash`
+    supports_state_hash = False
+
     @property
     @abstractmethod
     def legal_actions(self):
@@ -38,6 +45,35 @@ class BaseEnv(ABC):
     def load(self, checkpoint):
         pass
 
+    def node_data(self):
+        """
+        The data stored in the nodes of the search tree. By default it's a whole `backup()`, but only the metadata
+        used by MCTS (done, reward, player) is needed, plus 'state' and 't' for `ChanceMCTS`, which hashes them.
+        """
+        return self.backup()
+
+    def state_hash(self):
+        """
+        Optional. A hash of the current state, such that different sequences of moves that reach the same state get
+        the same hash (see `src.tree.transposition_tree`). The environments that implement it also add it to their
+        `node_data()`, under the key 'hash'.
+        """
+        raise NotImplementedError
+
+    def push(self, action):
+        """
+        Optional. Same as `step`, but the move can be undone with `pop`. This is cheaper than a `backup()` before the
+        move and a `load()` after it, which copy the whole state. The observation may be a cheaper (hashable) encoding
+        of the state than the one returned by `step`.
+        """
+        raise NotImplementedError
+
+    def pop(self):
+        """
+        Optional. Undoes the last move done with `push`.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def game_result(self):
         pass
@@ -52,4 +88,14 @@ class BaseEnv(ABC):
         action. However, since in both cases we need to store an additional piece of information, it's more convenient
         to just store the reward.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def batch_rollout(self, n, max_depth, rng=None):
+        """
+        Optional. Runs `n` random rollouts from the current state, without changing it, and returns an array with
+        their returns. A rollout that reaches `max_depth` (on the step counter `t`) without terminating returns 0, see
+        `MCTS._evaluate`.
+
+        :param rng: the `np.random.Generator` of the rollouts (the one of the environment if None)
+        """
+        raise NotImplementedError
@@ -0,0 +1,216 @@
+from gymnasium import spaces, Env
+
+from .base_env import BaseEnv
+from .tictactoe_env import TicTacToeEnv, ZOBRIST_CELLS, ZOBRIST_HUMAN_TO_MOVE
+
+# the 8 lines of the board, as 9-bit masks (bit i is cell i, row by row)
+_LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # columns
+    (0, 4, 8), (2, 4, 6),  # diagonals
+)
+WIN_MASKS = tuple(sum(1 << i for i in line) for line in _LINES)
+FULL_MASK = (1 << 9) - 1
+
+# NB: there are only 2^9 masks per player, hence all the answers are precomputed
+_WON = tuple(any(mask & w == w for w in WIN_MASKS) for mask in range(FULL_MASK + 1))
+_CELLS = tuple(tuple(i for i in range(9) if mask >> i & 1) for mask in range(FULL_MASK + 1))
+
+
+class BitboardTicTacToeEnv(BaseEnv, Env):
+    """
+    Same game (and same interface) as `TicTacToeEnv`, but the board is stored as two 9-bit masks, one per player, so
+    that checking for a win or listing the legal moves is a table lookup.
+    """
+    supports_undo = True
+    supports_state_hash = True
+    metadata = {'render.modes': ['human']}
+    _agent_mark = TicTacToeEnv._agent_mark
+    _human_mark = TicTacToeEnv._human_mark
+    _size = 9
+    _board_size = 3
+
+    next_mark = staticmethod(TicTacToeEnv.next_mark)
+
+    @property
+    def adversarial(self):
+        return True
+
+    def __init__(self):
+        super(BitboardTicTacToeEnv, self).__init__()
+        self.action_space = spaces.Discrete(self._size)
+        self.observation_space = spaces.Discrete(self._size)
+
+        # the cells taken by the agent and by the human
+        self._agent = 0
+        self._human = 0
+        self._reward = 0
+        self.done = False
+        self._la = None
+        self.mark = None
+        self.t = 0
+        # see `push`
+        self._undo_stack = []
+        # see `state_hash`
+        self._hash = 0
+
+    def __str__(self):
+        return TicTacToeEnv.__str__(self)
+
+    @property
+    def board(self):
+        board = [0] * self._size
+        for i in _CELLS[self._agent]:
+            board[i] = self._agent_mark
+        for i in _CELLS[self._human]:
+            board[i] = self._human_mark
+        return board
+
+    @property
+    def _last_action(self):
+        return self._la
+
+    @property
+    def observation(self):
+        return tuple(self.board), self.mark
+
+    @property
+    def legal_actions(self):
+        return list(_CELLS[FULL_MASK & ~(self._agent | self._human)])
+
+    def reset(self, **kwargs):
+        if 'seed' in kwargs:
+            super(BitboardTicTacToeEnv, self).reset(seed=kwargs['seed'])
+        assert 'human_first' in kwargs
+        human_first = kwargs['human_first']
+
+        self._agent = 0
+        self._human = 0
+        self._reward = 0
+        self.done = False
+        self._la = None
+        self.t = 0
+        self._undo_stack = []
+
+        if human_first:
+            self.mark = self._human_mark
+        else:
+            self.mark = self._agent_mark
+        self._hash = self._compute_hash()
+
+        return self.observation
+
+    def reward(self):
+        return self._reward
+
+    def step(self, action, human=False):
+        # NB: `self.action_space.contains` would cost more than the whole move
+        assert 0 <= action < self._size
+        self._la = action
+
+        assert not self.done
+
+        # place piece on the board
+        bit = 1 << action
+        assert not (self._agent | self._human) & bit
+        if self.mark == self._agent_mark:
+            self._agent |= bit
+            self._reward = 1 if _WON[self._agent] else 0
+            self._hash ^= ZOBRIST_CELLS[action][0] ^ ZOBRIST_HUMAN_TO_MOVE
+        else:
+            self._human |= bit
+            self._reward = -1 if _WON[self._human] else 0
+            self._hash ^= ZOBRIST_CELLS[action][1] ^ ZOBRIST_HUMAN_TO_MOVE
+
+        self.t += 1
+
+        if self._reward != 0 or self.draw():
+            self.done = True
+
+        self.mark = self.next_mark(self.mark)
+        return self.observation, self._reward, self.done, None, {}
+
+    def push(self, action):
+        self._undo_stack.append((self._la, self.done, self._reward))
+        return self.step(action)
+
+    def pop(self):
+        # NB: the undone action is the last one, and the mark goes back to the player who played it
+        self.mark = self.next_mark(self.mark)
+        if self.mark == self._agent_mark:
+            self._agent &= ~(1 << self._la)
+            self._hash ^= ZOBRIST_CELLS[self._la][0] ^ ZOBRIST_HUMAN_TO_MOVE
+        else:
+            self._human &= ~(1 << self._la)
+            self._hash ^= ZOBRIST_CELLS[self._la][1] ^ ZOBRIST_HUMAN_TO_MOVE
+        self.t -= 1
+        self._la, self.done, self._reward = self._undo_stack.pop()
+
+    def _compute_hash(self):
+        h = ZOBRIST_HUMAN_TO_MOVE if self.mark == self._human_mark else 0
+        for i in _CELLS[self._agent]:
+            h ^= ZOBRIST_CELLS[i][0]
+        for i in _CELLS[self._human]:
+            h ^= ZOBRIST_CELLS[i][1]
+        return h
+
+    def state_hash(self):
+        # NB: same Zobrist keys as `TicTacToeEnv`, hence the same hashes
+        return self._hash
+
+    def render(self, mode='human', close=False):
+        if close:
+            return
+        if mode == 'human':
+            print(self)
+        else:
+            raise RuntimeError
+
+    def backup(self):
+        # see `TicTacToeEnv.backup`. The masks are integers, hence there is nothing to copy
+        return {
+            'agent': self._agent,
+            'human': self._human,
+            'mark': self.mark,
+            'done': self.done,
+            'last_action': self._last_action,
+            'reward': self._reward,
+            'player': 'Human' if self.mark == self._human_mark else 'Agent',
+            't': self.t
+        }
+
+    def load(self, checkpoint):
+        try:
+            self._agent = checkpoint['agent']
+            self._human = checkpoint['human']
+            self.mark = checkpoint['mark']
+            self.done = checkpoint['done']
+            self._la = checkpoint['last_action']
+            self._reward = checkpoint['reward']
+            self.t = checkpoint['t']
+        except KeyError:
+            return False
+        self._undo_stack = []
+        self._hash = self._compute_hash()
+        return True
+
+    def node_data(self):
+        return {
+            'done': self.done,
+            'reward': self._reward,
+            'player': 'Human' if self.mark == self._human_mark else 'Agent',
+            't': self.t,
+            'hash': self._hash
+        }
+
+    def draw(self):
+        return self._agent | self._human == FULL_MASK
+
+    def game_result(self):
+        if self.done:
+            if self.draw():
+                return "Draw"
+            else:
+                return f"{self.next_mark(self.mark)} won"
+        else:
+            return "Game still running"
@@ -3,6 +3,7 @@ from copy import deepcopy
 from gymnasium.envs.toy_text import FrozenLakeEnv
 
 from envs.base_env import BaseEnv
+from envs.frozenlake_rollouts import FrozenLakeRolloutEngine
 LEFT = 0
 DOWN = 1
 RIGHT = 2
@@ -10,6 +11,10 @@ UP = 3
 
 
 class MyFrozenLakeEnv(BaseEnv, FrozenLakeEnv):
+    supports_undo = True
+    supports_batch_rollout = True
+    supports_state_hash = True
+
     def __init__(self, *args, p=1/3, **kwargs):
         super().__init__(*args, **kwargs)
         self._last_reward = None
@@ -17,6 +22,10 @@ class MyFrozenLakeEnv(BaseEnv, FrozenLakeEnv):
         self.lastaction = None
         self.is_slippery = kwargs.get('is_slippery', False)
         self.t = 0
+        # see `push`
+        self._undo_stack = []
+        # see `batch_rollout`
+        self._rollout_engine = None
         ps = [(1-p)/2, p, (1-p)/2]
 
         nA = 4
@@ -68,6 +77,7 @@ class MyFrozenLakeEnv(BaseEnv, FrozenLakeEnv):
         self._last_reward = None
         self.done = False
         self.t = 0
+        self._undo_stack = []
         return super().reset(*args, **kwargs)
 
     @property
@@ -106,6 +116,26 @@ class MyFrozenLakeEnv(BaseEnv, FrozenLakeEnv):
         self.t += 1
         return s, r, d, t, i
 
+    def push(self, a):
+        self._undo_stack.append((self.s, self.lastaction, self._last_reward, self.done))
+        return self.step(a)
+
+    def pop(self):
+        self.s, self.lastaction, self._last_reward, self.done = self._undo_stack.pop()
+        self.t -= 1
+
+    def batch_rollout(self, n, max_depth, rng=None):
+        # NB: the transition table is fixed after `__init__`, hence the arrays are built once
+        if self._rollout_engine is None:
+            self._rollout_engine = FrozenLakeRolloutEngine(self.P)
+        # see `MCTS._evaluate`: at least one step is taken
+        n_steps = max(max_depth - self.t, 1)
+        return self._rollout_engine.rollouts(self.s, n, n_steps, self.np_random if rng is None else rng)
+
+    def state_hash(self):
+        # NB: the state is already a small integer
+        return int(self.s)
+
     @property
     def adversarial(self):
         return False
@@ -127,6 +157,17 @@ class MyFrozenLakeEnv(BaseEnv, FrozenLakeEnv):
         self._last_reward = checkpoint['reward']
         self.done = checkpoint['done']
         self.t = checkpoint['t']
+        self._undo_stack = []
+
+    def node_data(self):
+        return {
+            'state': int(self.s),
+            'done': self.done,
+            'reward': self.reward(),
+            'player': 'Agent',
+            't': self.t,
+            'hash': int(self.s)
+        }
 
     def game_result(self):
         if not self.done:
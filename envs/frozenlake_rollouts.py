@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class FrozenLakeRolloutEngine:
+    """
+    Random-policy rollouts of a FrozenLake environment, vectorized over the episodes.
+
+    The transition dict `P` ({state: {action: [(probability, next state, reward, done), ...]}}) is converted into dense
+    arrays of shape (states, actions, outcomes), padded to the largest number of outcomes. A padded outcome has a
+    cumulative probability of 1, hence it's never sampled.
+    """
+
+    def __init__(self, P, n_actions=4):
+        n_states = len(P)
+        n_outcomes = max(len(P[s][a]) for s in P for a in P[s])
+
+        self.n_actions = n_actions
+        self.next_state = np.zeros((n_states, n_actions, n_outcomes), dtype=np.int64)
+        self.cumulative_probability = np.ones((n_states, n_actions, n_outcomes), dtype=np.float64)
+        self.reward = np.zeros((n_states, n_actions, n_outcomes), dtype=np.float64)
+        self.done = np.ones((n_states, n_actions, n_outcomes), dtype=np.bool_)
+
+        for s in range(n_states):
+            for a in range(n_actions):
+                outcomes = P[s][a]
+                probabilities = np.cumsum([p for p, _, _, _ in outcomes])
+                # NB: the last outcome must always catch the samples, whatever the rounding of the sum
+                probabilities[-1] = 1.
+                k = len(outcomes)
+                self.cumulative_probability[s, a, :k] = probabilities
+                self.next_state[s, a, :k] = [s1 for _, s1, _, _ in outcomes]
+                self.reward[s, a, :k] = [r for _, _, r, _ in outcomes]
+                self.done[s, a, :k] = [d for _, _, _, d in outcomes]
+
+    def rollouts(self, state, n, n_steps, rng):
+        """
+        Runs `n` random-policy episodes from `state` in lockstep, for at most `n_steps` steps.
+
+        NB: same semantics as `MCTS._evaluate`, an episode that is still running at its `n_steps`-th step returns 0.
+
+        :param rng: a `np.random.Generator`
+        :return: an array with the `n` returns
+        """
+        states = np.full(n, state, dtype=np.int64)
+        returns = np.zeros(n, dtype=np.float64)
+        episodes = np.arange(n)
+
+        for step in range(n_steps):
+            if step == n_steps - 1:
+                # the episodes that reach the maximum depth return 0, even if they terminate in this step
+                returns[episodes] = 0
+                break
+
+            actions = rng.integers(self.n_actions, size=len(episodes))
+            u = rng.random(len(episodes))
+            outcomes = (u[:, None] >= self.cumulative_probability[states, actions]).sum(axis=1)
+
+            returns[episodes] += self.reward[states, actions, outcomes]
+
+            # only the running episodes are simulated in the next step
+            running = ~self.done[states, actions, outcomes]
+            states = self.next_state[states, actions, outcomes][running]
+            episodes = episodes[running]
+            if len(episodes) == 0:
+                break
+
+        return returns
@@ -1,10 +1,10 @@
-from copy import deepcopy
 from gymnasium import Env
 
 import numpy as np
 from gymnasium.spaces import Discrete, Box
 
 from .base_env import BaseEnv
+from .zobrist import zobrist_keys
 
 
 class TowersOfHanoiEnv(BaseEnv, Env):
@@ -12,6 +12,8 @@ class TowersOfHanoiEnv(BaseEnv, Env):
     NB: MCTS works on this with gamma=0.95, not 1 or 0.99
     """
     metadata = {'render.modes': ['human']}
+    supports_undo = True
+    supports_state_hash = True
     action_dict = {
         'AB': 0,
         'AC': 1,
@@ -35,14 +37,21 @@ class TowersOfHanoiEnv(BaseEnv, Env):
         super(TowersOfHanoiEnv, self).__init__()
         self.num_disks = num_disks
 
-        # The state is represented as a list of three lists (one for each peg),
-        # where each list contains the disks (integers) on that peg in order.
-        self.state = None
+        # The state is represented as a tuple of bitmasks (one for each peg), where bit d-1 is set if disk d is on that
+        # peg. Since the disks on a peg are sorted, the top disk is the lowest set bit (x & -x). The tuple is immutable,
+        # hence the backups can share it without copying it. See `state` for the list of lists view.
+        self._pegs = None
+        self._full_peg = (1 << num_disks) - 1
 
         self.num_pegs = num_pegs
         # Action space: moving a disk from one peg to another
         # Represented as a tuple (from_peg, to_peg), encoded as a discrete action.
         self.action_space: Discrete = Discrete(num_pegs * (num_pegs-1))  # 3 pegs -> 3*2 = 6 possible moves
+        self._moves = tuple((from_peg, to_peg)
+                            for from_peg in range(num_pegs)
+                            for to_peg in range(num_pegs) if to_peg != from_peg)
+        # {top disks of the pegs: legal actions}, see `legal_actions`
+        self._legal_actions_cache = {}
 
         # Observation space: state of all three pegs
         self.observation_space = Box(
@@ -50,10 +59,15 @@ class TowersOfHanoiEnv(BaseEnv, Env):
         )
         self.done = False
         self._la = None
+        self.t = 0
+        # see `push`
+        self._undo_stack = []
+        # see `state_hash`: a key for each (disk, peg)
+        self._zobrist_keys = zobrist_keys(num_disks, num_pegs)
+        self._hash = 0
 
         self._printable_base = '\t'.join([chr(i) for i in range(ord('A'), ord('A') + self.num_pegs)])
 
-
     def reset(self, **kwargs):
         """
         Reset the environment to the initial state.
@@ -61,17 +75,28 @@ class TowersOfHanoiEnv(BaseEnv, Env):
         Returns:
             observation (np.ndarray): The initial state of the environment.
         """
-        self.state = [list(range(self.num_disks, 0, -1)), [], []]  # All disks on the first peg
+        self._pegs = (self._full_peg,) + (0,) * (self.num_pegs - 1)  # All disks on the first peg
         self.done = False
         self._la = None
+        self.t = 0
+        self._undo_stack = []
+        self._hash = self._compute_hash()
         return self._get_observation()
 
+    @property
+    def state(self):
+        """
+        The disks (integers) on each peg, from the bottom to the top.
+        """
+        return [[d for d in range(self.num_disks, 0, -1) if peg >> (d - 1) & 1] for peg in self._pegs]
+
     def _legal_action(self, action):
-        from_peg = action // 2
-        to_peg = action % 2 + (1 if action % 2 >= from_peg else 0)
+        from_peg, to_peg = self._moves[action]
+        source = self._pegs[from_peg]
+        target = self._pegs[to_peg]
 
-        # nb: self.state[from_peg] can be empty, hence the `not`
-        if not self.state[from_peg] or (self.state[to_peg] and self.state[to_peg][-1] < self.state[from_peg][-1]):
+        # nb: the source peg can be empty, hence the `not`
+        if not source or (target and target & -target < source & -source):
             return False
 
         return True
@@ -96,27 +121,65 @@ class TowersOfHanoiEnv(BaseEnv, Env):
                 - done (bool): Whether the puzzle is solved.
                 - info (dict): Additional diagnostic information.
         """
+        if not self._move(action):
+            return self._get_observation(), -1.0, self.done, None, {"error": "Invalid move"}
+
+        return self._get_observation(), self.reward(), self.done, None, {}
+
+    def _move(self, action):
+        """
+        The transition of `step`, without the observation.
+
+        Returns:
+            bool: Whether the move was valid.
+        """
         if self.done:
             raise ValueError("Environment has already finished. Call reset() to restart.")
 
-        from_peg = action // 2
-        to_peg = action % 2 + (1 if action % 2 >= from_peg else 0)
-
         if not self._legal_action(action):
-            return self._get_observation(), -1.0, self.done, None, {"error": "Invalid move"}
+            return False
 
         self._la = action
+        self.t += 1
 
-        disk = self.state[from_peg][-1]
+        from_peg, to_peg = self._moves[action]
+        pegs = list(self._pegs)
+        disk = pegs[from_peg] & -pegs[from_peg]
 
         # Perform the move
-        self.state[from_peg].pop()
-        self.state[to_peg].append(disk)
+        pegs[from_peg] ^= disk
+        pegs[to_peg] |= disk
+        self._pegs = tuple(pegs)
+        keys = self._zobrist_keys[disk.bit_length() - 1]
+        self._hash ^= keys[from_peg] ^ keys[to_peg]
 
         # Check if the puzzle is solved
-        self.done = len(self.state[2]) == self.num_disks
+        self.done = self._pegs[2] == self._full_peg
 
-        return self._get_observation(), self.reward(), self.done, None, {}
+        return True
+
+    def push(self, action):
+        # NB: the state is immutable, hence it's its own undo token. The observation is the compact (hashable) state,
+        # because building the array of `step` would cost more than the move itself
+        self._undo_stack.append((self._pegs, self._la, self.done, self.t, self._hash))
+        if not self._move(action):
+            return self._pegs, -1.0, self.done, None, {"error": "Invalid move"}
+        return self._pegs, self.reward(), self.done, None, {}
+
+    def pop(self):
+        self._pegs, self._la, self.done, self.t, self._hash = self._undo_stack.pop()
+
+    def _compute_hash(self):
+        h = 0
+        for peg, disks in enumerate(self._pegs):
+            for d in range(self.num_disks):
+                if disks >> d & 1:
+                    h ^= self._zobrist_keys[d][peg]
+        return h
+
+    def state_hash(self):
+        # NB: Zobrist hashing, updated incrementally by the moves
+        return self._hash
 
     def render(self, mode='human'):
         """
@@ -145,19 +208,22 @@ class TowersOfHanoiEnv(BaseEnv, Env):
         Returns:
             np.ndarray: The state as a numpy array.
         """
-        obs = np.zeros((3, self.num_disks), dtype=np.int32)
-        for i, peg in enumerate(self.state):
-            for j, disk in enumerate(reversed(peg)):
-                obs[i, j] = disk
+        obs = np.zeros((self.num_pegs, self.num_disks), dtype=np.int32)
+        for i, peg in enumerate(self._pegs):
+            # from the top to the bottom
+            disks = [d for d in range(1, self.num_disks + 1) if peg >> (d - 1) & 1]
+            obs[i, :len(disks)] = disks
         return obs
 
     @property
     def legal_actions(self):
-        legal_actions = []
-        for action in range(self.action_space.n):
-            if self._legal_action(action):
-                legal_actions.append(action)
-        return legal_actions
+        # NB: the legal moves only depend on the top disks, and there are few combinations of them
+        tops = tuple(peg & -peg for peg in self._pegs)
+        legal_actions = self._legal_actions_cache.get(tops)
+        if legal_actions is None:
+            legal_actions = [action for action in range(self.action_space.n) if self._legal_action(action)]
+            self._legal_actions_cache[tops] = legal_actions
+        return legal_actions.copy()
 
     @property
     def _last_action(self):
@@ -166,18 +232,32 @@ class TowersOfHanoiEnv(BaseEnv, Env):
 
     def backup(self):
         checkpoint = {
-            'state': deepcopy(self.state),
+            'state': self._pegs,
             'last_action': self._last_action,
             'done': self.done,
             'player': 'Agent',
-            'reward': self.reward()
+            'reward': self.reward(),
+            't': self.t
         }
         return checkpoint
 
     def load(self, checkpoint):
-        self.state = checkpoint['state']
+        self._pegs = checkpoint['state']
         self._la = checkpoint['last_action']
         self.done = checkpoint['done']
+        self.t = checkpoint['t']
+        self._undo_stack = []
+        self._hash = self._compute_hash()
+
+    def node_data(self):
+        return {
+            'state': self._pegs,
+            'done': self.done,
+            'player': 'Agent',
+            'reward': self.reward(),
+            't': self.t,
+            'hash': self._hash
+        }
 
     def game_result(self):
         if self.done:
@@ -3,9 +3,18 @@ from itertools import permutations
 from gymnasium import spaces, Env
 
 from .base_env import BaseEnv
+from .zobrist import zobrist_keys
+
+# one key for each (cell, mark), where the mark is 0 for the agent and 1 for the human, plus one for the human to move.
+# See `TicTacToeEnv.state_hash`
+_zobrist_keys = zobrist_keys(10, 2)
+ZOBRIST_CELLS = _zobrist_keys[:9]
+ZOBRIST_HUMAN_TO_MOVE = _zobrist_keys[9][0]
 
 
 class TicTacToeEnv(BaseEnv, Env):
+    supports_undo = True
+    supports_state_hash = True
     metadata = {'render.modes': ['human']}
     _agent_mark = 'X'
     _human_mark = 'O'
@@ -34,6 +43,11 @@ class TicTacToeEnv(BaseEnv, Env):
         self.done = False
         self._la = None
         self.mark = None
+        self.t = 0
+        # see `push`
+        self._undo_stack = []
+        # see `state_hash`
+        self._hash = 0
 
     def __str__(self):
         s = ''
@@ -73,6 +87,8 @@ class TicTacToeEnv(BaseEnv, Env):
         self.board = [0] * self._size
         self.done = False
         self._la = None
+        self.t = 0
+        self._undo_stack = []
 
         # The idea here is to know who is the first player to place a piece on the board. If the first player is human,
         # the first symbol is going to be `O`
@@ -81,7 +97,7 @@ class TicTacToeEnv(BaseEnv, Env):
             self.mark = self._human_mark
         else:
             self.mark = self._agent_mark
-
+        self._hash = self._compute_hash()
 
         return self.observation
 
@@ -104,6 +120,9 @@ class TicTacToeEnv(BaseEnv, Env):
 
         # place piece on the board
         self.board[action] = self.mark
+        self._hash ^= ZOBRIST_CELLS[action][self.mark == self._human_mark] ^ ZOBRIST_HUMAN_TO_MOVE
+
+        self.t += 1
 
         reward = self.reward()
         if reward != 0 or self.draw():
@@ -112,6 +131,29 @@ class TicTacToeEnv(BaseEnv, Env):
         self.mark = self.next_mark(self.mark)
         return self.observation, reward, self.done, None, {}
 
+    def push(self, action):
+        self._undo_stack.append((self._la, self.done))
+        return self.step(action)
+
+    def pop(self):
+        # NB: the undone action is the last one, and the mark goes back to the player who played it
+        self.board[self._la] = 0
+        self.mark = self.next_mark(self.mark)
+        self._hash ^= ZOBRIST_CELLS[self._la][self.mark == self._human_mark] ^ ZOBRIST_HUMAN_TO_MOVE
+        self.t -= 1
+        self._la, self.done = self._undo_stack.pop()
+
+    def _compute_hash(self):
+        h = ZOBRIST_HUMAN_TO_MOVE if self.mark == self._human_mark else 0
+        for i, c in enumerate(self.board):
+            if c != 0:
+                h ^= ZOBRIST_CELLS[i][c == self._human_mark]
+        return h
+
+    def state_hash(self):
+        # NB: Zobrist hashing, updated incrementally by `step` and `pop`
+        return self._hash
+
     def render(self, mode='human', close=False):
         if close:
             return
@@ -141,6 +183,7 @@ class TicTacToeEnv(BaseEnv, Env):
             'last_action': self._last_action,
             'reward': self.reward(),
             'player': 'Human' if self.mark == self._human_mark else 'Agent',
+            't': self.t
         }
         return state
 
@@ -150,10 +193,22 @@ class TicTacToeEnv(BaseEnv, Env):
             self.mark = checkpoint['mark']
             self.done = checkpoint['done']
             self._la = checkpoint['last_action']
+            self.t = checkpoint['t']
         except KeyError:
             return False
+        self._undo_stack = []
+        self._hash = self._compute_hash()
         return True
 
+    def node_data(self):
+        return {
+            'done': self.done,
+            'reward': self.reward(),
+            'player': 'Human' if self.mark == self._human_mark else 'Agent',
+            't': self.t,
+            'hash': self._hash
+        }
+
     def draw(self):
         try:
             self.board.index(0)
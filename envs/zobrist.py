@@ -0,0 +1,14 @@
+import random
+
+
+def zobrist_keys(n_positions, n_values, seed=0):
+    """
+    Random 64-bit keys for Zobrist hashing: the hash of a state is the xor of the keys of its (position, value) pairs,
+    so that a move updates it with one xor per changed pair.
+
+    NB: the keys only depend on `seed`, hence the hashes are the same in every process.
+
+    :return: a tuple of `n_positions` tuples of `n_values` keys
+    """
+    rng = random.Random(seed)
+    return tuple(tuple(rng.getrandbits(64) for _ in range(n_values)) for _ in range(n_positions))
@@ -1,4 +1,5 @@
 from src import MCTS
+from src.hyperparameters import MCTS_SIMULATIONS
 from envs.tictactoe_env import TicTacToeEnv
 
 HUMAN = True
@@ -14,7 +15,9 @@ def main():
     # env.reset()
     env.reset(human_first=player)
 
-    agent = MCTS(env, seed=SEED, adversarial=env.adversarial, gamma=1, max_depth=20)
+    # NB: the agent keeps searching while the human thinks
+    agent = MCTS(env, seed=SEED, adversarial=env.adversarial, gamma=1, max_depth=20, n_simulations=MCTS_SIMULATIONS,
+                 ponder=env.adversarial)
 
     env.render()
 
@@ -35,6 +38,7 @@ def main():
         if env.adversarial:
             player = not player
 
+    agent.close()
     print(env.game_result())
 
     
@@ -1,5 +1,8 @@
+import math
+
 from src import MCTS
-from src.tree.chance_tree import ChanceTree, ChoiceNode, ChanceNode
+from src.tree.array_chance_tree import ArrayChanceTree
+from src.tree.chance_tree import ChanceTree
 
 
 class ChanceMCTS(MCTS):
@@ -8,20 +11,98 @@ class ChanceMCTS(MCTS):
     - the Tree is necessarily a ChanceTree
     - the selection depends on the nature of the Node
     - the backpropagation skips the chance nodes
+    - because of the hashed choice nodes the tree is actually a DAG, hence the backpropagation follows the path
+      traversed in the current iteration (`_path`) instead of the parents of the nodes
+
+    Progressive widening: a node visited N times can have at most max(1, ceil(C * N^alpha)) children, so that the
+    visits go deeper instead of spreading over many outcomes (or actions) sampled only once. With `state_widening`, the
+    outcomes sampled at a chance node at its limit are routed to its existing children (see `_sample_outcome`); with
+    `action_widening` ("double" progressive widening), a choice node at its limit is not expanded, its existing
+    children are selected instead.
     """
 
-    def __init__(self, *args, **kwargs):
+    # see `_sample_outcome`
+    _max_resamples = 32
+
+    _tree_backends = {
+        'object': ChanceTree,
+        'array': ArrayChanceTree,
+    }
+
+    def __init__(self, *args, max_choice_nodes=None, choice_node_eviction='lru', state_widening=None,
+                 action_widening=None, **kwargs):
+        """
+        :param max_choice_nodes: the maximum size of the index of the choice nodes (see `ChanceTree`), None for no limit
+        :param choice_node_eviction: the eviction policy of the index, either 'lru' or 'least_visited'
+        :param state_widening: a pair (C, alpha) that limits the outcomes of the chance nodes (see the class docstring),
+            None for no limit
+        :param action_widening: same as `state_widening`, for the actions of the choice nodes
+        """
+        for widening in (state_widening, action_widening):
+            if widening is not None and (widening[0] <= 0 or not 0 <= widening[1] <= 1):
+                raise ValueError("The progressive widening needs C > 0 and 0 <= alpha <= 1")
         kwargs['adversarial'] = False
+        if kwargs.get('evaluator') is not None:
+            raise ValueError("ChanceMCTS doesn't support an evaluator")
+        # NB: needed by `_build_tree`, which is called by the constructor of the superclass
+        self._max_choice_nodes = max_choice_nodes
+        self._choice_node_eviction = choice_node_eviction
+        self._state_widening = state_widening
+        self._action_widening = action_widening
         super().__init__(*args, **kwargs)
 
-    def _build_tree(self):
-        return ChanceTree(self.transition_model.legal_actions, self.transition_model.backup())
+    def worker_kwargs(self):
+        kwargs = super().worker_kwargs()
+        kwargs['max_choice_nodes'] = self._max_choice_nodes
+        kwargs['choice_node_eviction'] = self._choice_node_eviction
+        kwargs['state_widening'] = self._state_widening
+        kwargs['action_widening'] = self._action_widening
+        return kwargs
+
+    def _build_tree(self, legal_actions=None, root_data=None):
+        if legal_actions is None:
+            legal_actions = self.transition_model.legal_actions
+        if root_data is None:
+            root_data = self.transition_model.node_data()
+        return self._tree_backends[self._tree_backend](legal_actions, root_data,
+                                                       max_choice_nodes=self._max_choice_nodes,
+                                                       eviction=self._choice_node_eviction)
+
+    @staticmethod
+    def _widened(node, widening):
+        """
+        :return: True if `node` has as many children as allowed by `widening` (never if it's None)
+        """
+        if widening is None:
+            return False
+        c, alpha = widening
+        return node.n_children >= max(1, math.ceil(c * node.visits ** alpha))
+
+    def _sample_outcome(self, chance_node):
+        """
+        Steps the action of `chance_node`. If the chance node can't have more children (see `state_widening`), the
+        outcome is resampled until it's one of its children, i.e. the sample is routed to an existing child with its
+        transition probability (renormalized over the children). After `_max_resamples` failures the new outcome is
+        kept, hence the limit can be exceeded, with a small probability.
+
+        :return: the outcome
+        """
+        if self._widened(chance_node, self._state_widening):
+            for _ in range(self._max_resamples):
+                checkpoint = self._checkpoint()
+                s, _, _, _, _ = self._step(chance_node.action)
+                if chance_node.children.get(s) is not None:
+                    return s
+                self._restore(checkpoint)
+        s, _, _, _, _ = self._step(chance_node.action)
+        return s
 
     def _select(self):
         node = self.tree.root
-        while not node.is_leaf and node.is_fully_expanded:
-            chance_node = self.select_ucb(node)
-            s, _, _, _, _ = self.transition_model.step(chance_node.action)
+        self._path = [node]
+        while not node.is_leaf and (node.is_fully_expanded or self._widened(node, self._action_widening)):
+            chance_node = self._selection(node)
+            s = self._sample_outcome(chance_node)
             # TODO: HASHING. FOR THE MOMENT (FROZEN LAKE) THE STATE IS JUST AN INTEGER
             if chance_node.children[s] is not None:
                 node = chance_node.children[s]
@@ -30,15 +111,17 @@ class ChanceMCTS(MCTS):
                 node = self.tree.insert_node(chance_node.id,
                                              action=s,  # TODO: "action" is actually a state -> HASH
                                              legal_actions=self.transition_model.legal_actions,
-                                             node_data=self.transition_model.backup(),
+                                             node_data=self.transition_model.node_data(),
                                              chance=False)
+            self._path.append(chance_node)
+            self._path.append(node)
             self.t += 1
         return node
 
     def _expand(self, node):
-        random_action = node.random_action()
+        random_action = node.random_action(self._random)
         support_random_action = self.transition_model.next_states(random_action)
-        s, _, _, _, _ = self.transition_model.step(random_action)
+        s, _, _, _, _ = self._step(random_action)
 
         # insert first a chance node
         new_chance_node = self.tree.insert_node(node.id,
@@ -46,50 +129,67 @@ class ChanceMCTS(MCTS):
                                                 legal_actions=support_random_action,
                                                 node_data=None,
                                                 chance=True)
+        self._path.append(new_chance_node)
 
         # then insert a choice node
         # if there is already a hashed choice node, use that one instead
-        node_data = self.transition_model.backup()
-        node_hash = ChoiceNode.generate_node_hash(node_data)
-        hashed_node = self.tree.get_choice_node_if_existing(node_hash)
+        node_data = self.transition_model.node_data()
+        hashed_node = self.tree.get_choice_node_if_existing(node_data)
         if hashed_node is None:
             new_choice_node = self.tree.insert_node(new_chance_node.id,
                                                     action=s,
                                                     legal_actions=self.transition_model.legal_actions,
-                                                    node_data=self.transition_model.backup(),
+                                                    node_data=node_data,
                                                     chance=False)
         else:
             new_choice_node = hashed_node
             # IMPORTANT: when a hashed node is detected, it's important to first backpropagate its statistics to the root
             # and then go on with the simulation. At that point, backpropagate the new results along all paths
-            self._backpropagate(new_chance_node, hashed_node.score, hashed_node.visits)
+            # NB: without the virtual losses of the other workers, if any
+            self._backpropagate(new_chance_node, *self._statistics(hashed_node))
 
             new_chance_node.add_child(hashed_node)
             hashed_node.add_parent(new_chance_node)
+        self._path.append(new_choice_node)
         self.t += 1
 
         return new_choice_node
 
     def _backpropagate(self, node, score, visits=1):
-        if node is None:
-            return
-
-        if isinstance(node, ChoiceNode):
-            node.update_score(score)
-
-        node.visit(visits)  # count the visits also for the chance nodes
-
-        if isinstance(node, ChanceNode):
-            self._backpropagate(node.parent, score * self.gamma, visits)
-        else:
-            for parent in node.parents.values():
-                self._backpropagate(parent, score * self.gamma, visits)
+        """
+        Backs up `score` from `node` (which must be on the current path) to the root, along the path traversed in the
+        current iteration. It's iterative and updates each node of the path exactly once, so its cost is linear in the
+        depth of the path, even when a hashed choice node is reachable through many different paths.
+
+        NB: only the ancestors on the traversed path are updated: the statistics of a hashed node are shared by all its
+        parents through the node itself (and are backpropagated along the new path when a new parent is linked, see
+        `_expand`).
+        """
+        i = len(self._path) - 1
+        while self._path[i] != node:
+            i -= 1
+
+        for n in reversed(self._path[:i + 1]):
+            if not n.is_chance:
+                n.update_score(score)
+            n.visit(visits)  # count the visits also for the chance nodes
+            score *= self.gamma
 
     def determinize_chance_node(self, state):
-        new_root = self.tree.root.children[state]
-        self.tree.keep_subtree(new_root)
+        new_root = self.tree.root.children.get(state)
+        if new_root is None:
+            # the outcome was never sampled during the search (or the tree was thrown away, e.g. in root-parallel
+            # mode): start from scratch
+            self._reset()
+        else:
+            self.tree.keep_subtree(new_root)
 
     def plan(self, *args, **kwargs):
-        if isinstance(self.tree.root, ChanceNode):
+        if self.tree.root.is_chance:
             raise RuntimeError
         return super().plan(*args, **kwargs)
+
+    def plan_iter(self, *args, **kwargs):
+        if self.tree.root.is_chance:
+            raise RuntimeError
+        return super().plan_iter(*args, **kwargs)
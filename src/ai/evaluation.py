@@ -0,0 +1,115 @@
+"""
+Leaf evaluators (see the `evaluator` argument of `MCTS`): instead of running rollouts, the leaves are evaluated by a
+model that returns a value and the prior probabilities of the actions of their states.
+
+Calling a model once per leaf is slow, hence the planner queues the expanded leaves and evaluates them in batches of
+`batch_size` (see `MCTS._evaluator_iteration`): the features of the queued states are stacked into a single array and
+the model returns the priors and the values of the whole batch. While a leaf is queued, a virtual loss is added to the
+nodes of its path (as in `src.ai.parallel.TreeParallelSearch`), so that the next descents of the batch are steered
+towards different leaves.
+
+The priors are used to choose the actions to expand (the one with the highest prior first) and by the PUCT selection
+policy (`MCTS.select_puct`).
+"""
+import numpy as np
+
+
+class Evaluator:
+    """
+    The interface of a leaf evaluator.
+
+    The values follow the convention of the rollouts (see `MCTS._evaluate`): a value is the expected return from the
+    state, with the sign of the rewards of the environment (e.g. for TicTacToe it's from the point of view of the
+    agent).
+    """
+
+    # the number of actions of the environment, i.e. the length of the rows of the priors
+    n_actions = None
+
+    def features(self, transition_model):
+        """
+        :return: a 1-D array that encodes the current state of `transition_model`
+        """
+        raise NotImplementedError
+
+    def evaluate(self, features):
+        """
+        :param features: an array (batch size, number of features), whose rows are returned by `features`
+        :return: the priors, an array (batch size, `n_actions`) of non-negative weights (they are normalized over the
+            legal actions by the planner), and the values, an array (batch size,)
+        """
+        raise NotImplementedError
+
+
+class TabularTicTacToeEvaluator(Evaluator):
+    """
+    A toy evaluator for `TicTacToeEnv`, for testing: a table of the exact values of the states, computed once by
+    solving the game. The priors are a softmax of the values of the moves for the player to move, hence the best moves
+    have the highest priors (a lower `temperature` makes them sharper).
+
+    The features are the 9 cells (1 for the mark of the agent, -1 for the one of the human, 0 if empty) and 1 if the
+    agent is to move (0 otherwise), and they are looked up in the table as a base-3 number.
+    """
+
+    n_actions = 9
+    _lines = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+    _powers = 3 ** np.arange(9)
+
+    def __init__(self, temperature=0.5):
+        self.temperature = temperature
+        size = 2 * 3 ** 9
+        self._values = np.zeros(size)
+        self._priors = np.full((size, self.n_actions), 1. / self.n_actions)
+        self._solved = {}
+        for to_move in (1, -1):
+            self._solve((0,) * 9, to_move)
+        self._solved = None
+
+    @classmethod
+    def _winner(cls, cells):
+        for i, j, k in cls._lines:
+            if cells[i] != 0 and cells[i] == cells[j] == cells[k]:
+                return cells[i]
+        return 0
+
+    @classmethod
+    def _index(cls, cells, to_move):
+        return int(np.dot(np.add(cells, 1), cls._powers)) + (to_move == 1) * 3 ** 9
+
+    def _solve(self, cells, to_move):
+        """
+        :return: the value of the state for the agent (1 won, -1 lost, 0 draw) with optimal play, and fills its entry
+            of the table
+        """
+        key = cells, to_move
+        if key in self._solved:
+            return self._solved[key]
+
+        winner = self._winner(cells)
+        moves = [i for i in range(9) if cells[i] == 0]
+        if winner or not moves:
+            value = winner
+        else:
+            child_values = np.array([self._solve(cells[:i] + (to_move,) + cells[i + 1:], -to_move) for i in moves],
+                                    dtype=np.float64)
+            # NB: the values of the moves for the player to move
+            own_values = to_move * child_values
+            value = to_move * own_values.max()
+            weights = np.exp((own_values - own_values.max()) / self.temperature)
+            priors = np.zeros(self.n_actions)
+            priors[moves] = weights / weights.sum()
+            self._priors[self._index(cells, to_move)] = priors
+
+        self._values[self._index(cells, to_move)] = value
+        self._solved[key] = value
+        return value
+
+    def features(self, transition_model):
+        agent_mark = transition_model._agent_mark
+        cells = [0 if c == 0 else (1 if c == agent_mark else -1) for c in transition_model.board]
+        return np.array(cells + [int(transition_model.mark == agent_mark)])
+
+    def evaluate(self, features):
+        features = np.asarray(features)
+        index = (features[:, :9] + 1) @ self._powers + features[:, 9] * 3 ** 9
+        return self._priors[index], self._values[index]
@@ -0,0 +1,119 @@
+"""
+Optional instrumentation of the search (see the `instrument` argument of `MCTS`).
+
+`SearchStats` accumulates, over the iterations of a `plan`, the time spent in each phase of `MCTS._plan_iteration`
+(saving and restoring the state of the transition model included) and some counters: the selection depth, the length
+of the rollouts, the nodes created and the length of the backpropagation paths.
+
+When the instrumentation is disabled, `MCTS` runs the plain `_plan_iteration`, hence it costs nothing. When it's
+enabled, the iterations run `MCTS._instrumented_iteration`, which reads the clock twice per phase.
+
+Profiling hooks:
+- `SearchStats.phase` is the phase that is running (None between the iterations), so that a sampling profiler can
+  attribute its samples to the phases, see `PhaseSampler`
+- the callables in `SearchStats.hooks` are called at the end of each phase as `hook(phase, start, end)`, with the
+  `time.perf_counter` readings of the phase
+"""
+import threading
+from collections import Counter
+
+PHASES = ('checkpoint', 'select', 'expand', 'simulate', 'backpropagate', 'restore')
+
+
+class SearchStats:
+    """
+    Cumulative timers and counters of a search, see the module docstring.
+    """
+
+    def __init__(self):
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the timers and the counters (not the hooks).
+        """
+        self.iterations = 0
+        self.time = dict.fromkeys(PHASES, 0.)
+        self.selection_depth = 0
+        self.max_selection_depth = 0
+        self.rollout_steps = 0
+        self.nodes_created = 0
+        self.backup_path_length = 0
+        self.phase = None
+
+    def copy(self):
+        """
+        :return: a snapshot of the timers and of the counters (without the hooks)
+        """
+        stats = SearchStats()
+        stats.__dict__.update(self.__dict__)
+        stats.time = dict(self.time)
+        stats.hooks = []
+        return stats
+
+    def __repr__(self):
+        times = ', '.join(f"{phase}={t:.4f}" for phase, t in self.time.items())
+        return f"SearchStats(iterations={self.iterations}, {times})"
+
+    def record(self, phase, start, end):
+        self.time[phase] += end - start
+        for hook in self.hooks:
+            hook(phase, start, end)
+
+    @property
+    def total_time(self):
+        return sum(self.time.values())
+
+    def as_dict(self):
+        """
+        :return: the timers, the counters and their means per iteration
+        """
+        n = max(self.iterations, 1)
+        return {
+            'iterations': self.iterations,
+            'time': dict(self.time),
+            'time_fraction': {phase: t / self.total_time if self.total_time else 0. for phase, t in self.time.items()},
+            'mean_selection_depth': self.selection_depth / n,
+            'max_selection_depth': self.max_selection_depth,
+            'mean_rollout_length': self.rollout_steps / n,
+            'nodes_created': self.nodes_created,
+            'mean_backup_path_length': self.backup_path_length / n,
+        }
+
+
+class PhaseSampler:
+    """
+    A minimal sampling profiler: a background thread that records the phase of the search (`SearchStats.phase`) every
+    `interval` seconds.
+
+    NB: a thread of the same interpreter only runs when the search releases the GIL, hence the samples attribute the
+    time to the phases (whose fractions they estimate), but they would be biased towards a few points of the code at
+    the granularity of the functions.
+
+    Usage:
+        with PhaseSampler(planner.stats) as sampler:
+            planner.plan(...)
+        sampler.phases  # a Counter of the samples
+    """
+
+    def __init__(self, stats, interval=0.001):
+        self.stats = stats
+        self.interval = interval
+        self.phases = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.phases[self.stats.phase] += 1
@@ -1,63 +1,331 @@
-import random
+import math
 import time
-from functools import cmp_to_key
+from collections import namedtuple
 
 import numpy as np
-from src.tree.tree import Tree, Node
+from src.ai.instrumentation import SearchStats
+from src.ai.parallel import RootParallelSearch, TreeParallelSearch, add_virtual_loss, best_action
+from src.ai.pondering import Ponderer
+from src.ai.random_stream import RandomStream
+from src.ai.selection import VectorizedUCB
+from src.ai.value_cache import ValueCache
+from src.tree.array_tree import ArrayTree
+from src.tree.transposition_tree import TranspositionTree
+from src.tree.tree import Tree
+
+
+# see `MCTS.plan_iter`
+SearchProgress = namedtuple('SearchProgress', ['action', 'statistics', 'iterations', 'elapsed'])
 
 
 class MCTS:
+    _tree_backends = {
+        'object': Tree,
+        'array': ArrayTree,
+        'transposition': TranspositionTree,
+    }
+    # the fraction of `max_nodes` that is kept by a pruning
+    _prune_fraction = 0.9
+    # see `_search_iter`: the maximum number of iterations between two readings of the clock, and the fraction of the
+    # time left that a batch of iterations can take
+    _max_check_interval = 256
+    _check_fraction = 0.5
+    # the proven value of a win, see `solver`
+    _solver_win = 1
+
     def __init__(self,
                  transition_model,
                  adversarial=True,
                  gamma=1,
                  keep_subtree=True,
                  max_depth=1000,
-                 seed=None):
+                 seed=None,
+                 tree_backend='object',
+                 selection='ucb',
+                 n_workers=1,
+                 parallelism='root',
+                 virtual_loss=1,
+                 n_simulations=1,
+                 max_nodes=None,
+                 max_bytes=None,
+                 pruning='least_visited',
+                 ponder=False,
+                 instrument=False,
+                 value_cache_size=None,
+                 value_cache_samples=16,
+                 evaluator=None,
+                 batch_size=8,
+                 solver=False):
+        """
+        :param seed: the seed of the random stream of the planner (see `src.ai.random_stream`), from which the streams
+            of the parallel workers and of the pondering thread are spawned. The global `random` and `np.random`
+            modules are not used
+        :param tree_backend: either 'object' (one Python object per node), 'array' (struct-of-arrays storage, see
+            `src.tree.array_tree`), which uses much less memory per node, or 'transposition' (the nodes of the same
+            state are shared, see `src.tree.transposition_tree`), which needs a transition model that supports
+            `state_hash`
+        :param selection: the selection policy, either 'ucb' (the scalar `select_ucb`), 'vectorized_ucb' (see
+            `src.ai.selection.VectorizedUCB`), 'puct' (`select_puct`, which uses the priors of the evaluator) or a
+            callable that takes a node and returns one of its children
+        :param n_workers: if greater than 1, `plan` runs a parallel search with that many workers, see `parallelism`
+        :param parallelism: either 'root' (independent trees in worker processes, whose root statistics are merged;
+            the transition model and the selection policy must be picklable) or 'tree' (worker threads that share
+            the tree of the planner), see `src.ai.parallel`
+        :param virtual_loss: in tree-parallel mode, the loss temporarily added to the nodes on the path of a worker, so
+            that the other workers are steered away from it
+        :param n_simulations: the number of rollouts run from each expanded node. Their returns are backpropagated as
+            a single update weighted by `n_simulations` visits. If the transition model has a `batch_rollout` method
+            (see `BaseEnv`) they are run as a batch
+        :param max_nodes: the maximum number of nodes of the tree. When it's exceeded during a search, the least
+            valuable frontier subtrees are collapsed into their (unexpanded) roots, which keep their statistics, see
+            `Tree.prune`. Only supported by the 'object' backend
+        :param max_bytes: same as `max_nodes`, but the limit is on the estimated memory of the tree (see
+            `Tree.node_bytes`), converted into a number of nodes at the beginning of each search
+        :param pruning: the subtrees that are collapsed first, either 'least_visited' or 'lowest_value'
+        :param ponder: if True, after each `plan` the search goes on in a background thread until `opponent_action` (or
+            the next `plan`), see `src.ai.pondering`. Only for adversarial planners that keep the subtree, and not in
+            root-parallel mode
+        :param instrument: if True, the sequential searches record the time spent in each phase of an iteration and
+            some counters in `stats`, see `src.ai.instrumentation`
+        :param value_cache_size: if given, the returns of the rollouts are cached for up to that many states, and the
+            states with at least `value_cache_samples` returns are evaluated with their mean instead of rollouts, see
+            `src.ai.value_cache`. Needs a transition model that supports `state_hash`, not in tree-parallel mode
+        :param evaluator: if given, the leaves are evaluated by this `src.ai.evaluation.Evaluator` instead of rollouts,
+            in batches of `batch_size` leaves, and the actions with the highest priors are expanded first. Not with
+            the 'array' backend, nor in tree-parallel mode, nor with `instrument`
+        :param solver: if True, the search is an MCTS-Solver: the values of the terminal nodes are propagated up the
+            tree as proven values (see `_prove`), the solved nodes are not selected anymore and the search stops as soon
+            as the root is solved. Assumes that the terminal rewards are in [-1, 1], 1 being a win. Only for adversarial
+            planners with `n_workers` = 1 (neither root- nor tree-parallel), not with the 'array' backend nor with an
+            `evaluator`
+        """
+        if tree_backend not in self._tree_backends:
+            raise ValueError(f"Unknown tree backend: {tree_backend}")
+        if tree_backend == 'transposition' and not getattr(transition_model, 'supports_state_hash', False):
+            raise ValueError("The transposition tree needs a transition model that supports state_hash")
+
+        if selection == 'ucb':
+            self._selection = self.select_ucb
+        elif selection == 'vectorized_ucb':
+            self._selection = VectorizedUCB()
+        elif selection == 'puct':
+            self._selection = self.select_puct
+        elif callable(selection):
+            self._selection = selection
+        else:
+            raise ValueError(f"Unknown selection policy: {selection}")
+
+        if parallelism not in ('root', 'tree'):
+            raise ValueError(f"Unknown parallelism: {parallelism}")
+
+        if pruning not in Tree._pruning_policies:
+            raise ValueError(f"Unknown pruning policy: {pruning}")
+        if max_nodes is not None or max_bytes is not None:
+            if not self._tree_backends[tree_backend].supports_pruning:
+                raise ValueError(f"The {tree_backend} tree backend doesn't support max_nodes and max_bytes")
+            if n_workers > 1 and parallelism == 'tree':
+                raise ValueError("max_nodes and max_bytes are not supported in tree-parallel mode")
+
+        if value_cache_size is not None:
+            if not getattr(transition_model, 'supports_state_hash', False):
+                raise ValueError("The value cache needs a transition model that supports state_hash")
+            if n_workers > 1 and parallelism == 'tree':
+                raise ValueError("The value cache is not supported in tree-parallel mode")
+
+        if evaluator is not None:
+            if tree_backend == 'array':
+                raise ValueError("The evaluator is not supported by the array tree backend")
+            if (n_workers > 1 and parallelism == 'tree') or instrument:
+                raise ValueError("The evaluator is not supported in tree-parallel mode, nor with instrument")
+            if batch_size < 1:
+                raise ValueError("batch_size must be positive")
+
+        if solver and (not adversarial or tree_backend == 'array' or n_workers > 1 or evaluator is not None):
+            raise ValueError("The solver needs an adversarial planner with a single worker (n_workers = 1), and it's "
+                             "not supported by the array tree backend nor with an evaluator")
+
+        if ponder and (not adversarial or not keep_subtree or (n_workers > 1 and parallelism == 'root')):
+            raise ValueError("Pondering needs an adversarial planner that keeps the subtree, not in root-parallel mode")
 
         self.transition_model = transition_model
+        self._tree_backend = tree_backend
+        self._selection_name = selection
         self.tree = self._build_tree()
         self.adversarial = adversarial
         self.gamma = gamma
         self._keep_subtree = keep_subtree
         self._max_depth = max_depth
+        self._n_workers = n_workers
+        self._parallelism = parallelism
+        self._virtual_loss = virtual_loss
+        self._n_simulations = n_simulations
+        self._max_nodes = max_nodes
+        self._max_bytes = max_bytes
+        self._pruning = pruning
+        self._ponder = ponder
+        self._value_cache_size = value_cache_size
+        self._value_cache_samples = value_cache_samples
+        self.value_cache = None if value_cache_size is None else ValueCache(value_cache_size, value_cache_samples)
+        self._evaluator = evaluator
+        self._batch_size = batch_size
+        self._solver = solver
+        if solver:
+            # see `_select_unsolved`
+            self._unsolved_selection = self._selection
+            self._selection = self._select_unsolved
+        # the leaves waiting for the evaluator, see `_evaluator_iteration`
+        self._pending_leaves = []
+        # see `plan`
+        self.stats = SearchStats() if instrument else None
+        self._ponderer = None
+        # the number of iterations run by the last pondering
+        self.ponder_iterations = 0
+        self._parallel_search = None
+        self._path = None
+        # {node id: number of virtual losses}, shared by the tree-parallel workers (or of the leaves waiting for the
+        # evaluator)
+        self._pending_losses = None if evaluator is None else {}
+        # see `_step`
+        self._undo = getattr(transition_model, 'supports_undo', False)
+        self._depth = 0
 
         self.t = None
 
-        random.seed(seed)
-        np.random.seed(seed)
+        # used to derive the streams of the planner and of its workers, see `spawn_stream`
+        self._seed_sequence = np.random.SeedSequence(seed)
+        self._random = self.spawn_stream()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Stops pondering and shuts down the parallel workers, if any.
+        """
+        self._stop_pondering()
+        if self._parallel_search is not None:
+            self._parallel_search.close()
+            self._parallel_search = None
+
+    def spawn_stream(self):
+        """
+        :return: a new `RandomStream`, independent of the ones spawned before (for a worker thread of the planner)
+        """
+        return RandomStream.from_seed(self._seed_sequence.spawn(1)[0])
+
+    def worker_kwargs(self):
+        """
+        The arguments needed to build a copy of this planner in a worker process (besides the transition model and
+        the seed).
+        """
+        return {
+            'adversarial': self.adversarial,
+            'gamma': self.gamma,
+            'max_depth': self._max_depth,
+            'tree_backend': self._tree_backend,
+            'selection': self._selection_name,
+            'n_simulations': self._n_simulations,
+            'max_nodes': self._max_nodes,
+            'max_bytes': self._max_bytes,
+            'pruning': self._pruning,
+            'value_cache_size': self._value_cache_size,
+            'value_cache_samples': self._value_cache_samples,
+            'evaluator': self._evaluator,
+            'batch_size': self._batch_size,
+            'solver': self._solver,
+        }
+
+    def _step(self, action):
+        """
+        Steps the transition model during the search. If it supports undoing moves (see `BaseEnv.push`) the moves are
+        undone by `_restore`, instead of reloading a full backup of the state.
+        """
+        if self._undo:
+            self._depth += 1
+            return self.transition_model.push(action)
+        return self.transition_model.step(action)
+
+    def _checkpoint(self):
+        """
+        :return: a checkpoint of the state of the transition model, to be restored with `_restore`. It's either the
+            number of moves done so far with `_step` (if they can be undone) or a `backup()`
+        """
+        if self._undo:
+            return self._depth
+        return self.transition_model.backup()
+
+    def _restore(self, checkpoint):
+        if self._undo:
+            while self._depth > checkpoint:
+                self.transition_model.pop()
+                self._depth -= 1
+        else:
+            self.transition_model.load(checkpoint)
+
+    def _statistics(self, node):
+        """
+        :return: the score and the visits of `node`, net of the virtual losses of the tree-parallel workers
+        """
+        score, visits = node.score, node.visits
+        if self._pending_losses:
+            n = self._pending_losses.get(node.id, 0)
+            score, visits = score + n * self._virtual_loss, visits - n
+        return score, visits
 
     def _reset(self):
         self.t = None
         self.tree = self._build_tree()
 
-    def _build_tree(self):
-        return Tree(self.transition_model.legal_actions, self.transition_model.backup())
+    def _build_tree(self, legal_actions=None, root_data=None):
+        if legal_actions is None:
+            legal_actions = self.transition_model.legal_actions
+        if root_data is None:
+            root_data = self.transition_model.node_data()
+        return self._tree_backends[self._tree_backend](legal_actions, root_data)
 
     def _select(self):
         node = self.tree.root
+        # the nodes traversed in the current iteration, see `src.ai.parallel.TreeParallelSearch`
+        self._path = [node]
         while not node.is_leaf and node.is_fully_expanded:
-            node = self.select_ucb(node)
-            self.transition_model.step(node.action)
+            parent = node
+            node = self._selection(parent)
+            self._step(self.tree.edge_action(parent, node))
+            self._path.append(node)
             self.t += 1
         return node
 
+    def _expansion_action(self, node):
+        """
+        :return: the untried action of `node` with the highest prior, if it was evaluated by the evaluator, else a
+            random one
+        """
+        priors = node.priors if self._evaluator is not None else None
+        if priors is None:
+            return node.random_action(self._random)
+        return max(node.available_actions, key=lambda action: priors.get(action, 0.))
+
     def _expand(self, node):
-        random_action = node.random_action()
-        self.transition_model.step(random_action)
+        random_action = self._expansion_action(node)
+        self._step(random_action)
         new_node = self.tree.insert_node(node.id,
                                          random_action,
                                          self.transition_model.legal_actions,
-                                         self.transition_model.backup())
+                                         self.transition_model.node_data())
+        self._path.append(new_node)
         self.t += 1
 
         return new_node
 
     def _evaluate(self):
         ret = 0
+        choice = self._random.choice
         while True:
-            action = random.choice(self.transition_model.legal_actions)
-            _, r, d, _, _ = self.transition_model.step(action)
+            action = choice(self.transition_model.legal_actions)
+            _, r, d, _, _ = self._step(action)
             # sparse / non-sparse setting
             ret += r
             self.t += 1
@@ -68,107 +336,535 @@ class MCTS:
                 break
         return ret
 
+    def _evaluate_cached(self):
+        """
+        Same as `_evaluate`, but the rollout stops at the first state with a cached estimate (see `ValueCache`), which
+        is added to its return.
+        """
+        ret = 0
+        choice = self._random.choice
+        cache = self.value_cache
+        while True:
+            action = choice(self.transition_model.legal_actions)
+            _, r, d, _, _ = self._step(action)
+            ret += r
+            self.t += 1
+            if self.transition_model.t >= self._max_depth:
+                ret = 0
+                break
+            if d:
+                break
+            value = cache.truncate(self.transition_model.state_hash())
+            if value is not None:
+                return ret + value
+        return ret
+
     def _backpropagate_iter(self, node, score):
         while node is not None:
             node.visit()
             node.update_score(score)
             node = node.parent
 
-    def _backpropagate(self, node, score):
-        if node is None:
-            return
-        node: Node
+    def _rollouts(self):
+        """
+        Runs `n_simulations` rollouts from the current state.
+
+        :return: the sum of the returns
+        """
+        if getattr(self.transition_model, 'supports_batch_rollout', False):
+            return float(np.sum(self.transition_model.batch_rollout(self._n_simulations, self._max_depth,
+                                                                             self._random.generator)))
+
+        evaluate = self._evaluate if self.value_cache is None else self._evaluate_cached
+        ret = 0
+        for _ in range(self._n_simulations):
+            checkpoint = self._checkpoint()
+            ret += evaluate()
+            self._restore(checkpoint)
+        return ret
+
+    def _simulate(self, score):
+        """
+        :param score: the score of the node returned by `_tree_policy` (None if it has to be estimated)
+        :return: the total score to backpropagate and its weight, i.e. the number of visits
+        """
+        if score is None and self.value_cache is not None:
+            return self._simulate_cached()
+        if self._n_simulations == 1:
+            return (self._evaluate() if score is None else score), 1
+        if score is None:
+            return self._rollouts(), self._n_simulations
+        # NB: a terminal node weighs as much as the rollouts of a non-terminal one
+        return score * self._n_simulations, self._n_simulations
+
+    def _simulate_cached(self):
+        """
+        `_simulate` with the value cache: the cached mean of the current state, or its rollouts, which are added to the
+        cache.
+        """
+        key = self.transition_model.state_hash()
+        n = self._n_simulations
+        value = self.value_cache.estimate(key)
+        if value is not None:
+            return value * n, n
+        ret = self._evaluate_cached() if n == 1 else self._rollouts()
+        self.value_cache.update(key, ret, n)
+        return ret, n
+
+    def _backpropagate(self, node, score, visits=1):
+        """
+        Backs up `score` from `node` to the root, along the path traversed in the current iteration (see `_select`).
+        In a tree it's the chain of the parents of `node`, but a shared node (see `TranspositionTree`) has more than
+        one parent.
+        """
         if self.adversarial:
-            sign = -1
-            coeff = sign
+            coeff = -1
         else:
-            sign = 1
-            coeff = sign * self.gamma
+            coeff = self.gamma
+
+        i = len(self._path) - 1
+        while self._path[i] != node:
+            i -= 1
+
+        for n in reversed(self._path[:i + 1]):
+            n.update_score(score)
+            n.visit(visits)
+            score *= coeff
+
+    def _tree_policy(self):
+        """
+        Select and Expand.
+
+        :return: the last node of the path and its score, if already known (i.e. if the node is terminal), otherwise
+            None
+        """
+        # 1. SELECT
+        selected_node = self._select()
+
+        # NB: very uncommon in practice, the following lines handle small game trees where it's possible to reach a
+        # terminal state during the expansion phase
+
+        if selected_node.is_terminal:
+            return selected_node, selected_node.game_reward
+
+        # 2. EXPAND
+        expanded_node = self._expand(selected_node)
 
-        node.update_score(score)
-        node.visit()
-        self._backpropagate(node.parent, score * coeff)
+        if expanded_node.is_terminal:
+            return expanded_node, expanded_node.game_reward
+        return expanded_node, None
+
+    def _backup(self, terminal_node, score, visits=1):
+        # see the readme. A node has to keep its score with the sign needed by its parent node
+        sign = -1 if terminal_node.player == 'Agent' and self.adversarial else 1
+        self._backpropagate(terminal_node, score * sign, visits)
 
     def _plan_iteration(self):
         """
         The core of the MCTS algorithm, i.e. the sequence of the four steps: Select, Expand, Simulate, Backpropagate.
         """
         # save the game state
-        checkpoint = self.transition_model.backup()
+        checkpoint = self._checkpoint()
 
         self.t = 0
 
-        # 1. SELECT
-        selected_node = self._select()
+        # 1-2. SELECT and EXPAND
+        terminal_node, score = self._tree_policy()
 
-        # NB: very uncommon in practice, the following lines handle small game trees where it's possible to reach a
-        # terminal state during the expansion phase
+        # 3. SIMULATE
+        score, visits = self._simulate(score)
 
-        if not selected_node.is_terminal:
-            # 2. EXPAND
-            expanded_node = self._expand(selected_node)
-            terminal_node = expanded_node
+        # 4. BACKPROPAGATE
+        self._backup(terminal_node, score, visits)
 
-            if not expanded_node.is_terminal:
-                # 3. SIMULATE
-                score = self._evaluate()
+        # restore the game state
+        self._restore(checkpoint)
 
-            else:
-                score = expanded_node.game_reward
+    def _evaluator_iteration(self):
+        """
+        Same as `_plan_iteration`, but the leaf is queued for the evaluator (with a virtual loss on its path) instead of
+        being simulated. The queue is evaluated when it has `batch_size` leaves, see `_evaluate_pending`.
+        """
+        if self.tree.root.priors is None and not self.tree.root.is_terminal:
+            self._evaluate_root()
 
+        checkpoint = self._checkpoint()
+        self.t = 0
+
+        node, score = self._tree_policy()
+        if score is not None:
+            self._backup(node, score)
         else:
-            terminal_node = selected_node
-            score = selected_node.game_reward
+            add_virtual_loss(self._path, 1, self._virtual_loss, self._pending_losses)
+            self._pending_leaves.append((node,
+                                         self._path,
+                                         self._evaluator.features(self.transition_model),
+                                         self.transition_model.legal_actions))
 
-        # 4. BACKPROPAGATE
-        # see the readme. A node has to keep its score with the sign needed by its parent node
-        sign = -1 if terminal_node.player == 'Agent' and self.adversarial else 1
-        self._backpropagate(terminal_node, score * sign)
+        self._restore(checkpoint)
 
-        # restore the game state
-        self.transition_model.load(checkpoint)
+        if len(self._pending_leaves) >= self._batch_size:
+            self._evaluate_pending()
 
-    def plan(self, iterations_budget=None, time_budget=None):
+    @staticmethod
+    def _normalized_priors(priors, legal_actions):
         """
-        Run a bunch of `_plan_iteration`s until either the iterations budget or the time budget is reached.
+        :return: a dict {action: prior} over `legal_actions`, normalized to sum to 1 (uniform if they are all 0)
+        """
+        total = sum(priors[action] for action in legal_actions)
+        if total <= 0:
+            return dict.fromkeys(legal_actions, 1. / len(legal_actions))
+        return {action: float(priors[action]) / total for action in legal_actions}
 
-        :param iterations_budget: the maximum number of iterations to run
-        :param time_budget: the maximum available time for a single action (in seconds)
-        :return: the chosen action
+    def _evaluate_root(self):
+        priors, _ = self._evaluator.evaluate(self._evaluator.features(self.transition_model)[np.newaxis])
+        self.tree.root.priors = self._normalized_priors(priors[0], self.transition_model.legal_actions)
+
+    def _evaluate_pending(self):
+        """
+        Evaluates the queued leaves as a batch: their virtual losses are removed, their priors are set and their values
+        are backpropagated.
+        """
+        if not self._pending_leaves:
+            return
+        priors, values = self._evaluator.evaluate(np.stack([features for _, _, features, _ in self._pending_leaves]))
+        for (node, path, _, legal_actions), node_priors, value in zip(self._pending_leaves, priors, values):
+            add_virtual_loss(path, -1, self._virtual_loss, self._pending_losses)
+            node.priors = self._normalized_priors(node_priors, legal_actions)
+            self._path = path
+            self._backup(node, float(value))
+        # NB: cleared in place, the list is shared with the pondering thread (which doesn't run at the same time)
+        self._pending_leaves.clear()
+
+    def _solver_iteration(self):
+        """
+        `_plan_iteration` (or `_instrumented_iteration`), followed by the propagation of the proven values if the
+        iteration ended in a terminal node.
+        """
+        if self.stats is None:
+            self._plan_iteration()
+        else:
+            self._instrumented_iteration()
+        if self._path[-1].is_terminal:
+            self._prove(self._path)
+
+    def _proven_value(self, node):
+        """
+        :return: the proven value of `node` (with the sign of its score, i.e. for the player of its parent), or None.
+            It's proven if one of its children is a proven win for its player, or if all its children are proven
+        """
+        best = None
+        complete = node.is_fully_expanded
+        for child in node.children.values():
+            if child is None or child.proven is None:
+                complete = False
+                continue
+            if child.proven >= self._solver_win:
+                return -child.proven
+            best = child.proven if best is None else max(best, child.proven)
+        return -best if complete else None
+
+    def _prove(self, path):
+        """
+        Sets the proven value of the terminal node at the end of `path` (its reward, with the sign used by `_backup`)
+        and propagates it to the ancestors on the path, as long as they become proven.
+        """
+        node = path[-1]
+        if node.proven is None:
+            sign = -1 if node.player == 'Agent' else 1
+            node.proven = node.game_reward * sign
+        for parent in reversed(path[:-1]):
+            if parent.proven is not None:
+                break
+            value = self._proven_value(parent)
+            if value is None:
+                break
+            parent.proven = value
+
+    def _select_unsolved(self, parent):
+        """
+        The selection policy of the solver: the one of the planner, unless it chooses a solved child, in which case
+        the unsolved child with the highest UCB.
+        """
+        node = self._unsolved_selection(parent)
+        if node.proven is None:
+            return node
+        unsolved = [child for child in parent.children.values() if child is not None and child.proven is None]
+        if not unsolved:
+            # NB: `parent` may be solved without knowing it yet, e.g. a shared node whose children were solved through
+            # other paths
+            return node
+        return max(unsolved, key=lambda child: self._ucb(child, parent))
+
+    def _node_budget(self):
+        """
+        :return: the maximum number of nodes of the tree (see `max_nodes` and `max_bytes`), None if there is no limit
+        """
+        budgets = []
+        if self._max_nodes is not None:
+            budgets.append(self._max_nodes)
+        if self._max_bytes is not None:
+            budgets.append(int(self._max_bytes // self.tree.node_bytes()))
+        return min(budgets) if budgets else None
+
+    def _search(self, iterations_budget, time_budget, stop=None):
+        """
+        Runs `_plan_iteration`s until either the iterations budget or the time budget is reached.
+
+        :param stop: a `threading.Event` that interrupts the search when set, see `src.ai.pondering`
+        :return: the number of iterations
+        """
+        for iteration in self._search_iter(iterations_budget, time_budget, stop=stop):
+            pass
+        return iteration
+
+    def _instrumented_iteration(self):
         """
+        Same as `_plan_iteration` (with `_tree_policy` inlined), but it records the time of each phase and the counters
+        of the iteration in `stats`.
+        """
+        stats = self.stats
+        clock = time.perf_counter
+
+        stats.phase = 'checkpoint'
+        t0 = clock()
+        checkpoint = self._checkpoint()
+        self.t = 0
+        stats.phase = 'select'
+        t1 = clock()
+        stats.record('checkpoint', t0, t1)
+
+        node = self._select()
+        depth = self.t
+        stats.phase = 'expand'
+        t2 = clock()
+        stats.record('select', t1, t2)
+
+        n_created = self.tree.n_created
+        if node.is_terminal:
+            score = node.game_reward
+        else:
+            node = self._expand(node)
+            score = node.game_reward if node.is_terminal else None
+        stats.nodes_created += self.tree.n_created - n_created
+        steps = self.t
+        stats.phase = 'simulate'
+        t3 = clock()
+        stats.record('expand', t2, t3)
+
+        score, visits = self._simulate(score)
+        stats.rollout_steps += self.t - steps
+        stats.phase = 'backpropagate'
+        t4 = clock()
+        stats.record('simulate', t3, t4)
+
+        self._backup(node, score, visits)
+        stats.backup_path_length += len(self._path)
+        stats.phase = 'restore'
+        t5 = clock()
+        stats.record('backpropagate', t4, t5)
+
+        self._restore(checkpoint)
+        stats.phase = None
+        stats.record('restore', t5, clock())
+
+        stats.iterations += 1
+        stats.selection_depth += depth
+        stats.max_selection_depth = max(stats.max_selection_depth, depth)
+
+    def _search_iter(self, iterations_budget, time_budget, stop=None, interval=None):
+        """
+        Generator version of `_search`: yields the number of iterations run so far every `interval` seconds (if given)
+        and at the end of the search.
+
+        NB: the clock (a monotonic one) is read every K iterations, where K is adapted to the measured cost of an
+        iteration so that a batch takes at most a fraction of the time left before the deadline (or before the next
+        report). Hence the checks are cheap when the deadline is far, and the deadline is not overshot when it's near.
+        """
+        iteration = 0
+        max_nodes = self._node_budget()
+
+        start_time = time.perf_counter()
+        deadline = start_time + time_budget
+        next_report = start_time + interval if interval is not None else np.inf
+        batch = 1
+        last_check, last_iteration = start_time, 0
+        # NB: a solved root doesn't need any search
+        stopped = self._solver and self.tree.root.proven is not None
+        # NB: chosen once, so that the instrumentation costs nothing when it's disabled
+        if self._evaluator is not None:
+            plan_iteration = self._evaluator_iteration
+        elif self._solver:
+            plan_iteration = self._solver_iteration
+        elif self.stats is not None:
+            plan_iteration = self._instrumented_iteration
+        else:
+            plan_iteration = self._plan_iteration
+
+        while iteration < iterations_budget and not stopped:
+            for _ in range(int(min(batch, iterations_budget - iteration))):
+                if stop is not None and stop.is_set():
+                    stopped = True
+                    break
+                plan_iteration()
+                if max_nodes is not None and len(self.tree) > max_nodes:
+                    # NB: the discarded subtrees (see `Tree.keep_subtree`) are reclaimed only when over budget, and
+                    # they may be enough
+                    self.tree.reclaim()
+                    if len(self.tree) > max_nodes:
+                        # NB: the queued leaves may be pruned
+                        self._evaluate_pending()
+                        # NB: prune a bit more than needed, so that the (linear) cost of pruning is amortized over
+                        # many iterations
+                        self.tree.prune(int(max_nodes * self._prune_fraction), self._pruning)
+                iteration += 1
+                if self._solver and self.tree.root.proven is not None:
+                    stopped = True
+                    break
+
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            per_iteration = (now - last_check) / max(iteration - last_iteration, 1)
+            if now >= next_report:
+                self._evaluate_pending()
+                yield iteration
+                # NB: the time spent by the caller doesn't count as search time
+                now = time.perf_counter()
+                next_report = now + interval
+            last_check, last_iteration = now, iteration
+            time_left = min(deadline, next_report) - now
+            batch = int(max(1, min(self._max_check_interval, self._check_fraction * time_left / max(per_iteration, 1e-9))))
+
+        self._evaluate_pending()
+        yield iteration
+
+    def _plan_root_parallel(self, iterations_budget, time_budget):
+        if self._parallel_search is None:
+            self._parallel_search = RootParallelSearch(self, self._n_workers)
+
+        seeds = [int(s.generate_state(1)[0]) for s in self._seed_sequence.spawn(self._n_workers)]
+        statistics = self._parallel_search.run(self.transition_model.backup(), iterations_budget, time_budget, seeds)
+
+        # the trees of the workers are thrown away, so there is no subtree to keep
+        self._reset()
+        return best_action(statistics, self._random)
 
+    @staticmethod
+    def _budgets(iterations_budget, time_budget):
         if iterations_budget is None and time_budget is None:
             raise ValueError("Either iterations_budget or time_budget must be set")
         elif iterations_budget is None:
             iterations_budget = np.inf
         elif time_budget is None:
             time_budget = np.inf
+        return iterations_budget, time_budget
 
-        elapsed_time = 0
-        iteration = 0
+    def plan(self, iterations_budget=None, time_budget=None, return_stats=False):
+        """
+        Run a bunch of `_plan_iteration`s until either the iterations budget or the time budget is reached.
 
-        start_time = time.time()
+        In parallel mode (`n_workers` > 1) the iterations budget is shared by the workers, while each of them gets the
+        whole time budget.
 
-        while elapsed_time < time_budget and iteration < iterations_budget:
-            self._plan_iteration()
-            elapsed_time = time.time() - start_time
-            iteration += 1
+        :param iterations_budget: the maximum number of iterations to run
+        :param time_budget: the maximum available time for a single action (in seconds)
+        :param return_stats: if True, return also a snapshot of the `SearchStats` of this search (None if the
+            planner is not instrumented, and empty for the parallel searches)
+        :return: the chosen action (and the stats)
+        """
+        iterations_budget, time_budget = self._budgets(iterations_budget, time_budget)
+
+        self._stop_pondering()
+        if self.stats is not None:
+            self.stats.reset()
 
-        best_child = self.root_best_child()
+        if self._n_workers > 1 and self._parallelism == 'root':
+            action = self._plan_root_parallel(iterations_budget, time_budget)
+        else:
+            if self._n_workers > 1:
+                if self._parallel_search is None:
+                    self._parallel_search = TreeParallelSearch(self, self._n_workers, self._virtual_loss)
+                self._parallel_search.run(iterations_budget, time_budget)
+            else:
+                self._search(iterations_budget, time_budget)
+            action = self._commit(self.root_best_child())
+
+        if return_stats:
+            return action, None if self.stats is None else self.stats.copy()
+        return action
+
+    def plan_iter(self, iterations_budget=None, time_budget=None, interval=0.1):
+        """
+        Anytime version of `plan`: a generator that runs the search and yields a `SearchProgress` (the current best
+        action, the statistics of the root and the number of iterations so far) every `interval` seconds and at the
+        end of the search.
+
+        The search only runs while the caller asks for the next progress, and the caller can stop it early by closing
+        the generator (e.g. `contextlib.closing`). When the generator is exhausted or closed, the action of the last
+        yielded progress is chosen, as `plan` would do.
+
+        NB: only for sequential searches (`n_workers` = 1)
+        """
+        if self._n_workers > 1:
+            raise ValueError("plan_iter doesn't support parallel searches")
+        iterations_budget, time_budget = self._budgets(iterations_budget, time_budget)
+
+        self._stop_pondering()
+        if self.stats is not None:
+            self.stats.reset()
+
+        best_child = None
+        start_time = time.perf_counter()
+        try:
+            for iterations in self._search_iter(iterations_budget, time_budget, interval=interval):
+                best_child = self.root_best_child()
+                yield SearchProgress(self.tree.edge_action(self.tree.root, best_child),
+                                     self.root_statistics(),
+                                     iterations,
+                                     time.perf_counter() - start_time)
+        except GeneratorExit:
+            if best_child is not None:
+                self._commit(best_child)
+            raise
+        self._commit(best_child)
+
+    def _commit(self, best_child):
+        """
+        Plays the action of `best_child` in the tree (see `keep_subtree`), and starts pondering if needed.
+
+        :return: the action
+        """
+        # NB: read the action before re-rooting, which can invalidate the nodes of an array-backed tree
+        action = self.tree.edge_action(self.tree.root, best_child)
         if self._keep_subtree:
             self.tree.keep_subtree(best_child)
-            return best_child.action
+            if self._ponder and not self.tree.root.is_terminal:
+                self._start_pondering(action)
         else:
             del self.tree
             self._reset()
-            return best_child.action
+        return action
+
+    def _start_pondering(self, action):
+        if self._ponderer is None:
+            self._ponderer = Ponderer(self)
+        self._ponderer.start(action)
+
+    def _stop_pondering(self):
+        if self._ponderer is not None and self._ponderer.running:
+            self.ponder_iterations = self._ponderer.stop()
 
     def init_tree(self, legal_actions, root_data):
-        self.tree = Tree(root_legal_actions=legal_actions, root_data=root_data)
+        self.tree = self._build_tree(legal_actions, root_data)
 
     def opponent_action(self, action):
+        self._stop_pondering()
         if self.tree.root.is_leaf:
             self.tree.root.ply(action)
+        elif self.tree.root.children.get(action) is None:
+            # the move was never expanded: start from scratch (the transition model must have already played it)
+            self._reset()
         else:
             new_root = self.tree.root.children[action]
             self.tree.keep_subtree(new_root)
@@ -193,10 +889,62 @@ class MCTS:
 
     @staticmethod
     def select_ucb(parent):
-        scores = [(idx, MCTS._ucb(node, parent)) for idx, node in parent.children.items()]
+        # NB: with progressive widening (see `ChanceMCTS`) the parent may have unexpanded children
+        scores = [(idx, MCTS._ucb(node, parent)) for idx, node in parent.children.items() if node is not None]
         best_action = max(scores, key=lambda x: x[1])[0]
         return parent.children[best_action]
 
+    @staticmethod
+    def _puct(node, parent, prior, c=1.5):
+        """
+        Calculates the PUCT score (the UCB variant of AlphaZero, weighted by the prior of the action).
+        :param node: the node for which it calculates the score
+        :param parent: the parent node of `node`
+        :param prior: the prior probability of the action of `node`
+        :param c: the coefficient of the formula
+        """
+        exploitation = node.score / node.visits if node.visits else 0
+        exploration = prior * math.sqrt(parent.visits) / (1 + node.visits)
+        return exploitation + c * exploration
+
+    @staticmethod
+    def select_puct(parent):
+        """
+        Same as `select_ucb`, with the PUCT score: the priors are the ones of the evaluator (uniform if `parent` wasn't
+        evaluated).
+        """
+        children = parent.children
+        priors = parent.priors
+        uniform = 1. / len(children)
+        scores = [(idx, MCTS._puct(node, parent, uniform if priors is None else priors.get(idx, 0.)))
+                  for idx, node in children.items() if node is not None]
+        best_action = max(scores, key=lambda x: x[1])[0]
+        return children[best_action]
+
+    def root_statistics(self):
+        """
+        :return: a dict {action: (visits, score)} with the statistics of the children of the root
+        """
+        return {action: (child.visits, child.score) for action, child in self.tree.root.children.items()
+                if child is not None}
+
+    def _proof_rank(self, node):
+        if node.proven is None:
+            return 1
+        if node.proven >= self._solver_win:
+            return 2
+        return 0 if node.proven <= -self._solver_win else 1
+
     def root_best_child(self):
-        children_list = list(self.tree.root.children.values())
-        return sorted(children_list, key=cmp_to_key(Node.node_cmp))[0]
+        """
+        :return: the most visited child of the root, then the one with the highest score, ties are broken randomly
+            with the random stream of the planner. With the solver, the proven wins come first and the proven losses
+            last
+        """
+        children = [child for child in self.tree.root.children.values() if child is not None]
+        if self._solver:
+            # NB: the proven wins first, the proven losses last
+            best_rank = max(map(self._proof_rank, children))
+            children = [child for child in children if self._proof_rank(child) == best_rank]
+        best = max((child.visits, child.score) for child in children)
+        return self._random.choice([child for child in children if (child.visits, child.score) == best])
@@ -0,0 +1,188 @@
+"""
+Parallelization of `MCTS`.
+
+Root parallelization (`RootParallelSearch`): N worker processes build independent trees from the same root state, each
+with its own seed, and the statistics of the children of the roots are merged before choosing the action.
+Each worker receives a copy of the transition model once, when the pool is created. Before every search it is brought
+to the current state of the game with `load()`, using a checkpoint taken with `backup()`.
+
+Tree parallelization (`TreeParallelSearch`): N worker threads run the four phases of `MCTS._plan_iteration` on the
+tree of the planner. Selection, expansion and backpropagation hold a lock, while the simulations run concurrently, each
+worker on its own copy of the transition model. A virtual loss is added to the nodes on the path of a worker until its
+result is backpropagated, so that the other workers are steered towards different paths.
+
+NB: the whole tree (not only the statistics) is shared and modified by the workers, which is why threads are used
+instead of processes. On an interpreter with the GIL the simulations do not actually run in parallel, so the speedup
+can only be observed on a free-threaded build (see `benchmarks/tree_parallel.py`).
+"""
+import copy
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# the state of a worker process, see `_init_worker`
+_worker = {}
+
+
+def _init_worker(planner_class, transition_model, planner_kwargs):
+    _worker['planner_class'] = planner_class
+    _worker['transition_model'] = transition_model
+    _worker['planner_kwargs'] = planner_kwargs
+
+
+def _search(checkpoint, iterations_budget, time_budget, seed):
+    """
+    Runs a search from `checkpoint` in a worker process and returns the statistics of the children of the root.
+    """
+    transition_model = _worker['transition_model']
+    transition_model.load(checkpoint)
+    planner = _worker['planner_class'](transition_model, seed=seed, keep_subtree=False, **_worker['planner_kwargs'])
+    planner._search(iterations_budget, time_budget)
+    return planner.root_statistics()
+
+
+def split_budget(iterations_budget, n_workers):
+    """
+    Splits an iterations budget as evenly as possible among `n_workers`.
+    """
+    if iterations_budget == np.inf:
+        return [np.inf] * n_workers
+    iterations_budget = int(iterations_budget)
+    return [iterations_budget // n_workers + (1 if i < iterations_budget % n_workers else 0) for i in range(n_workers)]
+
+
+def merge_statistics(statistics):
+    """
+    Sums the visits and the scores of each root action over the results of the workers.
+
+    :param statistics: a list of dicts {action: (visits, score)}
+    :return: a dict {action: (visits, score)}
+    """
+    merged = {}
+    for worker_statistics in statistics:
+        for action, (visits, score) in worker_statistics.items():
+            total_visits, total_score = merged.get(action, (0, 0))
+            merged[action] = (total_visits + visits, total_score + score)
+    return merged
+
+
+def best_action(statistics, rng=random):
+    """
+    Same criterion as `MCTS.root_best_child`: the most visited action, then the highest score, ties are broken
+    randomly.
+
+    :param rng: the source of the tie-breaks, anything with a `choice` method (e.g. a `RandomStream`)
+    """
+    best = max(statistics.values())
+    return rng.choice([action for action, stats in statistics.items() if stats == best])
+
+
+def add_virtual_loss(path, n, virtual_loss, pending_losses):
+    """
+    Adds `n` virtual losses (removes them if `n` is negative) to the nodes of `path`, i.e. `n` visits with a score of
+    `-virtual_loss`, and keeps track of them in `pending_losses` ({node id: number of virtual losses}), see
+    `MCTS._statistics`.
+    """
+    for node in path:
+        if not node.is_chance:
+            node.update_score(-n * virtual_loss)
+        node.visit(n)
+        pending = pending_losses.get(node.id, 0) + n
+        if pending:
+            pending_losses[node.id] = pending
+        else:
+            del pending_losses[node.id]
+
+
+class RootParallelSearch:
+    """
+    A pool of worker processes that run independent searches for a planner.
+    """
+
+    def __init__(self, planner, n_workers):
+        self.n_workers = n_workers
+        self._executor = ProcessPoolExecutor(max_workers=n_workers,
+                                             initializer=_init_worker,
+                                             initargs=(type(planner),
+                                                       planner.transition_model,
+                                                       planner.worker_kwargs()))
+
+    def run(self, checkpoint, iterations_budget, time_budget, seeds):
+        budgets = split_budget(iterations_budget, self.n_workers)
+        futures = [self._executor.submit(_search, checkpoint, budget, time_budget, seed)
+                   for budget, seed in zip(budgets, seeds) if budget > 0]
+        return merge_statistics([future.result() for future in futures])
+
+    def close(self):
+        self._executor.shutdown()
+
+
+class TreeParallelSearch:
+    """
+    A pool of worker threads that search the tree of a planner.
+    """
+
+    def __init__(self, planner, n_workers, virtual_loss=1):
+        self.n_workers = n_workers
+        self.virtual_loss = virtual_loss
+        self._planner = planner
+        self._lock = threading.Lock()
+        self._iterations = 0
+        self._pending_losses = {}
+        # NB: shallow copies, the tree is (re)assigned before each search
+        self._workers = []
+        for _ in range(n_workers):
+            worker = copy.copy(planner)
+            worker.transition_model = copy.deepcopy(planner.transition_model)
+            worker._pending_losses = self._pending_losses
+            worker._random = planner.spawn_stream()
+            self._workers.append(worker)
+
+    def _add_virtual_loss(self, path, n):
+        add_virtual_loss(path, n, self.virtual_loss, self._pending_losses)
+
+    def _iteration(self, worker):
+        checkpoint = worker._checkpoint()
+        worker.t = 0
+
+        with self._lock:
+            terminal_node, score = worker._tree_policy()
+            path = worker._path
+            self._add_virtual_loss(path, 1)
+
+        score, visits = worker._simulate(score)
+
+        with self._lock:
+            self._add_virtual_loss(path, -1)
+            worker._backup(terminal_node, score, visits)
+
+        worker._restore(checkpoint)
+
+    def _work(self, worker, iterations_budget, time_budget, start_time):
+        while time.perf_counter() - start_time < time_budget:
+            with self._lock:
+                if self._iterations >= iterations_budget:
+                    return
+                self._iterations += 1
+            self._iteration(worker)
+
+    def run(self, iterations_budget, time_budget):
+        for worker in self._workers:
+            worker.tree = self._planner.tree
+            # NB: a checkpoint for each worker, `load()` may not copy it
+            worker.transition_model.load(self._planner.transition_model.backup())
+
+        self._iterations = 0
+        start_time = time.perf_counter()
+        threads = [threading.Thread(target=self._work, args=(worker, iterations_budget, time_budget, start_time))
+                   for worker in self._workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        self._workers = []
@@ -0,0 +1,68 @@
+"""
+Pondering: while the opponent is thinking, a background thread keeps searching the tree of the planner from the state
+reached by the last action of the agent. When the opponent moves, the thread is stopped (after its current iteration)
+and `MCTS.opponent_action` keeps the subtree of the move, so that the next `plan` starts from the statistics gathered
+in the meantime.
+
+NB: the thread searches on its own copy of the transition model, since the game may step the one of the planner while
+the opponent is thinking (see `main.py`).
+"""
+import copy
+import threading
+
+import numpy as np
+
+
+class Ponderer:
+    """
+    A background thread that runs `MCTS._search` on the tree of a planner until it's stopped.
+    """
+
+    def __init__(self, planner):
+        self._planner = planner
+        self._stop = threading.Event()
+        self._thread = None
+        self.iterations = 0
+        # NB: a shallow copy, the tree is (re)assigned by `start`
+        self._worker = copy.copy(planner)
+        self._worker.transition_model = copy.deepcopy(planner.transition_model)
+        self._worker._random = planner.spawn_stream()
+        # NB: the stats are the ones of the searches of `plan`
+        self._worker.stats = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, action):
+        """
+        Starts pondering on the tree of the planner, whose root must be the state reached by playing `action` from the
+        current state of the transition model of the planner.
+        """
+        assert not self.running
+        worker = self._worker
+        worker.tree = self._planner.tree
+        # NB: a fresh checkpoint, `load()` may not copy it
+        worker.transition_model.load(self._planner.transition_model.backup())
+        worker.transition_model.step(action)
+        worker._depth = 0
+
+        self.iterations = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self.iterations = self._worker._search(np.inf, np.inf, stop=self._stop)
+
+    def stop(self):
+        """
+        Stops pondering and waits for the current iteration to finish.
+
+        :return: the number of iterations run since `start`
+        """
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.iterations
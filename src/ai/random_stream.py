@@ -0,0 +1,58 @@
+"""
+Random draws of the planners.
+
+Each planner owns a `np.random.Generator`, derived from its seed with a `np.random.SeedSequence`, instead of using the
+global `random` and `np.random` modules: two planners in the same process don't interfere, and the workers of a
+parallel search get independent streams spawned from the one of the planner (see `MCTS.spawn_stream`).
+
+Calling the generator for each draw would be slower than `random.choice`, hence `RandomStream` prefetches the uniform
+draws in bulk and serves them from a Python list.
+"""
+import numpy as np
+
+
+class RandomStream:
+    """
+    Uniform draws from a `np.random.Generator`, prefetched `buffer_size` at a time. It has the same `choice` and `random`
+    methods as the `random` module, hence it can replace it (e.g. in `Node.random_action`).
+
+    NB: not thread-safe, each thread needs its own stream.
+    """
+
+    def __init__(self, generator, buffer_size=4096):
+        self.generator = generator
+        self._buffer_size = buffer_size
+        self._buffer = []
+
+    @classmethod
+    def from_seed(cls, seed, buffer_size=4096):
+        """
+        :param seed: anything accepted by `np.random.default_rng`, e.g. an int or a `np.random.SeedSequence`
+        """
+        return cls(np.random.default_rng(seed), buffer_size)
+
+    def _refill(self):
+        # NB: a list of Python floats, indexing an array would create a numpy scalar for each draw. The draws are
+        # popped from the end, hence the buffer is reversed to serve them in the order of the generator
+        self._buffer = self.generator.random(self._buffer_size).tolist()[::-1]
+
+    def random(self):
+        """
+        :return: a float in [0, 1)
+        """
+        try:
+            return self._buffer.pop()
+        except IndexError:
+            self._refill()
+            return self._buffer.pop()
+
+    def choice(self, seq):
+        """
+        :return: a uniformly chosen element of the non-empty sequence `seq`
+        """
+        try:
+            u = self._buffer.pop()
+        except IndexError:
+            self._refill()
+            u = self._buffer.pop()
+        return seq[int(u * len(seq))]
@@ -0,0 +1,106 @@
+"""
+Leaf value cache (see the `value_cache_size` argument of `MCTS`).
+
+In small state spaces the rollouts keep starting from the same states. The cache keeps, for each state (keyed by
+`BaseEnv.state_hash`), the running mean of the returns of the rollouts that started from it. Once a state has
+`min_samples` returns:
+- a leaf in that state is evaluated with the cached mean instead of running its rollouts
+- a rollout that reaches that state stops there, and the cached mean is added to its return
+
+NB: the mean is the expected return of the random policy, which doesn't change during the search, hence the cache is
+kept across the plans. It ignores the step counter, i.e. the truncation of the rollouts at `max_depth`.
+"""
+from operator import itemgetter
+
+from src.tree.transposition_tree import TranspositionTable
+
+
+class ValueCache:
+    """
+    A bounded map {state hash: [sum of the returns, number of returns]}, stored in a `TranspositionTable` (hence with
+    the same eviction policies, 'least_visited' evicting the state with the fewest returns).
+
+    The counters: `hits` and `misses` are the lookups of the leaves (see `estimate`), `truncations` the rollouts
+    shortened by a cached state (see `truncate`), `evictions` the states evicted to make room for new ones.
+    """
+
+    def __init__(self, max_size, min_samples=16, eviction='lru'):
+        if min_samples < 1:
+            raise ValueError("min_samples must be positive")
+        self._table = TranspositionTable(max_size, eviction, visits=itemgetter(1))
+        self.min_samples = min_samples
+        self.hits = 0
+        self.misses = 0
+        self.truncations = 0
+
+    def __repr__(self):
+        return (f"ValueCache(size={len(self)}, max_size={self.max_size}, hits={self.hits}, misses={self.misses}, "
+                f"truncations={self.truncations}, evictions={self.evictions})")
+
+    def __len__(self):
+        return len(self._table)
+
+    @property
+    def max_size(self):
+        return self._table.max_size
+
+    @property
+    def evictions(self):
+        return self._table.evictions
+
+    def peek(self, key):
+        """
+        :return: the mean return of the state `key`, if it has at least `min_samples` returns, else None. It doesn't
+            change the counters nor the LRU order
+        """
+        entry = self._table.peek(key)
+        if entry is None or entry[1] < self.min_samples:
+            return None
+        return entry[0] / entry[1]
+
+    def estimate(self, key):
+        """
+        Same as `peek`, but the lookup is counted in `hits` or `misses`.
+        """
+        value = self.peek(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def truncate(self, key):
+        """
+        Same as `peek`, for the states reached by a rollout: if the state has an estimate, the rollout stops there and
+        it's counted in `truncations`.
+        """
+        value = self.peek(key)
+        if value is not None:
+            self.truncations += 1
+        return value
+
+    def update(self, key, total, n=1):
+        """
+        Adds `n` returns, whose sum is `total`, to the state `key`.
+        """
+        entry = self._table.get(key)
+        if entry is None:
+            self._table.put(key, [total, n])
+        else:
+            entry[0] += total
+            entry[1] += n
+
+    def statistics(self):
+        """
+        :return: a dict with the size of the cache and the counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'truncations': self.truncations,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.,
+        }
@@ -0,0 +1,354 @@
+"""
+Planning server: an asyncio TCP service that keeps a planner (and its tree) for each game session.
+
+Framing: every message is a JSON object, preceded by its length as a 4-byte big-endian unsigned integer. A message can't
+be longer than `DATASIZE` bytes.
+
+Requests (the responses always have "ok", and "error" if it's false):
+- {"op": "new", "game": "tictactoe" | "frozenlake" | "hanoi", "options": {...}, "planner": {...}}
+  -> {"ok": true, "session": id, "legal_actions": [...]}
+  `options` are the options of the game (see `_GAMES`), `planner` the keyword arguments of the planner (see
+  `_PLANNER_OPTIONS`)
+- {"op": "plan", "session": id, "time_budget": seconds, "iterations_budget": n}
+  -> {"ok": true, "action": a, "reward": r, "done": d, "legal_actions": [...]}
+  the planner chooses an action, which is played in the game of the session. The time budget is capped by the
+  `max_time_budget` of the server
+- {"op": "move", "session": id, "action": a} -> {"ok": true, "reward": r, "done": d, "legal_actions": [...]}
+  the opponent plays `a` (adversarial games only)
+- {"op": "close", "session": id} -> {"ok": true}
+
+The sessions that are still open when the connection that created them is closed are closed too, hence a client that
+disconnects (or crashes) doesn't leave its trees in the workers.
+
+The sessions are spread over `n_workers` worker processes, and a session always lives in the same one (its tree can't
+be moved across processes cheaply). The requests of a connection are served one at a time and at most `max_pending`
+requests are run by the workers at the same time: the other connections are not read until there is room, so the
+clients are slowed down by TCP flow control instead of piling up requests in the server.
+
+Usage: python -m src.server [n_workers]
+"""
+import asyncio
+import itertools
+import json
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.hanoi_env import TowersOfHanoiEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src.ai.chance_mcts import ChanceMCTS
+from src.ai.mcts import MCTS
+from src.constants import HOST, PORT, DATASIZE
+
+_HEADER = struct.Struct('>I')
+
+# the planner options that a client can set
+_PLANNER_OPTIONS = ('seed', 'gamma', 'max_depth', 'tree_backend', 'selection', 'n_simulations', 'max_nodes',
+                    'value_cache_size', 'solver')
+
+
+class FrameError(Exception):
+    """
+    A message that doesn't respect the framing of the server.
+    """
+    pass
+
+
+def encode(message):
+    """
+    :return: the frame of `message`, i.e. its length followed by its JSON encoding
+    """
+    payload = json.dumps(message, separators=(',', ':')).encode()
+    if len(payload) > DATASIZE:
+        raise FrameError(f"Message too long: {len(payload)} > {DATASIZE} bytes")
+    return _HEADER.pack(len(payload)) + payload
+
+
+async def read_message(reader):
+    """
+    Reads a frame from an `asyncio.StreamReader`.
+
+    :return: the decoded message, or None if the connection was closed before a new frame
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    size, = _HEADER.unpack(header)
+    if size > DATASIZE:
+        raise FrameError(f"Message too long: {size} > {DATASIZE} bytes")
+    try:
+        message = json.loads(await reader.readexactly(size))
+    except ValueError as e:
+        raise FrameError(f"Invalid message: {e}")
+    if not isinstance(message, dict):
+        raise FrameError("A message must be a JSON object")
+    return message
+
+
+# the games: name -> function of the options that returns the environment, the planner class and its default arguments
+
+def _tictactoe(options):
+    env = TicTacToeEnv()
+    env.reset(human_first=options.get('human_first', True), seed=options.get('seed'))
+    return env, MCTS, {}
+
+
+def _frozenlake(options):
+    env = MyFrozenLakeEnv(is_slippery=options.get('is_slippery', True), map_name=options.get('map_name', '4x4'))
+    env.reset(seed=options.get('seed'))
+    return env, ChanceMCTS, {'max_depth': 100}
+
+
+def _hanoi(options):
+    env = TowersOfHanoiEnv(num_disks=options.get('num_disks', 3))
+    env.reset()
+    # NB: see the docstring of `TowersOfHanoiEnv`
+    return env, MCTS, {'adversarial': False, 'gamma': 0.95, 'max_depth': 100}
+
+
+_GAMES = {
+    'tictactoe': _tictactoe,
+    'frozenlake': _frozenlake,
+    'hanoi': _hanoi,
+}
+
+# the sessions of a worker process: id -> (environment, planner)
+_sessions = {}
+
+
+def _new_session(session_id, game, options, planner_options):
+    if game not in _GAMES:
+        raise ValueError(f"Unknown game: {game}")
+    unknown = set(planner_options) - set(_PLANNER_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown planner options: {sorted(unknown)}")
+    env, planner_class, kwargs = _GAMES[game](options)
+    kwargs.update(planner_options)
+    _sessions[session_id] = env, planner_class(env, **kwargs)
+    return {'legal_actions': _legal_actions(env)}
+
+
+def _legal_actions(env):
+    return [int(a) for a in env.legal_actions]
+
+
+def _session(session_id):
+    try:
+        return _sessions[session_id]
+    except KeyError:
+        raise ValueError(f"Unknown session: {session_id}")
+
+
+def _plan(session_id, iterations_budget, time_budget):
+    env, agent = _session(session_id)
+    if env.done:
+        raise ValueError("The game is over")
+    action = int(agent.plan(iterations_budget=iterations_budget, time_budget=time_budget))
+    obs, reward, done, _, _ = env.step(action)
+    if isinstance(agent, ChanceMCTS):
+        agent.determinize_chance_node(obs)
+    return {'action': action, 'reward': float(reward), 'done': bool(done), 'legal_actions': _legal_actions(env)}
+
+
+def _move(session_id, action):
+    env, agent = _session(session_id)
+    if not agent.adversarial:
+        raise ValueError("There is no opponent in this game")
+    if env.done:
+        raise ValueError("The game is over")
+    if action not in env.legal_actions:
+        raise ValueError(f"Illegal action: {action}")
+    _, reward, done, _, _ = env.step(action)
+    agent.opponent_action(action)
+    return {'reward': float(reward), 'done': bool(done), 'legal_actions': _legal_actions(env)}
+
+
+def _close(session_id):
+    _, agent = _sessions.pop(session_id, (None, None))
+    if agent is not None:
+        agent.close()
+    return {}
+
+
+class PlanningServer:
+    """
+    See the module docstring.
+    """
+
+    def __init__(self, host=HOST, port=PORT, n_workers=1, max_pending=None, max_time_budget=10.,
+                 default_time_budget=1.):
+        """
+        :param max_pending: the maximum number of requests run by the workers at the same time (by default, twice the
+            number of workers, so that a worker always has a request queued)
+        :param max_time_budget: the maximum time budget (in seconds) of a plan request
+        :param default_time_budget: the time budget of a plan request that doesn't set a budget
+        """
+        self.host = host
+        self.port = port
+        self.max_time_budget = max_time_budget
+        self.default_time_budget = default_time_budget
+        self._workers = [ProcessPoolExecutor(max_workers=1) for _ in range(n_workers)]
+        self._pending = asyncio.Semaphore(max_pending if max_pending is not None else 2 * n_workers)
+        self._session_ids = itertools.count()
+        # session id -> (worker, lock), the requests of a session are run in order
+        self._sessions = {}
+        self._server = None
+        # the writers and the handlers of the open connections, see `close`
+        self._connections = {}
+
+    async def start(self):
+        # NB: the worker processes are started before accepting connections: a worker forked later would inherit the
+        # sockets of the open connections, which would stay open after being closed by the server or by the client
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(worker, int) for worker in self._workers))
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # NB: the actual port, if 0 was given
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        # NB: closing the transports lets the handlers finish normally (cancelling them would lose their responses)
+        for writer in self._connections:
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        for worker in self._workers:
+            worker.shutdown()
+
+    async def _handle_connection(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        # the sessions created by this connection and not closed yet
+        sessions = set()
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except FrameError as e:
+                    # NB: the stream can't be resynchronized
+                    writer.write(encode({'ok': False, 'error': str(e)}))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                writer.write(encode(await self._handle_request(request, sessions)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            await self._close_sessions(sessions)
+            del self._connections[writer]
+            writer.close()
+
+    async def _close_sessions(self, session_ids):
+        """
+        Closes the sessions `session_ids` that are still open, e.g. the ones of a closed connection.
+        """
+        session_ids = [session_id for session_id in session_ids if session_id in self._sessions]
+        # NB: a session that fails to close is dropped anyway
+        await asyncio.gather(*(self._run(session_id, _close, session_id) for session_id in session_ids),
+                             return_exceptions=True)
+        for session_id in session_ids:
+            self._sessions.pop(session_id, None)
+
+    async def _handle_request(self, request, sessions):
+        """
+        :param sessions: the set of the open sessions of the connection, updated by the 'new' and 'close' requests
+        """
+        try:
+            op = request.get('op')
+            if op == 'new':
+                session_id = next(self._session_ids)
+                worker = self._workers[session_id % len(self._workers)]
+                self._sessions[session_id] = worker, asyncio.Lock()
+                try:
+                    response = await self._run(session_id, _new_session, session_id, request.get('game'),
+                                               request.get('options', {}), request.get('planner', {}))
+                except Exception:
+                    self._sessions.pop(session_id, None)
+                    raise
+                sessions.add(session_id)
+                response['session'] = session_id
+            elif op == 'plan':
+                iterations_budget = request.get('iterations_budget')
+                time_budget = request.get('time_budget')
+                if time_budget is None and iterations_budget is None:
+                    time_budget = self.default_time_budget
+                time_budget = min(time_budget if time_budget is not None else float('inf'), self.max_time_budget)
+                response = await self._run(request.get('session'), _plan, request.get('session'),
+                                           iterations_budget, time_budget)
+            elif op == 'move':
+                response = await self._run(request.get('session'), _move, request.get('session'), request.get('action'))
+            elif op == 'close':
+                response = await self._run(request.get('session'), _close, request.get('session'))
+                # NB: the session may have been closed by another request in the meantime
+                self._sessions.pop(request['session'], None)
+                sessions.discard(request['session'])
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            # NB: also the errors raised by the environments and by the planners, a bad request must not take down the
+            # connection
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        response['ok'] = True
+        return response
+
+    async def _run(self, session_id, f, *args):
+        """
+        Runs `f(*args)` in the worker of the session, after the previous requests of the same session.
+        """
+        if session_id not in self._sessions:
+            raise ValueError(f"Unknown session: {session_id}")
+        worker, lock = self._sessions[session_id]
+        loop = asyncio.get_running_loop()
+        async with lock, self._pending:
+            return await loop.run_in_executor(worker, f, *args)
+
+
+class PlanningClient:
+    """
+    A minimal asyncio client of `PlanningServer`, see `benchmarks/server_load.py`.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, host=HOST, port=PORT):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, **message):
+        self._writer.write(encode(message))
+        await self._writer.drain()
+        response = await read_message(self._reader)
+        if response is None:
+            raise ConnectionError("The server closed the connection")
+        return response
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def _main(n_workers=1):
+    server = PlanningServer(n_workers=n_workers)
+    await server.start()
+    print(f"Serving on {server.host}:{server.port} with {n_workers} workers")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(_main(*map(int, sys.argv[1:])))
@@ -0,0 +1,232 @@
+from collections import deque
+
+import numpy as np
+
+from src.tree.array_tree import ArrayTree, ArrayNode, USED, EMPTY, REMOVED
+from src.tree.transposition_tree import TranspositionTable, transposition_key
+
+
+class ArrayChanceNode(ArrayNode):
+    """
+    View over a chance node of an `ArrayChanceTree`, see `ChanceNode`.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"Chance(visits={self.visits}, score={self.score}, action={self.action})"
+
+    def __str__(self):
+        return f"Chance(visits={self.visits}, score=n.a., action={self.action})"
+
+    def add_child(self, child):
+        self._tree._link_child(self._id, child)
+
+    def update_score(self, score):
+        raise RuntimeError
+
+    @property
+    def score(self):
+        # see `ChanceNode.score`
+        children = [n for n in self.children.values() if n is not None]
+        children_visits = sum(n.visits for n in children)
+        if children_visits == 0:
+            return 0
+        return self.visits * sum(n.score for n in children) / children_visits
+
+    @property
+    def is_chance(self):
+        return True
+
+
+class ArrayChoiceNode(ArrayNode):
+    """
+    View over a choice node of an `ArrayChanceTree`, see `ChoiceNode`. The first parent is stored in the arrays, the
+    other ones (transpositions) in a side table of the tree.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"Choice(visits={self.visits}, score={self.score}, state={self.action})"
+
+    def __str__(self):
+        return f"Choice(visits={self.visits}, score=n.a., state={self.action})"
+
+    def add_parent(self, parent):
+        self._tree._extra_parents.setdefault(self._id, []).append(parent.id)
+
+    @property
+    def parent(self):
+        raise RuntimeError
+
+    @property
+    def parents(self):
+        return {parent_id: self._tree._view(parent_id) for parent_id in self._tree._parent_ids(self._id)}
+
+    @property
+    def is_root(self):
+        return len(self._tree._parent_ids(self._id)) == 0
+
+
+class ArrayChanceTree(ArrayTree):
+    """
+    Array-backed version of `ChanceTree`. A choice node reached through a transposition is linked into the children
+    block of its additional parents: the slot just points (`_link`) to the slot that holds the node.
+    """
+
+    _fields = ArrayTree._fields + (
+        ('_chance', np.bool_),
+        ('_link', np.int64),
+    )
+
+    def __init__(self, root_legal_actions, root_data, capacity=1024, max_choice_nodes=None, eviction='lru'):
+        """
+        :param max_choice_nodes: see `ChanceTree`
+        :param eviction: see `ChanceTree`
+        """
+        # NB: the index refers to the choice nodes by id
+        self._choice_nodes = TranspositionTable(max_choice_nodes, eviction, visits=lambda i: self._visits[i])
+        self._extra_parents = dict()
+        super().__init__(root_legal_actions, root_data, capacity)
+
+    def __repr__(self):
+        return f"ArrayChanceTree(nodes={self._n_nodes}, capacity={self._capacity})"
+
+    def _reset_slots(self, start, count, parent):
+        super()._reset_slots(start, count, parent)
+        self._chance[start:start + count] = False
+        self._link[start:start + count] = -1
+
+    @property
+    def choice_nodes(self):
+        """
+        See `ChanceTree.choice_nodes`. The values are node ids.
+        """
+        return self._choice_nodes
+
+    def _view(self, node_id):
+        if self._chance[node_id]:
+            return ArrayChanceNode(self, node_id)
+        return ArrayChoiceNode(self, node_id)
+
+    def _node_at(self, slot):
+        link = self._link[slot]
+        return self._view(int(link) if link >= 0 else slot)
+
+    def _child_arrays(self, node_id):
+        # the children may be links or chance nodes, whose score is not stored
+        children = [child for child in self._children(node_id).values() if child is not None]
+        visits = np.fromiter((child.visits for child in children), dtype=np.float64, count=len(children))
+        scores = np.fromiter((child.score for child in children), dtype=np.float64, count=len(children))
+        return children, visits, scores
+
+    def _parent_ids(self, node_id):
+        parent_id = int(self._parent[node_id])
+        if parent_id < 0:
+            return []
+        return [parent_id] + self._extra_parents.get(node_id, [])
+
+    def _link_child(self, node_id, child):
+        slot = self._action_slot(node_id, child.action)
+        assert self._slot[slot] == EMPTY
+        self._slot[slot] = USED
+        self._link[slot] = child.id
+        self._n_expanded[node_id] += 1
+        self._n_available[node_id] -= 1
+
+    def insert_node(self, parent_id, action, legal_actions, node_data, chance=None):
+        assert chance is not None
+        slot = self._insert(parent_id, action, legal_actions, node_data)
+        self._chance[slot] = chance
+        if not chance:
+            self._choice_nodes.put(transposition_key(node_data), slot)
+        return self._view(slot)
+
+    def get_choice_node_if_existing(self, node_data):
+        node_id = self._choice_nodes.get(transposition_key(node_data))
+        return None if node_id is None else self._view(node_id)
+
+    def delete_subtree(self, node, parent=None):
+        if parent is None:
+            parent = node.parent
+        slot = self._action_slot(parent.id, node.action)
+        assert self._slot[slot] == USED
+        self._slot[slot] = REMOVED
+        self._n_expanded[parent.id] -= 1
+        # nodes of the subtree may still be reachable through a transposition
+        reachable = set(self._reachable(0))
+        self._n_nodes = len(reachable)
+        self._choice_nodes.remap(lambda i: i if i in reachable else None)
+        self._extra_parents = {i: [p for p in parents if p in reachable]
+                               for i, parents in self._extra_parents.items() if i in reachable}
+
+    def _reachable(self, node_id):
+        order = [node_id]
+        seen = {node_id}
+        queue = deque(order)
+        while queue:
+            n = queue.popleft()
+            start = self._child_start[n]
+            if start < 0:
+                continue
+            for slot in range(start, start + int(self._legal_count[n])):
+                if self._slot[slot] != USED:
+                    continue
+                child = int(self._link[slot]) if self._link[slot] >= 0 else slot
+                if child not in seen:
+                    seen.add(child)
+                    order.append(child)
+                    queue.append(child)
+        return order
+
+    def _compact(self, new_root):
+        """
+        Same as `ArrayTree._compact`, but the structure is a DAG: the first slot (in breadth-first order) that refers
+        to a node becomes its new home, the other ones become links to it.
+        """
+        mapping = np.full(self._size, -1, dtype=np.int64)
+        mapping[new_root] = 0
+        old_index, parents, links = [new_root], [-1], [-1]
+        block_starts = {}
+        queue = deque([new_root])
+        while queue:
+            n = queue.popleft()
+            start = self._child_start[n]
+            if start < 0:
+                continue
+            block_starts[n] = len(old_index)
+            for slot in range(start, start + int(self._legal_count[n])):
+                target = int(self._link[slot]) if self._link[slot] >= 0 else slot
+                parents.append(mapping[n])
+                if self._slot[slot] == USED and mapping[target] < 0:
+                    mapping[target] = len(old_index)
+                    old_index.append(target)
+                    links.append(-1)
+                    queue.append(target)
+                else:
+                    old_index.append(slot)
+                    links.append(mapping[target] if self._slot[slot] == USED else -1)
+
+        extra_parents = {}
+        for node_id in old_index:
+            new_id = mapping[node_id]
+            if new_id < 0 or self._chance[node_id] or node_id == new_root:
+                continue
+            new_parents = []
+            for parent_id in self._parent_ids(node_id):
+                new_parent = int(mapping[parent_id])
+                if new_parent >= 0 and new_parent != parents[new_id] and new_parent not in new_parents:
+                    new_parents.append(new_parent)
+            if new_parents:
+                extra_parents[int(new_id)] = new_parents
+
+        self._choice_nodes.remap(lambda i: int(mapping[i]) if mapping[i] >= 0 else None)
+        self._extra_parents = extra_parents
+
+        new_size = len(old_index)
+        self._relocate(np.array(old_index), new_size)
+        self._parent[:new_size] = parents
+        self._link[:new_size] = links
+        self._child_start[:new_size] = -1
+        for n, new_start in block_starts.items():
+            self._child_start[mapping[n]] = new_start
+        self._n_nodes = int(np.count_nonzero(mapping >= 0))
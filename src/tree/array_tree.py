@@ -0,0 +1,462 @@
+"""
+This file contains an array-backed (struct-of-arrays) version of the tree data structure. Instead of keeping one
+Python object per node, the statistics of all the nodes live in preallocated NumPy arrays which grow geometrically.
+The nodes are exposed through lightweight views, so that `MCTS` can use this tree exactly like a `Tree`.
+
+Layout:
+- every node is a *slot* in the arrays, and its id is the index of the slot
+- the children of a node occupy a contiguous block of slots, allocated at the first expansion of the node, with one
+  slot per legal action (in the same order as the legal actions)
+- the legal actions of all the nodes are stored in a single flat pool, each node keeps a (start, count) range into it
+
+NB: actions must be integers. `keep_subtree` compacts the arrays, hence node ids (and views) obtained before re-rooting
+must not be used afterwards.
+"""
+import random
+from collections import deque
+
+import numpy as np
+
+from src.tree.tree import Tree
+
+# state of a slot in a children block
+EMPTY = 0  # the action has not been expanded yet
+USED = 1  # the slot holds a node
+REMOVED = -1  # the action was removed from the node (see `ply` and `delete_subtree`)
+
+
+class ArrayNode:
+    """
+    A view over a node of an `ArrayTree`. It holds no data besides the tree and the node id, it just exposes the same
+    interface as `Node`.
+    """
+    __slots__ = ('_tree', '_id')
+
+    def __init__(self, tree, _id):
+        self._tree = tree
+        self._id = _id
+
+    def __repr__(self):
+        return f"{self.player}(id={self._id}, visits={self.visits}, score={self.score}, action={self.action})"
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayNode) and other._tree is self._tree and other._id == self._id
+
+    def __hash__(self):
+        return hash(self._id)
+
+    def visit(self, n=1):
+        self._tree._visits[self._id] += n
+
+    def update_score(self, score):
+        self._tree._score[self._id] += score
+
+    def random_action(self, rng=random):
+        return rng.choice(self.available_actions)
+
+    def ply(self, action):
+        assert self.is_root
+        self._tree._remove_action(self._id, action)
+
+    def child_arrays(self):
+        return self._tree._child_arrays(self._id)
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def parent(self):
+        parent_id = self._tree._parent[self._id]
+        return None if parent_id < 0 else self._tree._view(int(parent_id))
+
+    @property
+    def children(self):
+        return self._tree._children(self._id)
+
+    @property
+    def is_leaf(self):
+        return self._tree._n_expanded[self._id] == 0
+
+    @property
+    def n_children(self):
+        return int(self._tree._n_expanded[self._id])
+
+    @property
+    def is_fully_expanded(self):
+        return self._tree._n_available[self._id] == 0
+
+    @property
+    def available_actions(self):
+        return self._tree._available_actions(self._id)
+
+    @property
+    def is_root(self):
+        return self._tree._parent[self._id] < 0
+
+    @property
+    def score(self):
+        return float(self._tree._score[self._id])
+
+    @property
+    def visits(self):
+        return int(self._tree._visits[self._id])
+
+    @property
+    def is_terminal(self):
+        return bool(self._tree._done[self._id])
+
+    @property
+    def game_reward(self):
+        reward = self._tree._reward[self._id]
+        return None if np.isnan(reward) else float(reward)
+
+    @property
+    def action(self):
+        action = self._tree._action[self._id]
+        return None if action < 0 else int(action)
+
+    @property
+    def player(self):
+        return self._tree._player_label(self._id)
+
+    @property
+    def is_chance(self):
+        return False
+
+    @property
+    def priors(self):
+        # NB: the evaluator isn't supported by this backend, hence `MCTS.select_puct` uses uniform priors
+        return None
+
+
+class ChildSequence:
+    """
+    The expanded children of a node, as ids. Indexing returns the node view.
+    """
+    __slots__ = ('_tree', '_ids')
+
+    def __init__(self, tree, ids):
+        self._tree = tree
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, k):
+        return self._tree._view(int(self._ids[k]))
+
+
+class ArrayTree(Tree):
+    """
+    Struct-of-arrays replacement for `Tree`. It keeps the same public API (`root`, `insert_node`, `delete_subtree`,
+    `keep_subtree`, indexing by node id), see the module docstring for the memory layout.
+    """
+
+    # NB: the slots are reused by `_compact`, not by `prune`
+    supports_pruning = False
+
+    # name and dtype of every per-slot array
+    _fields = (
+        ('_visits', np.int64),
+        ('_score', np.float64),
+        ('_parent', np.int64),
+        ('_action', np.int64),
+        ('_child_start', np.int64),
+        ('_n_expanded', np.int32),
+        ('_n_available', np.int32),
+        ('_slot', np.int8),
+        ('_done', np.bool_),
+        ('_reward', np.float64),
+        ('_player', np.int8),
+        ('_legal_start', np.int64),
+        ('_legal_count', np.int32),
+    )
+
+    def __init__(self, root_legal_actions, root_data, capacity=1024):
+        self._capacity = 0
+        self._size = 0
+        self._allocate(capacity)
+        self._legal_pool = np.empty(capacity, dtype=np.int64)
+        self._pool_size = 0
+        self._player_codes = {}
+        self._player_labels = []
+
+        self._size = 1
+        self._reset_slots(0, 1, parent=-1)
+        self._action[0] = -1
+        self._slot[0] = USED
+        self._set_node(0, root_legal_actions, root_data)
+        self._n_nodes = 1
+
+        self._root = self._view(0)
+
+    def __repr__(self):
+        return f"ArrayTree(nodes={self._n_nodes}, capacity={self._capacity})"
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._size or self._slot[index] != USED:
+            raise KeyError(index)
+        return self._view(index)
+
+    def __len__(self):
+        return self._n_nodes
+
+    @property
+    def nbytes(self):
+        """
+        The number of bytes used by the arrays of the tree (including the preallocated, unused capacity).
+        """
+        return sum(getattr(self, name).nbytes for name, _ in self._fields) + self._legal_pool.nbytes
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # storage
+
+    def _allocate(self, capacity):
+        for name, dtype in self._fields:
+            new = np.empty(capacity, dtype=dtype)
+            if self._capacity > 0:
+                new[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def _reserve(self, n):
+        if self._size + n > self._capacity:
+            self._allocate(max(2 * self._capacity, self._size + n))
+
+    def _reserve_pool(self, n):
+        if self._pool_size + n > len(self._legal_pool):
+            new = np.empty(max(2 * len(self._legal_pool), self._pool_size + n), dtype=np.int64)
+            new[:self._pool_size] = self._legal_pool[:self._pool_size]
+            self._legal_pool = new
+
+    def _reset_slots(self, start, count, parent):
+        end = start + count
+        self._visits[start:end] = 0
+        self._score[start:end] = 0
+        self._parent[start:end] = parent
+        self._child_start[start:end] = -1
+        self._n_expanded[start:end] = 0
+        self._n_available[start:end] = 0
+        self._slot[start:end] = EMPTY
+        self._done[start:end] = False
+        self._reward[start:end] = np.nan
+        self._player[start:end] = -1
+        self._legal_start[start:end] = 0
+        self._legal_count[start:end] = 0
+
+    def _set_node(self, slot, legal_actions, node_data):
+        # NB: the children are keyed by action, as in `Node` duplicated actions collapse into one child
+        legal_actions = list(dict.fromkeys(legal_actions))
+        n = len(legal_actions)
+        self._reserve_pool(n)
+        self._legal_pool[self._pool_size:self._pool_size + n] = legal_actions
+        self._legal_start[slot] = self._pool_size
+        self._legal_count[slot] = n
+        self._pool_size += n
+        self._n_available[slot] = n
+
+        if node_data is not None:
+            self._done[slot] = node_data.get('done', False)
+            reward = node_data.get('reward')
+            self._reward[slot] = np.nan if reward is None else reward
+            self._player[slot] = self._player_code(node_data.get('player'))
+
+    def _player_code(self, label):
+        if label is None:
+            return -1
+        code = self._player_codes.get(label)
+        if code is None:
+            code = len(self._player_labels)
+            self._player_codes[label] = code
+            self._player_labels.append(label)
+        return code
+
+    def _player_label(self, node_id):
+        code = self._player[node_id]
+        return None if code < 0 else self._player_labels[code]
+
+    def _legal(self, node_id):
+        start = self._legal_start[node_id]
+        return self._legal_pool[start:start + self._legal_count[node_id]]
+
+    def _block(self, node_id):
+        """
+        Returns the first slot of the children block of `node_id`, allocating the block if needed.
+        """
+        start = self._child_start[node_id]
+        if start >= 0:
+            return start
+
+        count = int(self._legal_count[node_id])
+        self._reserve(count)
+        start = self._size
+        self._reset_slots(start, count, parent=node_id)
+        self._action[start:start + count] = self._legal(node_id)
+        self._child_start[node_id] = start
+        self._size += count
+        return start
+
+    def _action_slot(self, node_id, action):
+        start = self._block(node_id)
+        k = np.flatnonzero(self._legal(node_id) == action)
+        if len(k) == 0:
+            raise KeyError(action)
+        return start + int(k[0])
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # node views
+
+    def _view(self, node_id):
+        return ArrayNode(self, node_id)
+
+    def _node_at(self, slot):
+        return self._view(slot)
+
+    def _children(self, node_id):
+        legal = self._legal(node_id).tolist()
+        start = self._child_start[node_id]
+        if start < 0:
+            return dict.fromkeys(legal, None)
+
+        slots = self._slot[start:start + len(legal)]
+        children = {}
+        for k, action in enumerate(legal):
+            if slots[k] == USED:
+                children[action] = self._node_at(start + k)
+            elif slots[k] == EMPTY:
+                children[action] = None
+        return children
+
+    def _child_arrays(self, node_id):
+        start = self._child_start[node_id]
+        if start < 0:
+            ids = np.empty(0, dtype=np.int64)
+        else:
+            ids = np.flatnonzero(self._slot[start:start + self._legal_count[node_id]] == USED) + start
+        return ChildSequence(self, ids), self._visits[ids].astype(np.float64), self._score[ids]
+
+    def _available_actions(self, node_id):
+        legal = self._legal(node_id)
+        start = self._child_start[node_id]
+        if start < 0:
+            return legal.tolist()
+        return legal[self._slot[start:start + len(legal)] == EMPTY].tolist()
+
+    def _remove_action(self, node_id, action):
+        slot = self._action_slot(node_id, action)
+        if self._slot[slot] != EMPTY:
+            raise ValueError(f"Action {action} is not available")
+        self._slot[slot] = REMOVED
+        self._n_available[node_id] -= 1
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # Tree API
+
+    def insert_node(self, parent_id, action, legal_actions, node_data, **kwargs):
+        return self._view(self._insert(parent_id, action, legal_actions, node_data))
+
+    def _insert(self, parent_id, action, legal_actions, node_data):
+        slot = self._action_slot(parent_id, action)
+        assert self._slot[slot] == EMPTY
+        self._slot[slot] = USED
+        self._n_expanded[parent_id] += 1
+        self._n_available[parent_id] -= 1
+        self._set_node(slot, legal_actions, node_data)
+        self._n_nodes += 1
+        self.n_created += 1
+        return slot
+
+    def delete_subtree(self, node, parent=None):
+        """
+        Deletes the subtree that starts from `node` (included). The slots are not reused until the next
+        `keep_subtree`, which compacts the arrays.
+        """
+        if parent is None:
+            parent = node.parent
+        assert self._parent[node.id] == parent.id and self._slot[node.id] == USED
+        self._slot[node.id] = REMOVED
+        self._n_expanded[parent.id] -= 1
+        self._n_nodes -= len(self._reachable(node.id))
+
+    def _reachable(self, node_id):
+        """
+        Returns the ids of the nodes in the subtree of `node_id` (included), in breadth-first order.
+        """
+        order = [node_id]
+        queue = deque(order)
+        while queue:
+            n = queue.popleft()
+            start = self._child_start[n]
+            if start < 0:
+                continue
+            used = np.flatnonzero(self._slot[start:start + self._legal_count[n]] == USED) + start
+            used = used.tolist()
+            order.extend(used)
+            queue.extend(used)
+        return order
+
+    def keep_subtree(self, node):
+        assert node in self._root.children.values()
+        self._compact(node.id)
+        self._root = self._view(0)
+
+    def _compact(self, new_root):
+        """
+        Rebuilds the arrays keeping only the subtree of `new_root`, which becomes the node 0. The children blocks are
+        laid out in breadth-first order, hence the cost is linear in the size of the kept subtree.
+        """
+        old_index = [np.array([new_root])]
+        new_size = 1
+        queue = deque([new_root])
+        while queue:
+            n = queue.popleft()
+            start = self._child_start[n]
+            if start < 0:
+                continue
+            count = int(self._legal_count[n])
+            old_index.append(np.arange(start, start + count))
+            new_size += count
+            queue.extend((np.flatnonzero(self._slot[start:start + count] == USED) + start).tolist())
+        old_index = np.concatenate(old_index)
+
+        mapping = np.full(self._size, -1, dtype=np.int64)
+        mapping[old_index] = np.arange(new_size)
+
+        self._relocate(old_index, new_size)
+
+        has_parent = self._parent[:new_size] >= 0
+        self._parent[:new_size][has_parent] = mapping[self._parent[:new_size][has_parent]]
+        self._parent[0] = -1
+        has_block = self._child_start[:new_size] >= 0
+        self._child_start[:new_size][has_block] = mapping[self._child_start[:new_size][has_block]]
+        self._n_nodes = int(np.count_nonzero(self._slot[:new_size] == USED))
+
+    def _relocate(self, old_index, new_size):
+        """
+        Moves the slots listed in `old_index` to the front of the arrays, compacting the legal actions pool as well.
+        """
+        capacity = max(2 * new_size, 1024)
+        for name, _ in self._fields:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:new_size] = old[old_index]
+            setattr(self, name, new)
+        self._capacity = capacity
+        self._size = new_size
+
+        counts = self._legal_count[:new_size].astype(np.int64)
+        counts[self._slot[:new_size] != USED] = 0
+        offsets = np.cumsum(counts) - counts
+        total = int(counts.sum())
+        pool_index = np.repeat(self._legal_start[:new_size] - offsets, counts) + np.arange(total)
+        pool = np.empty(max(2 * total, 1024), dtype=np.int64)
+        pool[:total] = self._legal_pool[pool_index]
+        self._legal_pool = pool
+        self._pool_size = total
+        self._legal_start[:new_size] = offsets
+        self._legal_count[:new_size] = counts
+
+    @property
+    def root(self):
+        return self._root
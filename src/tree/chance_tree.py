@@ -1,5 +1,6 @@
 from absl.app import UsageError
 
+from src.tree.transposition_tree import TranspositionTable, transposition_key
 from src.tree.tree import Tree, Node
 
 
@@ -12,10 +13,7 @@ class ChanceNode(Node):
         - doesn't use UCT formula during selection
 
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        del self._score
-        del self._game_data
+    __slots__ = ()
 
     def __repr__(self):
         return f"Chance(visits={self.visits}, score={self.score}, action={self._action})"
@@ -26,10 +24,20 @@ class ChanceNode(Node):
     def update_score(self, score):
         raise RuntimeError
 
+    @property
+    def is_chance(self):
+        return True
+
     @property
     def score(self):
-        assert sum(map(lambda n: n.visits, filter(lambda n: n is not None, self.children.values()))) == self.visits
-        return sum(map(lambda n: n.score * n.visits, filter(lambda n: n is not None, self.children.values()))) / self.visits
+        # NB: the children can be shared with other chance nodes (hashed choice nodes), hence their visits don't
+        # necessarily add up to the visits of this node. The score is the pooled mean return of the children, scaled
+        # to the visits of this node
+        children = [n for n in self.children.values() if n is not None]
+        children_visits = sum(n.visits for n in children)
+        if children_visits == 0:
+            return 0
+        return self.visits * sum(n.score for n in children) / children_visits
 
 
 class ChoiceNode(Node):
@@ -38,12 +46,14 @@ class ChoiceNode(Node):
         - keeps the statistics
         - uses UCT formula during selection
         Differences from superclass:
-        - has multiple parents (not for now, need to implement state hashing)
+        - has multiple parents: the choice nodes are shared by state (see `ChanceTree.choice_nodes`)
 
     """
+    __slots__ = ('_parent_nodes',)
+
     def __init__(self, parent_node, *args, **kwargs):
         super().__init__(parent_node, *args, **kwargs)
-        del self._parent_node
+        self._parent_node = None
         self._parent_nodes = {parent_node.id: parent_node} if parent_node is not None else {}
 
     def __repr__(self):
@@ -72,11 +82,6 @@ class ChoiceNode(Node):
     def is_root(self):
         return self._parent_nodes is None or all(map(lambda n: n is None, self._parent_nodes.values()))
 
-    @staticmethod
-    def generate_node_hash(node_data):
-        state = node_data['state']
-        t = node_data['t']
-        return state, t
 
 class ChanceTree(Tree):
     """
@@ -86,9 +91,24 @@ class ChanceTree(Tree):
         - an episode must necessarily start with a Choice node and end with a Chance node
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._choice_nodes = dict()
+    # see `TranspositionTree`
+    supports_pruning = False
+
+    def __init__(self, root_legal_actions, root_data, max_choice_nodes=None, eviction='lru'):
+        """
+        :param max_choice_nodes: the maximum number of entries of the index of the choice nodes (see
+            `TranspositionTable`), None for no limit
+        :param eviction: the eviction policy of the index, either 'lru' or 'least_visited'
+        """
+        super().__init__(root_legal_actions, root_data)
+        self._choice_nodes = TranspositionTable(max_choice_nodes, eviction)
+
+    @property
+    def choice_nodes(self):
+        """
+        The index of the choice nodes by `transposition_key`, with its hit, miss and eviction counters.
+        """
+        return self._choice_nodes
 
     @staticmethod
     def create_root(root_legal_actions, root_data):
@@ -96,6 +116,8 @@ class ChanceTree(Tree):
 
     def insert_node(self, parent_id, action, legal_actions, node_data, chance=None):
         parent = self._nodes[parent_id]
+        if self._graveyard:
+            self.reclaim(self._reclaim_rate)
         new_id = self._last_id + 1
         self._last_id = new_id
 
@@ -108,10 +130,69 @@ class ChanceTree(Tree):
             new_node = ChoiceNode(parent, new_id, legal_actions, node_data, action)
             parent.add_child(new_node)
             self._nodes[new_id] = new_node
-            node_hash = ChoiceNode.generate_node_hash(node_data)
-            self._choice_nodes[node_hash] = new_node
+            self._choice_nodes.put(transposition_key(node_data), new_node)
+        self.n_created += 1
 
         return new_node
 
-    def get_choice_node_if_existing(self, node_hash):
-        return self._choice_nodes.get(node_hash)
+    def get_choice_node_if_existing(self, node_data):
+        return self._choice_nodes.get(transposition_key(node_data))
+
+    def delete_subtree(self, node, parent=None):
+        """
+        Unlinks `node` from `parent`. The subtree is reclaimed lazily (see `Tree.reclaim`), except its choice nodes that
+        are still reachable through other parents (see `_release`).
+        """
+        if parent is None:
+            parent = node.parent
+        parent.remove_child(node.action)
+        if node.is_chance:
+            self._graveyard.append((self.generation, node))
+        else:
+            del node._parent_nodes[parent.id]
+            if not node._parent_nodes:
+                self._graveyard.append((self.generation, node))
+
+    def keep_subtree(self, node):
+        """
+        Same as `Tree.keep_subtree`, in constant time: the old root goes to the graveyard, and its descendants are
+        freed by `reclaim`, the choice nodes once they have no parents left (the parents are counted as in
+        `TranspositionTree`).
+        """
+        assert node in self._root.children.values()
+        # NB: the edges to the new root are removed, so that `reclaim` never reaches it (in a later generation too). A
+        # choice node can also be the child of discarded chance nodes other than the root
+        parents = [node.parent] if node.is_chance else list(node.parents.values())
+        for parent in parents:
+            parent.remove_child(node.action)
+        self._graveyard.append((self.generation, self._root))
+        self.generation += 1
+
+        self._root = node
+        self._root.set_root()
+
+    def _release(self, node):
+        # NB: the graveyard may refer to a node that was already freed, or a choice node that was linked again (see
+        # `ChanceMCTS._expand`)
+        if self._nodes.get(node.id) is not node or node is self._root or (not node.is_chance and node._parent_nodes):
+            return None
+        if node.is_leaf:
+            return ()
+        children = [child for child in node.children.values() if child is not None]
+        if not node.is_chance:
+            # NB: the chance nodes have a single parent
+            return children
+        released = []
+        for child in children:
+            del child._parent_nodes[node.id]
+            if not child._parent_nodes:
+                released.append(child)
+        return released
+
+    def _free(self, node):
+        del self._nodes[node.id]
+        if not node.is_chance:
+            self._choice_nodes.discard(transposition_key(node._game_data), node)
+            node._parent_nodes = None
+        # NB: the nodes aren't recycled, they have two classes
+        node._parent_node = node._children = node._available_actions = node._legal_actions = node._game_data = None
@@ -0,0 +1,281 @@
+"""
+Transpositions: different sequences of moves that reach the same state share the same node, hence its statistics.
+
+The nodes are identified by `transposition_key`, built from the hash of the state (see `BaseEnv.state_hash`). The key
+also includes the time step, so that the structure is a DAG even in environments where a state can be reached again
+(e.g. Hanoi): a path can't run into a cycle.
+"""
+import heapq
+import itertools
+from collections import OrderedDict
+from operator import attrgetter
+
+from src.tree.tree import Tree
+
+
+def transposition_key(node_data):
+    """
+    The key of a state in a `TranspositionTable`: the hash of the state (or the state itself, for the environments
+    that don't hash it) and the time step.
+    """
+    return node_data.get('hash', node_data.get('state')), node_data['t']
+
+
+class TranspositionTable:
+    """
+    Index of the nodes of a tree by `transposition_key`.
+
+    If `max_size` is given, the table is a bounded cache: when it's full, inserting a new key evicts either the least
+    recently used entry ('lru') or the entry of the least visited node ('least_visited'). Evicting an entry doesn't
+    delete the node from the tree, it only stops being shared: a later transposition into its state creates a new
+    node. The lookups are counted in `hits` and `misses`, the evicted entries in `evictions`.
+
+    'least_visited' keeps a heap of the keys by their visits at the time they were pushed, and the entries are updated
+    lazily (see `_evict`): since the visits of a node only grow, a popped entry whose visits are still current is the
+    least visited one, the others are pushed back with their current visits. Hence an eviction costs O(log(max_size)),
+    amortized over the visits.
+
+    NB: the values can be nodes or, for the array backends, node ids. In that case `visits` must map a value to the
+    visits of its node.
+    """
+
+    _evictions = ('lru', 'least_visited')
+
+    def __init__(self, max_size=None, eviction='lru', visits=None):
+        if eviction not in self._evictions:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be positive")
+        self._nodes = OrderedDict()
+        self.max_size = max_size
+        self.eviction = eviction
+        self._visits = visits if visits is not None else attrgetter('visits')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # see 'least_visited': (visits, insertion counter, key), the counter breaks the ties in insertion order
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __repr__(self):
+        return (f"TranspositionTable(size={len(self)}, max_size={self.max_size}, hits={self.hits}, "
+                f"misses={self.misses}, evictions={self.evictions})")
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def get(self, key):
+        node = self._nodes.get(key)
+        if node is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.eviction == 'lru':
+                self._nodes.move_to_end(key)
+        return node
+
+    def peek(self, key):
+        """
+        Same as `get`, without counting the lookup nor changing the LRU order.
+        """
+        return self._nodes.get(key)
+
+    def put(self, key, node):
+        if key in self._nodes:
+            self._nodes.move_to_end(key)
+        else:
+            if self.max_size is not None:
+                if len(self._nodes) >= self.max_size:
+                    self._evict()
+                if self.eviction == 'least_visited':
+                    self._push(key, self._visits(node))
+        self._nodes[key] = node
+
+    def _push(self, key, visits):
+        heap = self._heap
+        # NB: the entries of the removed keys are dropped lazily, rebuild the heap before they pile up
+        if len(heap) > 2 * self.max_size:
+            heap[:] = [entry for entry in heap if entry[2] in self._nodes]
+            heapq.heapify(heap)
+        heapq.heappush(heap, (visits, next(self._counter), key))
+
+    def _evict(self):
+        if self.eviction == 'lru':
+            self._nodes.popitem(last=False)
+        else:
+            heap = self._heap
+            while True:
+                visits, order, key = heapq.heappop(heap)
+                if key not in self._nodes:
+                    # removed since it was pushed
+                    continue
+                current = self._visits(self._nodes[key])
+                if current <= visits:
+                    break
+                heapq.heappush(heap, (current, order, key))
+            del self._nodes[key]
+        self.evictions += 1
+
+    def remove(self, key):
+        del self._nodes[key]
+
+    def discard(self, key, node):
+        """
+        Removes the entry of `key`, if it refers to `node`: after an eviction, the key may refer to a newer node of the
+        same state.
+        """
+        if self._nodes.get(key) is node:
+            del self._nodes[key]
+
+    def remap(self, f):
+        """
+        Replaces each value `v` with `f(v)`, or removes its entry if `f(v)` is None (e.g. after the nodes of a tree
+        were deleted or moved). The order of the entries (hence the LRU order) is preserved.
+        """
+        for key, node in list(self._nodes.items()):
+            new_node = f(node)
+            if new_node is None:
+                del self._nodes[key]
+            else:
+                self._nodes[key] = new_node
+
+    def statistics(self):
+        """
+        :return: a dict with the size of the table and the counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.,
+        }
+
+    def keys(self):
+        return self._nodes.keys()
+
+    def values(self):
+        return self._nodes.values()
+
+
+class TranspositionTree(Tree):
+    """
+    A `Tree` where a node is shared by all the parents whose moves lead to the same state, i.e. a DAG.
+
+    NB: the action of a shared node is the one of the edge through which it was first reached. The action of an edge
+    is given by `edge_action`, and the statistics must be backpropagated along the traversed path (see
+    `MCTS._backpropagate`) instead of following `parent`, which is only one of the parents of the node.
+
+    The discarded nodes are reclaimed lazily, as in `Tree`, but a node of a discarded subtree may still be reachable
+    from the root through another parent. Hence the parents of each node are counted (one per edge), and a discarded
+    node is only freed once its last parent has been freed: it's reference counting, which is exact because the time
+    step in the keys makes the structure acyclic.
+    """
+
+    # NB: collapsing a node could delete children that are shared with other parents
+    supports_pruning = False
+
+    def __init__(self, root_legal_actions, root_data):
+        super().__init__(root_legal_actions, root_data)
+        self._table = TranspositionTable()
+        self._table.put(transposition_key(root_data), self._root)
+        # {node id: the parents of the node, once per edge}
+        self._parents = {self._root.id: []}
+
+    def __repr__(self):
+        return f"TranspositionTree(nodes={len(self)}, transpositions={self.n_transpositions})"
+
+    @property
+    def n_transpositions(self):
+        """
+        The number of edges that lead to a node which was already in the tree.
+        """
+        return sum(len(parents) - 1 for parents in self._parents.values() if parents)
+
+    def insert_node(self, parent_id, action, legal_actions, node_data, **kwargs):
+        key = transposition_key(node_data)
+        node = self._table.get(key)
+        if node is None:
+            node = super().insert_node(parent_id, action, legal_actions, node_data)
+            self._table.put(key, node)
+            self._parents[node.id] = [node.parent]
+        else:
+            parent = self._nodes[parent_id]
+            parent.add_child(node, action)
+            parents = self._parents[node.id]
+            if not parents:
+                # NB: a discarded node that is not reclaimed yet, it's reachable again
+                node._parent_node = parent
+            parents.append(parent)
+        return node
+
+    def get_node_if_existing(self, node_data):
+        return self._table.get(transposition_key(node_data))
+
+    def edge_action(self, parent, child):
+        if parent.children.get(child.action) is child:
+            return child.action
+        for action, node in parent.children.items():
+            if node is child:
+                return action
+        raise KeyError(child)
+
+    def delete_subtree(self, node, parent=None):
+        """
+        Removes the edge from `parent` to `node`. The subtree is discarded only if `node` has no other parent, and its
+        nodes that are shared with the rest of the tree are kept (see `_release`).
+        """
+        if parent is None:
+            parent = node.parent
+        parent.remove_child(self.edge_action(parent, node))
+        if self._unlink(node, parent):
+            self._graveyard.append((self.generation, node))
+
+    def keep_subtree(self, node):
+        """
+        Same as `Tree.keep_subtree`, in constant time: `node` is unlinked from its parents, the old root goes to the
+        graveyard, and its descendants are freed by `reclaim` once they have no parents left.
+        """
+        assert node in self._root.children.values()
+        # NB: the edges to the new root are removed, so that `reclaim` never reaches it (in a later generation too)
+        for parent in self._parents[node.id]:
+            parent.remove_child(self.edge_action(parent, node))
+        self._parents[node.id] = []
+        self._graveyard.append((self.generation, self._root))
+        self.generation += 1
+
+        self._root = node
+        self._root.set_root()
+
+    def _unlink(self, node, parent):
+        """
+        Removes one edge from `parent` to `node`.
+
+        :return: whether `node` has no parents left
+        """
+        parents = self._parents[node.id]
+        parents.pop(next(i for i, p in enumerate(parents) if p is parent))
+        if not parents:
+            return True
+        if node._parent_node is parent:
+            node._parent_node = parents[0]
+        return False
+
+    def _release(self, node):
+        # NB: the graveyard may refer to a node that was already freed (and maybe recycled), or that was linked again
+        # by `insert_node`
+        if self._nodes.get(node.id) is not node or self._parents[node.id] or node is self._root:
+            return None
+        if node.is_leaf:
+            return ()
+        return [child for child in node.children.values() if child is not None and self._unlink(child, node)]
+
+    def _free(self, node):
+        self._table.discard(transposition_key(node._game_data), node)
+        del self._parents[node.id]
+        super()._free(node)
@@ -2,27 +2,70 @@
 This file contains all the code relative to a tree data structure
 """
 import random
-from functools import cmp_to_key
+import sys
+from collections import deque
+
+import numpy as np
 
 
 class Node:
+    __slots__ = ('_id', '_parent_node', '_legal_actions', '_children', '_available_actions', '_n_children', '_visits',
+                 '_score', '_game_data', '_action', '_priors', '_proven')
+
     def __init__(self, parent_node, _id, legal_actions, game_data, action):
         self._id = _id
-        self._children = dict.fromkeys(legal_actions, None)
         self._parent_node = parent_node
-        self._available_actions = legal_actions[:]
+        # NB: most of the nodes are leaves that are never expanded, hence the children dict and the list of the
+        # available actions are only allocated when they are first needed (see `_allocate_children`)
+        self._legal_actions = legal_actions
+        self._children = None
+        self._available_actions = None
+        self._n_children = 0
         self._visits = 0
         self._score = 0
         self._game_data = game_data
         self._action = action
+        # {action: prior probability}, set by the evaluator of the planner (see `src.ai.evaluation`)
+        self._priors = None
+        # the game-theoretic value, once proven (see the `solver` argument of `MCTS`)
+        self._proven = None
 
     def __repr__(self):
         return f"{self.player}(id={self._id}, visits={self._visits}, score={self._score}, action={self._action})"
 
-    def add_child(self, child):
+    def _allocate_children(self):
+        # duplicated actions collapse into the same child
+        self._children = dict.fromkeys(self._legal_actions, None)
+        self._available_actions = list(self._children)
+        self._legal_actions = None
+
+    def add_child(self, child, action=None):
+        # NB: this method is only meant to be used within the Tree class. The action of the edge is the one of `child`,
+        # unless the child is shared by other parents (see `TranspositionTree`)
+        if action is None:
+            action = child.action
+        if self._children is None:
+            self._allocate_children()
+        self._available_actions.remove(action)
+        self._children[action] = child
+        self._n_children += 1
+
+    def remove_child(self, action):
         # NB: this method is only meant to be used within the Tree class
-        self._children[child.action] = child
-        self._available_actions.remove(child.action)
+        if self._children[action] is not None:
+            self._n_children -= 1
+        del self._children[action]
+
+    def collapse(self):
+        """
+        Forgets the children: the node becomes a leaf again, with all its legal actions available, but it keeps its
+        statistics (see `Tree.collapse`).
+        """
+        if self._children is not None:
+            self._legal_actions = list(self._children)
+        self._children = None
+        self._available_actions = None
+        self._n_children = 0
 
     def visit(self, n=1):
         self._visits += n
@@ -30,9 +73,23 @@ class Node:
     def update_score(self, score):
         self._score += score
 
-    def random_action(self):
-        action = random.choice(self._available_actions)
-        return action
+    def random_action(self, rng=random):
+        """
+        :param rng: anything with a `choice` method, e.g. the `RandomStream` of a planner
+        """
+        if self._available_actions is None:
+            return rng.choice(self._legal_actions)
+        return rng.choice(self._available_actions)
+
+    def child_arrays(self):
+        """
+        Returns the expanded children with their visits and scores as arrays (in the same order), see
+        `src.ai.selection`.
+        """
+        children = [child for child in self.children.values() if child is not None]
+        visits = np.fromiter((child.visits for child in children), dtype=np.float64, count=len(children))
+        scores = np.fromiter((child.score for child in children), dtype=np.float64, count=len(children))
+        return children, visits, scores
 
     def set_root(self):
         assert self._parent_node is not None
@@ -40,29 +97,11 @@ class Node:
 
     def ply(self, action):
         assert self.is_root
+        if self._children is None:
+            self._allocate_children()
         self._available_actions.remove(action)
         del self._children[action]
 
-    @property
-    def _best_child(self):
-        children_list = list(self._children.values())
-        return sorted(children_list, key=cmp_to_key(Node.node_cmp))[0]
-
-    @staticmethod
-    def node_cmp(this, other):
-        if this.visits > other.visits:
-            return -1
-        elif this.visits < other.visits:
-            return 1
-        else:
-            if this.score > other.score:
-                return -1
-            elif this.score < other.score:
-                return 1
-            else:
-                # break ties randomly
-                return random.choice([-1, 1])
-
     @property
     def id(self):
         return self._id
@@ -73,18 +112,28 @@ class Node:
 
     @property
     def children(self):
+        if self._children is None:
+            self._allocate_children()
         return self._children
 
     @property
     def is_leaf(self):
-        return all(map(lambda x: x is None, self._children.values()))
+        return self._n_children == 0
+
+    @property
+    def n_children(self):
+        return self._n_children
 
     @property
     def is_fully_expanded(self):
+        if self._available_actions is None:
+            return len(self._legal_actions) == 0
         return len(self._available_actions) == 0
 
     @property
     def available_actions(self):
+        if self._available_actions is None:
+            self._allocate_children()
         return self._available_actions
 
     @property
@@ -115,7 +164,37 @@ class Node:
     def player(self):
         return self._game_data['player']
 
+    @property
+    def is_chance(self):
+        return False
+
+    @property
+    def priors(self):
+        return self._priors
+
+    @priors.setter
+    def priors(self, priors):
+        self._priors = priors
+
+    @property
+    def proven(self):
+        return self._proven
+
+    @proven.setter
+    def proven(self, value):
+        self._proven = value
+
 class Tree:
+    # see `prune`
+    supports_pruning = True
+    # the number of discarded nodes reclaimed at each `insert_node`, see `keep_subtree`
+    _reclaim_rate = 2
+    # the number of nodes created by `insert_node` (not counting the shared ones), see `src.ai.instrumentation`
+    n_created = 0
+    _pruning_policies = {
+        'least_visited': lambda node: node.visits,
+        'lowest_value': lambda node: node.score / node.visits if node.visits else 0,
+    }
 
     @staticmethod
     def create_root(root_legal_actions, root_data):
@@ -125,6 +204,11 @@ class Tree:
         self._root = self.create_root(root_legal_actions, root_data)
         self._nodes = {0: self._root}
         self._last_id = 0
+        # the deleted nodes, recycled (with their ids) by `insert_node`
+        self._free_nodes = []
+        # see `keep_subtree`: the number of re-rootings, and the discarded subtrees as (generation, root) pairs
+        self.generation = 0
+        self._graveyard = deque()
 
     def __repr__(self):
         s = ', '.join(map(str, self._nodes))
@@ -133,66 +217,162 @@ class Tree:
     def __getitem__(self, index):
         return self._nodes[index]
 
+    def __len__(self):
+        # NB: the nodes in memory, including the discarded ones that are not reclaimed yet (see `reclaim`)
+        return len(self._nodes)
+
     def insert_node(self, parent_id, action, legal_actions, node_data, **kwargs):
         parent = self._nodes[parent_id]
-        new_id = self._last_id + 1
-        self._last_id = new_id
-        new_node = Node(parent, new_id, legal_actions, node_data, action)
+        if self._graveyard:
+            self.reclaim(self._reclaim_rate)
+        if self._free_nodes:
+            new_node = self._free_nodes.pop()
+            new_node.__init__(parent, new_node.id, legal_actions, node_data, action)
+        else:
+            new_id = self._last_id + 1
+            self._last_id = new_id
+            new_node = Node(parent, new_id, legal_actions, node_data, action)
         parent.add_child(new_node)
-        self._nodes[new_id] = new_node
+        self._nodes[new_node.id] = new_node
+        self.n_created += 1
         return new_node
 
-    def delete_subtree(self, node, parent):
+    def delete_subtree(self, node, parent=None):
         """
-        This method deletes a subtree that starts from `node` (included). It is only used within the method
-        `keep_subtree`.
+        This method deletes a subtree that starts from `node` (included). It is mainly used within the method
+        `keep_subtree`. If `parent` is not given, the parent of `node` is used.
+
+        NB: the subtree is only unlinked from `parent`, its nodes are reclaimed lazily, see `reclaim`.
         """
-        self._delete_subtree(node)
+        if parent is None:
+            parent = node.parent
         assert node in parent.children.values()
-        del parent.children[node.action]
-        del self._nodes[node.id]
+        parent.remove_child(node.action)
+        self._graveyard.append((self.generation, node))
 
-    def _delete_subtree(self, node):
+    def reclaim(self, n_nodes=None):
         """
-        This method recursively delete a subtree that starts from `node` (excluded)
+        Deletes the nodes of the discarded subtrees (see `keep_subtree`), oldest generation first, and puts them in the
+        free list. The subtrees are walked iteratively, so their depth doesn't matter.
+
+        :param n_nodes: the maximum number of nodes to reclaim, None to reclaim all of them. The rest of a partially
+            reclaimed subtree stays in the graveyard
+        :return: the number of reclaimed nodes
         """
-        if node.is_leaf:
-            return
-        for child_id in list(node.children):
-            n = node.children[child_id]
-            if n is None:
+        n_reclaimed = 0
+        while self._graveyard and (n_nodes is None or n_reclaimed < n_nodes):
+            generation, node = self._graveyard.popleft()
+            children = self._release(node)
+            if children is None:
                 continue
-            self._delete_subtree(n)
-            del node.children[child_id]
-            try:
-                del self._nodes[n.id]
-            except KeyError:
-                # TODO: this node was deleted following a different subtree
-                pass
+            for child in children:
+                self._graveyard.appendleft((generation, child))
+            self._free(node)
+            n_reclaimed += 1
+        return n_reclaimed
+
+    def _release(self, node):
+        """
+        Called by `reclaim` before freeing `node`.
+
+        :return: the children of `node` that must be reclaimed with it, or None if `node` must not be freed (see
+            `TranspositionTree`)
+        """
+        if node.is_leaf:
+            return ()
+        return [child for child in node.children.values() if child is not None]
+
+    def _free(self, node):
+        del self._nodes[node.id]
+        # NB: drop the references, a free node must not keep the rest of the tree (or the game data) alive
+        node._parent_node = node._children = node._available_actions = node._legal_actions = node._game_data = None
+        self._free_nodes.append(node)
+
+    def collapse(self, node):
+        """
+        Deletes the descendants of `node`, which becomes an unexpanded leaf but keeps its statistics. The deleted nodes
+        are put in a free list, to be reused by `insert_node`.
+
+        :return: the number of deleted nodes
+        """
+        stack = [child for child in node.children.values() if child is not None]
+        node.collapse()
+        n_deleted = 0
+        while stack:
+            n = stack.pop()
+            if not n.is_leaf:
+                stack.extend(child for child in n.children.values() if child is not None)
+            self._free(n)
+            n_deleted += 1
+        return n_deleted
+
+    def prune(self, n_nodes, policy='least_visited'):
+        """
+        Collapses frontier subtrees (the nodes whose children are all leaves, except the root) until the tree has at
+        most `n_nodes` nodes. The least valuable ones go first.
+
+        :param policy: either 'least_visited' or 'lowest_value' (the lowest mean score)
+        :return: the number of deleted nodes
+        """
+        key = self._pruning_policies[policy]
+        # NB: the frontier is searched among all the nodes, hence the discarded ones must be reclaimed first
+        self.reclaim()
+        n_deleted = 0
+        while len(self) > n_nodes:
+            frontier = [node for node in self._nodes.values()
+                        if not node.is_leaf and not node.is_root
+                        and all(child is None or child.is_leaf for child in node.children.values())]
+            if not frontier:
+                break
+            frontier.sort(key=key)
+            for node in frontier:
+                if len(self) <= n_nodes:
+                    break
+                n_deleted += self.collapse(node)
+        return n_deleted
+
+    def node_bytes(self, sample_size=100):
+        """
+        An estimate of the memory used by a node (with its containers and its game data), averaged over a sample of
+        the nodes evenly spaced in insertion order.
+        """
+        total = 0
+        nodes = list(self._nodes.values())
+        nodes = nodes[::max(1, len(nodes) // sample_size)]
+        for node in nodes:
+            total += sys.getsizeof(node) + sys.getsizeof(node._game_data)
+            for container in (node._legal_actions, node._children, node._available_actions):
+                if container is not None:
+                    total += sys.getsizeof(container)
+        return total / len(nodes)
+
+    def edge_action(self, parent, child):
+        """
+        The action that leads from `parent` to `child`.
+        """
+        return child.action
 
     def keep_subtree(self, node):
+        """
+        Makes `node` (a child of the root) the new root. It's constant time: the old root is only unlinked from `node`
+        and moved, with the subtrees of the other children, to the graveyard of the current generation. Their nodes
+        are reclaimed lazily, a few at each `insert_node` (or all at once by `reclaim`).
+        """
         assert node in self._root.children.values()
 
-        # Delete the subtree relative to all the other children
-        for action in list(self._root.children):
-            n = self._root.children[action]
-            if n is node:
-                continue
-
-            self.delete_subtree(n, self._root)
+        old_root = self._root
+        old_root.remove_child(node.action)
+        self._graveyard.append((self.generation, old_root))
+        self.generation += 1
 
-        # At this point, I still have the root with only the selected child (`node`)
-        del self._nodes[self._root.id]
-        del self._root
         self._root = node
         self._root.set_root()
 
         assert self._root is self._nodes[self._root.id]
 
-
     def visualize(self, node_id=None, level=None, mode='repr'):
         if level is None:
-            level = self._last_id
+            level = len(self)
         if node_id is None:
             node = self._root
         else:
@@ -0,0 +1,123 @@
+import unittest
+from unittest import TestCase
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+from src.tree.array_tree import ArrayTree
+
+
+class TestArrayTree(TestCase):
+
+    def test_insert_node(self):
+        tree = ArrayTree([42], {'name': 'root'})
+        child = tree.insert_node(0, 42, [7], {'name': 'child'})
+        root = tree.root
+
+        assert child.parent == root
+        assert len(tree) == 2
+        assert child in root.children.values()
+        assert root.is_fully_expanded
+        assert not root.is_leaf
+        assert child.is_leaf
+
+    def test_stats(self):
+        tree = ArrayTree([1, 2], {'name': 'root'})
+        child = tree.insert_node(0, 2, [], {'done': True, 'reward': -1, 'player': 'Human'})
+
+        child.visit()
+        child.update_score(3)
+
+        assert tree[child.id].visits == 1
+        assert tree[child.id].score == 3
+        assert child.is_terminal
+        assert child.game_reward == -1
+        assert child.player == 'Human'
+        assert child.action == 2
+        assert tree.root.available_actions == [1]
+
+    def test_delete_subtree(self):
+        tree = ArrayTree([1, 2], {'name': 'root'})
+        _ = tree.insert_node(0, 1, [7], {'name': 'child1'})
+        child2 = tree.insert_node(0, 2, [9], {'name': 'child2'})
+        _ = tree.insert_node(child2.id, 9, [4], {'name': 'child3'})
+
+        tree.delete_subtree(child2)
+        assert len(tree) == 2
+        assert 2 not in tree.root.children
+
+    def test_keep_subtree(self):
+        tree = ArrayTree([1, 2], {'name': 'root'})
+        child1 = tree.insert_node(0, 1, [7, 8], {'name': 'child1'})
+        child2 = tree.insert_node(0, 2, [9], {'name': 'child2'})
+        _ = tree.insert_node(child2.id, 9, [4], {'name': 'child3'})
+        grandchild = tree.insert_node(child1.id, 8, [5], {'name': 'child4'})
+        grandchild.visit(3)
+
+        tree.keep_subtree(child1)
+
+        root = tree.root
+        assert len(tree) == 2
+        assert root.is_root
+        assert root.action == 1
+        assert root.available_actions == [7]
+        assert root.children[8].visits == 3
+        assert root.children[8].parent == root
+        assert root.children[8].available_actions == [5]
+
+    def test_ply(self):
+        tree = ArrayTree([1, 2], {'name': 'root'})
+
+        tree.root.ply(1)
+
+        assert 1 not in tree.root.available_actions
+        assert 1 not in tree.root.children
+
+    def test_mcts_backend(self):
+        # the array backend must not change the search, given the same seed
+        for seed in range(3):
+            actions = []
+            for backend in ('object', 'array'):
+                env = TicTacToeEnv()
+                env.reset(human_first=True, seed=seed)
+                env.step(0)
+                env.step(4)
+                env.step(2)
+
+                agent = MCTS(env, seed=seed, tree_backend=backend)
+                actions.append(agent.plan(iterations_budget=500))
+
+            assert actions[0] == actions[1] == 1
+
+    def test_puct(self):
+        # without an evaluator, the priors are uniform with both backends
+        statistics = []
+        for backend in ('object', 'array'):
+            env = TicTacToeEnv()
+            env.reset(human_first=False)
+            agent = MCTS(env, seed=0, tree_backend=backend, selection='puct')
+            for _ in range(300):
+                agent._plan_iteration()
+            statistics.append(agent.root_statistics())
+
+        assert statistics[0] == statistics[1]
+
+    def test_chance_mcts_backend(self):
+        roots = []
+        for backend in ('object', 'array'):
+            env = MyFrozenLakeEnv(is_slippery=True, map_name='4x4')
+            env.reset(seed=0)
+            agent = ChanceMCTS(env, seed=0, max_depth=100, tree_backend=backend)
+            for _ in range(300):
+                agent._plan_iteration()
+            roots.append(agent.tree.root)
+
+        assert len(roots[0].children) == len(roots[1].children)
+        for action, child in roots[0].children.items():
+            assert child.visits == roots[1].children[action].visits
+            assert abs(child.score - roots[1].children[action].score) < 1e-9
+
+
+if __name__ == '__main__':
+    unittest.main()
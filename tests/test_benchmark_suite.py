@@ -0,0 +1,30 @@
+import unittest
+from unittest import TestCase
+
+from benchmarks.suite import run, compare, METRICS
+
+
+class TestBenchmarkSuite(TestCase):
+
+    def test_run(self):
+        results = run(['tictactoe', 'frozenlake4x4-slippery'], iterations=20, repeat=1)
+        assert set(results['results']) == {'tictactoe', 'frozenlake4x4-slippery'}
+        for metrics in results['results'].values():
+            assert set(METRICS) <= set(metrics)
+            assert metrics['iterations'] == 20 and metrics['nodes'] > 1
+            assert all(metrics[metric] > 0 for metric in METRICS)
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'iterations_per_second': 100, 'rollout_steps_per_second': 100,
+                                      'nodes_per_second': 100, 'peak_bytes': 100, 'bytes_per_node': 100}}}
+        results = {'results': {'a': {'iterations_per_second': 80, 'rollout_steps_per_second': 95,
+                                     'nodes_per_second': 120, 'peak_bytes': 120, 'bytes_per_node': 80},
+                               'b': {}}}
+        regressions = {(name, metric) for name, metric, _, _, _, regression in compare(results, baseline, 0.1)
+                       if regression}
+        # slower, or more memory
+        assert regressions == {('a', 'iterations_per_second'), ('a', 'peak_bytes')}
+
+
+if __name__ == '__main__':
+    unittest.main()
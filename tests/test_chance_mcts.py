@@ -0,0 +1,161 @@
+import math
+import unittest
+from collections import Counter
+from unittest import TestCase
+from unittest.mock import patch
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from src.ai.chance_mcts import ChanceMCTS
+from src.tree.chance_tree import ChanceTree
+from src.tree.tree import Node
+
+
+class TestChanceMCTS(TestCase):
+
+    @staticmethod
+    def _agent(map_name='8x8', **kwargs):
+        env = MyFrozenLakeEnv(is_slippery=True, map_name=map_name)
+        env.reset(seed=0)
+        return ChanceMCTS(env, seed=0, max_depth=200, **kwargs)
+
+    def test_backpropagation_cost(self):
+        agent = self._agent()
+        visited = []
+        original_visit = Node.visit
+
+        def visit(node, n=1):
+            visited.append(node.id)
+            original_visit(node, n)
+
+        with patch.object(Node, 'visit', visit):
+            for _ in range(2000):
+                visited.clear()
+                agent._plan_iteration()
+                # one backpropagation along the path, plus one for a hashed node: each node is updated at most twice
+                # per iteration, no matter how many paths lead to it
+                assert len(visited) <= 2 * len(agent._path)
+                assert max(Counter(visited).values()) <= 2
+
+        assert any(len(node.parents) > 1 for node in agent.tree._choice_nodes.values())
+
+    def test_transposition(self):
+        agent = self._agent(map_name='4x4', gamma=0.5)
+        root = agent.tree.root
+        for _ in range(300):
+            agent._plan_iteration()
+
+        # the visits of the root are the sum of the visits of the chance nodes below it, since they have no other
+        # parent
+        assert root.visits == sum(child.visits for child in root.children.values())
+        # some choice node must have been reached through different paths
+        assert any(len(node.parents) > 1 for node in agent.tree._choice_nodes.values())
+
+    def test_discount(self):
+        agent = self._agent(map_name='4x4', gamma=0.5)
+        agent._plan_iteration()
+        path = agent._path
+        assert len(path) == 3
+
+        visits = [n.visits for n in path]
+        agent._backpropagate(path[-1], 1.)
+        assert [n.visits for n in path] == [v + 1 for v in visits]
+        # the score of the root is discounted once per level
+        scores = [n.score for n in path]
+        agent._backpropagate(path[-1], 1.)
+        assert path[0].score - scores[0] == 0.25
+        assert path[-1].score - scores[-1] == 1.
+
+    def test_index_consistency(self):
+        env = MyFrozenLakeEnv(is_slippery=True, map_name='8x8')
+        env.reset(seed=0)
+        agent = ChanceMCTS(env, seed=0, max_depth=200)
+        for _ in range(5):
+            action = agent.plan(iterations_budget=200)
+            state, _, done, _, _ = env.step(action)
+            agent.determinize_chance_node(state)
+            if done:
+                break
+
+            # only the reachable choice nodes are indexed, and they have no unreachable parents
+            tree = agent.tree
+            for node in tree.choice_nodes.values():
+                assert tree[node.id] is node
+                if not node.is_root:
+                    assert node.parents and all(parent_id in tree._nodes for parent_id in node.parents)
+
+    def test_non_slippery_episode(self):
+        # NB: without slipping, the moves into a wall and the moves that stay in place lead to the same choice node,
+        # which may become the root while it's still a child of discarded chance nodes
+        for seed in range(3):
+            env = MyFrozenLakeEnv(is_slippery=False, map_name='4x4')
+            env.reset(seed=seed)
+            agent = ChanceMCTS(env, seed=seed, max_depth=100)
+            done = False
+            while not done:
+                action = agent.plan(iterations_budget=20)
+                state, _, terminated, truncated, _ = env.step(action)
+                done = terminated or truncated
+                if not done:
+                    agent.determinize_chance_node(state)
+            agent.tree.reclaim()
+
+    def test_bounded_index(self):
+        for eviction in ('lru', 'least_visited'):
+            agent = self._agent(max_choice_nodes=20, choice_node_eviction=eviction)
+            for _ in range(500):
+                agent._plan_iteration()
+            index = agent.tree.choice_nodes
+            assert len(index) == 20
+            assert index.evictions > 0
+            assert index.hits > 0 and index.misses > 0
+
+
+    def test_progressive_widening(self):
+        for tree_backend in ('object', 'array'):
+            agent = self._agent(tree_backend=tree_backend, state_widening=(1, 0), action_widening=(1, 0.1))
+            for _ in range(500):
+                agent._plan_iteration()
+
+            nodes, stack = {}, [agent.tree.root]
+            while stack:
+                node = stack.pop()
+                if node.id not in nodes:
+                    nodes[node.id] = node
+                    stack.extend(child for child in node.children.values() if child is not None)
+            chance_nodes = [node for node in nodes.values() if node.is_chance]
+            choice_nodes = [node for node in nodes.values() if not node.is_chance]
+            # alpha = 0: a single outcome per chance node
+            assert all(node.n_children <= 1 for node in chance_nodes)
+            assert all(node.n_children <= max(1, math.ceil(node.visits ** 0.1)) for node in choice_nodes)
+            root = agent.tree.root
+            assert 1 < root.n_children < len(root.children)
+
+        with self.assertRaises(ValueError):
+            self._agent(state_widening=(0, 0.5))
+
+class TestChanceTree(TestCase):
+
+    @staticmethod
+    def _data(state, t):
+        return {'state': state, 't': t, 'player': 'Agent'}
+
+    def test_shared_root(self):
+        tree = ChanceTree([0, 1], self._data(0, 0))
+        # both actions lead to the same state, e.g. into a wall
+        chance_nodes = [tree.insert_node(0, action, [0], None, chance=True) for action in (0, 1)]
+        choice_node = tree.insert_node(chance_nodes[0].id, 0, [0, 1], self._data(0, 1), chance=False)
+        chance_nodes[1].add_child(choice_node)
+        choice_node.add_parent(chance_nodes[1])
+        chance_node = tree.insert_node(choice_node.id, 0, [5], None, chance=True)
+        leaf = tree.insert_node(chance_node.id, 5, [0], self._data(5, 2), chance=False)
+
+        # re-rooted twice before the discarded nodes are reclaimed
+        for node in (chance_nodes[0], choice_node, chance_node, leaf):
+            tree.keep_subtree(node)
+        assert tree.reclaim() == 5
+        assert len(tree) == 1 and tree.root is leaf
+        assert list(tree.choice_nodes.values()) == [leaf]
+
+
+if __name__ == '__main__':
+    unittest.main()
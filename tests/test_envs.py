@@ -0,0 +1,164 @@
+import random
+import unittest
+from unittest import TestCase
+
+from envs.bitboard_tictactoe_env import BitboardTicTacToeEnv
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.hanoi_env import TowersOfHanoiEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+
+
+def make_envs():
+    bitboard = BitboardTicTacToeEnv()
+    bitboard.reset(human_first=False, seed=0)
+    tictactoe = TicTacToeEnv()
+    tictactoe.reset(human_first=True, seed=0)
+    hanoi = TowersOfHanoiEnv(num_disks=4)
+    hanoi.reset()
+    frozenlake = MyFrozenLakeEnv(is_slippery=True, map_name='4x4')
+    frozenlake.reset(seed=0)
+    return tictactoe, hanoi, frozenlake, bitboard
+
+
+class TestUndo(TestCase):
+
+    def test_push_pop(self):
+        rng = random.Random(0)
+        for env in make_envs():
+            for _ in range(20):
+                checkpoints = []
+                for _ in range(rng.randint(1, 12)):
+                    if env.done:
+                        break
+                    checkpoints.append(env.backup())
+                    env.push(rng.choice(env.legal_actions))
+                while checkpoints:
+                    env.pop()
+                    assert env.backup() == checkpoints.pop()
+
+    def test_same_search(self):
+        # undoing the moves must not change the search
+        for i, planner_class, kwargs in zip(range(4), (MCTS, MCTS, ChanceMCTS, MCTS), ({}, {}, {'max_depth': 100}, {})):
+            statistics = []
+            for undo in (True, False):
+                env = make_envs()[i]
+                planner = planner_class(env, seed=0, **kwargs)
+                planner._undo = undo
+                for _ in range(200):
+                    planner._plan_iteration()
+                statistics.append(planner.root_statistics())
+
+            assert statistics[0] == statistics[1]
+
+
+class TestBitboardTicTacToe(TestCase):
+
+    def test_same_games(self):
+        rng = random.Random(0)
+        for game in range(200):
+            envs = TicTacToeEnv(), BitboardTicTacToeEnv()
+            for env in envs:
+                env.reset(human_first=game % 2 == 0)
+            done = False
+            while not done:
+                action = rng.choice(envs[0].legal_actions)
+                results = [env.step(action) for env in envs]
+                done = results[0][2]
+
+                assert results[0] == results[1]
+                assert envs[0].legal_actions == envs[1].legal_actions
+                assert envs[0].board == envs[1].board
+                assert envs[0].reward() == envs[1].reward()
+                assert envs[0].node_data() == envs[1].node_data()
+            assert envs[0].game_result() == envs[1].game_result()
+
+    def test_same_search(self):
+        statistics = []
+        for env in (TicTacToeEnv(), BitboardTicTacToeEnv()):
+            env.reset(human_first=True, seed=0)
+            env.step(0)
+            env.step(4)
+            env.step(2)
+            agent = MCTS(env, seed=0)
+            for _ in range(500):
+                agent._plan_iteration()
+            statistics.append(agent.root_statistics())
+
+        assert statistics[0] == statistics[1]
+
+
+class TestFrozenLakeRollouts(TestCase):
+
+    @staticmethod
+    def _sequential_mean(env, n, max_depth):
+        planner = MCTS(env, seed=0, adversarial=False, max_depth=max_depth)
+        planner.t = 0
+        returns = 0
+        for _ in range(n):
+            checkpoint = env.backup()
+            returns += planner._evaluate()
+            env.load(checkpoint)
+        return returns / n
+
+    def test_same_returns(self):
+        for is_slippery in (False, True):
+            env = MyFrozenLakeEnv(is_slippery=is_slippery, map_name='4x4')
+            env.reset(seed=0)
+            # next to the goal
+            env.s = 14
+            checkpoint = env.backup()
+
+            returns = env.batch_rollout(20000, 100)
+            assert env.backup() == checkpoint
+            assert set(returns) <= {0., 1.}
+            assert abs(returns.mean() - self._sequential_mean(env, 5000, 100)) < 0.03
+
+    def test_max_depth(self):
+        env = MyFrozenLakeEnv(is_slippery=False, map_name='4x4')
+        env.reset(seed=0)
+        for action in (1, 1, 2, 1, 2):
+            env.step(action)
+
+        # one step from the goal: it can be reached in the last step, but then the return is 0 anyway
+        assert not env.batch_rollout(1000, env.t + 1).any()
+        assert env.batch_rollout(1000, env.t + 2).any()
+
+
+class TestHanoi(TestCase):
+
+    @staticmethod
+    def _solve(env, n, source, target, spare):
+        if n == 0:
+            return
+        TestHanoi._solve(env, n - 1, source, spare, target)
+        env.step(env.action_dict[source + target])
+        TestHanoi._solve(env, n - 1, spare, target, source)
+
+    def test_many_disks(self):
+        env = TowersOfHanoiEnv(num_disks=12)
+        env.reset()
+        self._solve(env, 12, 'A', 'C', 'B')
+
+        assert env.done
+        assert env.t == 2 ** 12 - 1
+        assert env.state == [[], [], list(range(12, 0, -1))]
+
+    def test_state(self):
+        env = TowersOfHanoiEnv(num_disks=3)
+        env.reset()
+        env.step(env.action_dict['AC'])
+        env.step(env.action_dict['AB'])
+        checkpoint = env.backup()
+        _, reward, _, _, info = env.step(env.action_dict['AB'])
+
+        assert reward == -1.0 and 'error' in info
+        assert env.state == [[3], [2], [1]]
+        assert env.legal_actions == [env.action_dict[m] for m in ('BA', 'CA', 'CB')]
+        assert env.backup() == checkpoint
+        assert env._get_observation().tolist() == [[3, 0, 0], [2, 0, 0], [1, 0, 0]]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.evaluation import TabularTicTacToeEvaluator
+
+
+class CountingEvaluator(TabularTicTacToeEvaluator):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def evaluate(self, features):
+        self.batches.append(len(features))
+        return super().evaluate(features)
+
+
+class TestEvaluation(TestCase):
+
+    def _counter_opponent_env(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        # O| |O
+        #  |X|
+        #  | |
+        env.step(0)
+        env.step(4)
+        env.step(2)
+        return env
+
+    def test_tabular_evaluator(self):
+        evaluator = TabularTicTacToeEvaluator()
+        env = self._counter_opponent_env()
+        priors, values = evaluator.evaluate(evaluator.features(env)[np.newaxis])
+        # the agent has to block the human, then it's a draw
+        assert values[0] == 0
+        assert np.argmax(priors[0]) == 1 and priors[0][[0, 2, 4]].sum() == 0
+        assert np.isclose(priors[0].sum(), 1)
+
+        env.step(3)
+        _, values = evaluator.evaluate(evaluator.features(env)[np.newaxis])
+        assert values[0] == -1
+
+    def test_batched_search(self):
+        evaluator = CountingEvaluator()
+        env = self._counter_opponent_env()
+        agent = MCTS(env, seed=0, evaluator=evaluator, selection='puct', batch_size=8)
+
+        agent._search(iterations_budget=100, time_budget=float('inf'))
+        # the root, then batches of at most 8 leaves (the terminal ones are not evaluated)
+        assert evaluator.batches[0] == 1 and all(1 <= n <= 8 for n in evaluator.batches[1:])
+        assert sum(evaluator.batches) <= 101 and max(evaluator.batches) == 8
+        # no virtual loss is left after the search
+        assert agent._pending_losses == {} and agent._pending_leaves == []
+        assert agent.tree.root.visits == 100
+        assert agent.root_best_child().action == 1
+
+    def test_select_puct(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0, selection='puct')
+        for _ in range(9):
+            agent._plan_iteration()
+        root = agent.tree.root
+        assert root.is_fully_expanded
+        # with the same statistics, the child with the highest prior is chosen
+        for child in root.children.values():
+            child._visits, child._score = 1, 0
+        root.priors = {action: 0.5 if action == 6 else 0.0625 for action in root.children}
+        assert MCTS.select_puct(root).action == 6
+
+    def test_unsupported(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        with self.assertRaises(ValueError):
+            MCTS(env, tree_backend='array', evaluator=TabularTicTacToeEvaluator())
+
+
+if __name__ == '__main__':
+    unittest.main()
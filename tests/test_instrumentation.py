@@ -0,0 +1,67 @@
+import unittest
+from collections import Counter
+from unittest import TestCase
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+from src.ai.instrumentation import PHASES, PhaseSampler
+
+
+class TestInstrumentation(TestCase):
+
+    def test_stats(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0, instrument=True)
+        hooks = Counter()
+        agent.stats.hooks.append(lambda phase, start, end: hooks.update([phase]))
+
+        tree = agent.tree
+        action, stats = agent.plan(iterations_budget=500, return_stats=True)
+        assert stats.iterations == 500
+        assert set(stats.time) == set(PHASES) and all(t > 0 for t in stats.time.values())
+        assert hooks == {phase: 500 for phase in PHASES}
+        # every iteration creates a node, except the ones that select a terminal node
+        assert stats.nodes_created == tree.n_created <= 500
+        assert stats.max_selection_depth <= 9
+        # the root, the selected nodes and the expanded one
+        assert stats.backup_path_length == stats.selection_depth + 500 + stats.nodes_created
+        assert stats.as_dict()['mean_rollout_length'] > 0
+
+        # the stats of each plan are separate
+        _, new_stats = agent.plan(iterations_budget=10, return_stats=True)
+        assert new_stats.iterations == 10 and stats.iterations == 500
+
+    def test_plan_iter(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0, instrument=True)
+        # the stats are reset by each search, as by `plan`
+        for _ in range(2):
+            for _ in agent.plan_iter(iterations_budget=100):
+                pass
+            assert agent.stats.iterations == 100
+
+    def test_chance_mcts(self):
+        env = MyFrozenLakeEnv(is_slippery=True, map_name='4x4')
+        env.reset(seed=0)
+        agent = ChanceMCTS(env, seed=0, max_depth=100, instrument=True)
+
+        with PhaseSampler(agent.stats, interval=0.0005) as sampler:
+            _, stats = agent.plan(time_budget=0.2, return_stats=True)
+        assert stats.iterations > 0 and stats.nodes_created > 0
+        assert sum(sampler.phases.values()) > 0
+        assert set(sampler.phases) <= set(PHASES) | {None}
+
+    def test_disabled(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0)
+        action, stats = agent.plan(iterations_budget=10, return_stats=True)
+        assert stats is None and action in env.legal_actions
+
+
+if __name__ == '__main__':
+    unittest.main()
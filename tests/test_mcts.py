@@ -1,7 +1,12 @@
+import random
+import time
+from contextlib import closing
 from unittest import TestCase
 import unittest
 
 from src import MCTS
+from src.ai.evaluation import TabularTicTacToeEvaluator
+from src.tree.tree import Tree
 from envs.tictactoe_env import TicTacToeEnv
 
 
@@ -81,6 +86,175 @@ class TestMCTS(TestCase):
 
         assert len(c) == 0
 
+    def test_solver(self):
+        for seed in range(10):
+            env = TicTacToeEnv()
+            env.reset(human_first=True, seed=0)
+            # the grid of `_test_win_1`
+            for action in (0, 2, 1, 5, 3):
+                env.step(action)
+
+            agent = MCTS(env, seed=seed, solver=True)
+            # the winning move is proven as soon as it's expanded, and it solves the root
+            assert agent._search(iterations_budget=1000, time_budget=float('inf')) <= 4
+            assert agent.tree.root.children[8].proven == 1
+            assert agent.plan(iterations_budget=1000) == 8
+
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        # the grid of `_test_counter_opponent_1`: blocking the human leads to a draw, any other move loses
+        for action in (0, 4, 2):
+            env.step(action)
+        agent = MCTS(env, seed=0, solver=True)
+        assert agent._search(iterations_budget=1000, time_budget=float('inf')) < 200
+        root = agent.tree.root
+        assert root.proven == 0
+        assert root.children[1].proven == 0
+        assert all(child.proven == -1 for action, child in root.children.items() if action != 1)
+        assert agent.root_best_child().action == 1
+
+        # the instrumentation records the iterations of the solver
+        agent = MCTS(env, seed=0, solver=True, instrument=True)
+        _, stats = agent.plan(iterations_budget=300, return_stats=True)
+        assert 0 < stats.iterations < 200
+
+        with self.assertRaises(ValueError):
+            MCTS(env, adversarial=False, solver=True)
+        with self.assertRaises(ValueError):
+            MCTS(env, solver=True, n_workers=2)
+        # NB: the evaluator would bypass the proofs
+        with self.assertRaises(ValueError):
+            MCTS(env, solver=True, evaluator=TabularTicTacToeEvaluator())
+
+    def test_n_simulations(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        env.step(0)
+        env.step(4)
+        env.step(2)
+
+        agent = MCTS(env, seed=0, n_simulations=10)
+        for _ in range(50):
+            agent._plan_iteration()
+
+        # every iteration is backpropagated with the weight of its 10 rollouts
+        assert agent.tree.root.visits == 500
+        assert agent.plan(iterations_budget=200) == 1
+
+    def test_batch_rollout(self):
+        class BatchTicTacToeEnv(TicTacToeEnv):
+            supports_batch_rollout = True
+            calls = []
+
+            def batch_rollout(self, n, max_depth, rng=None):
+                self.calls.append(n)
+                return [1] * n
+
+        env = BatchTicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+
+        agent = MCTS(env, seed=0, n_simulations=4)
+        agent._plan_iteration()
+
+        assert env.calls == [4]
+        assert agent.tree.root.visits == 4
+
+    def test_seed(self):
+        agents = []
+        for seed in (0, 0, 1):
+            env = TicTacToeEnv()
+            env.reset(human_first=False)
+            agents.append(MCTS(env, seed=seed))
+
+        # the planners don't share their random streams, nor use the global one: interleaving their searches
+        # doesn't change the result
+        random_state = random.getstate()
+        for agent in agents:
+            agent._search(iterations_budget=50, time_budget=float('inf'))
+        for agent in reversed(agents):
+            agent._search(iterations_budget=200, time_budget=float('inf'))
+        assert random.getstate() == random_state
+        statistics = [agent.root_statistics() for agent in agents]
+        assert statistics[0] == statistics[1] != statistics[2]
+
+    def test_root_best_child(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0)
+        for _ in range(3):
+            agent._plan_iteration()
+        child1, child2, child3 = [child for child in agent.tree.root.children.values() if child is not None]
+        for child, visits, score in ((child1, 5, 5), (child2, 5, 4), (child3, 4, 3)):
+            child._visits = visits
+            child._score = score
+        # the most visited child, then the highest score
+        assert agent.root_best_child() is child1
+        child1._visits = 4
+        assert agent.root_best_child() is child2
+
+    def test_max_nodes(self):
+        for pruning in ('least_visited', 'lowest_value'):
+            for seed in range(5):
+                env = TicTacToeEnv()
+                env.reset(human_first=True, seed=seed)
+                env.step(0)
+                env.step(4)
+                env.step(2)
+
+                agent = MCTS(env, seed=seed, max_nodes=100, pruning=pruning)
+                agent._search(iterations_budget=1000, time_budget=float('inf'))
+                assert len(agent.tree) <= 100
+                # the pruned subtrees keep their visits in their roots
+                assert agent.tree.root.visits == 1000
+                assert agent.plan(iterations_budget=1000) == 1
+
+        # under the budget, the subtrees discarded by the re-rooting are still reclaimed lazily
+        agent = MCTS(env, seed=0, max_nodes=100000)
+        agent.plan(iterations_budget=2000)
+        n_nodes = len(agent.tree)
+        agent._search(iterations_budget=1, time_budget=float('inf'))
+        assert len(agent.tree) >= n_nodes - Tree._reclaim_rate
+
+        with self.assertRaises(ValueError):
+            MCTS(env, tree_backend='array', max_nodes=100)
+
+    def test_deadline(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0)
+
+        start = time.perf_counter()
+        agent.plan(time_budget=0.1)
+        assert time.perf_counter() - start < 0.1 + 0.05
+
+    def test_plan_iter(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        env.step(0)
+        env.step(4)
+        env.step(2)
+
+        agent = MCTS(env, seed=0)
+        progress = list(agent.plan_iter(iterations_budget=1000, interval=0.01))
+        assert len(progress) > 1
+        assert [p.iterations for p in progress] == sorted(p.iterations for p in progress)
+        assert progress[-1].iterations == 1000 and progress[-1].action == 1
+        assert sum(visits for visits, _ in progress[-1].statistics.values()) == 1000
+        # the action was played in the tree
+        assert agent.tree.root.action == 1
+
+    def test_plan_iter_stop(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        agent = MCTS(env, seed=0)
+
+        with closing(agent.plan_iter(time_budget=10, interval=0.01)) as search:
+            for progress in search:
+                if progress.iterations >= 200:
+                    break
+        assert progress.elapsed < 10
+        assert agent.tree.root.action == progress.action
+        assert agent.tree.root.visits == progress.statistics[progress.action][0]
 
 
 if __name__ == '__main__':
@@ -58,35 +58,18 @@ class TestNode(TestCase):
         assert 1 not in root.available_actions
         assert 1 not in root.children
 
-    def test_best_child(self):
-        root = Node(None, 0, [1, 2, 3], {'name': 'root'}, None)
-        child1 = Node(root, 1, [2, 3], {'name': 'child1'}, 1)
-        child2 = Node(root, 2, [1, 3], {'name': 'child2'}, 2)
-        child3 = Node(root, 3, [1, 2], {'name': 'child3'}, 3)
-
-        root.add_child(child1)
-        root.add_child(child2)
-        root.add_child(child3)
-
-        child1._visits = 5
-        child2._visits = 5
-        child3._visits = 4
-
-        child1._score = 5
-        child2._score = 4
-        child3._score = 3
-
-        assert root._best_child is child1
-
-        child1._visits = 4
-
-        assert root._best_child is child2
-
-
     def test_is_leaf(self):
         root = Node(None, 0, [1, 2], {'name': 'root'}, None)
         assert root.is_leaf
 
+        child = Node(root, 1, [2], {'name': 'child'}, 1)
+        root.add_child(child)
+        assert not root.is_leaf
+
+        root.remove_child(1)
+        assert root.is_leaf
+        assert 1 not in root.children
+
 
     def test_is_fully_expanded(self):
         root = Node(None, 0, [1, 2, 3], {'name': 'root'}, None)
@@ -100,6 +83,19 @@ class TestNode(TestCase):
 
         assert root.is_fully_expanded
 
+    def test_lazy_children(self):
+        legal_actions = [1, 2, 3]
+        root = Node(None, 0, legal_actions, {'name': 'root'}, None)
+
+        assert not hasattr(root, '__dict__')
+        assert not root.is_fully_expanded
+        assert root.random_action() in legal_actions
+
+        root.add_child(Node(root, 1, [2, 3], {'name': 'child1'}, 1))
+        assert root.available_actions == [2, 3]
+        # the list given to the node must not be modified
+        assert legal_actions == [1, 2, 3]
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
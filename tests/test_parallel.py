@@ -0,0 +1,81 @@
+import unittest
+from unittest import TestCase
+
+from envs.frozenlake_env import MyFrozenLakeEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.ai.chance_mcts import ChanceMCTS
+from src.ai.parallel import split_budget, merge_statistics, best_action, TreeParallelSearch
+
+
+class TestRootParallel(TestCase):
+
+    def test_split_budget(self):
+        assert split_budget(10, 3) == [4, 3, 3]
+        assert split_budget(2, 4) == [1, 1, 0, 0]
+        assert sum(split_budget(1000, 7)) == 1000
+
+    def test_merge_statistics(self):
+        merged = merge_statistics([{0: (3, 1.), 1: (2, 2.)}, {1: (4, -1.), 2: (1, 0.)}])
+
+        assert merged == {0: (3, 1.), 1: (6, 1.), 2: (1, 0.)}
+        assert best_action(merged) == 1
+
+    def test_counter_opponent(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        env.step(0)
+        env.step(4)
+        env.step(2)
+
+        with MCTS(env, seed=0, n_workers=2) as agent:
+            assert agent.plan(iterations_budget=1000) == 1
+            # the tree of the planner is not touched by the workers
+            assert len(agent.tree) == 1
+
+    def test_chance_mcts(self):
+        env = MyFrozenLakeEnv(is_slippery=False, map_name='4x4')
+        env.reset(seed=0)
+
+        with ChanceMCTS(env, seed=0, max_depth=100, n_workers=2) as agent:
+            done = False
+            while not done:
+                action = agent.plan(iterations_budget=400)
+                state, _, done, _, _ = env.step(action)
+                agent.determinize_chance_node(state)
+
+        assert env.game_result() == "You made it after 6 steps!"
+
+
+class TestTreeParallel(TestCase):
+
+    @staticmethod
+    def _env():
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        env.step(0)
+        env.step(4)
+        env.step(2)
+        return env
+
+    def test_counter_opponent(self):
+        for backend in ('object', 'array'):
+            agent = MCTS(self._env(), seed=0, tree_backend=backend, n_workers=3, parallelism='tree')
+            assert agent.plan(iterations_budget=1000) == 1
+
+    def test_virtual_loss_is_reverted(self):
+        for backend in ('object', 'array'):
+            agent = MCTS(self._env(), seed=0, tree_backend=backend)
+            search = TreeParallelSearch(agent, 3, virtual_loss=5)
+            search.run(500, float('inf'))
+
+            root = agent.tree.root
+            assert not search._pending_losses
+            assert root.visits == 500
+            assert sum(child.visits for child in root.children.values() if child is not None) == 500
+            # same bookkeeping as the sequential planner: the root keeps the sum of the scores of the iterations
+            assert abs(root.score + sum(child.score for child in root.children.values() if child is not None)) < 1e-9
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import time
+import unittest
+from unittest import TestCase
+
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+
+
+class TestPondering(TestCase):
+
+    def test_opponent_action(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False, seed=0)
+
+        with MCTS(env, seed=0, ponder=True) as agent:
+            action = agent.plan(iterations_budget=100)
+            env.step(action)
+            # the human thinks
+            time.sleep(0.2)
+            assert agent.tree.root.visits > 100
+
+            human_action = env.legal_actions[0]
+            env.step(human_action)
+            agent.opponent_action(human_action)
+            assert agent.ponder_iterations > 0
+            # the kept subtree is the one of the state after the move of the human
+            root = agent.tree.root
+            assert set(root.children) <= set(env.legal_actions)
+            assert root.visits > 0
+
+            action = agent.plan(iterations_budget=100)
+            assert action in env.legal_actions
+
+    def test_counter_opponent(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True, seed=0)
+        env.step(0)
+
+        with MCTS(env, seed=0, ponder=True) as agent:
+            action = agent.plan(iterations_budget=200)
+            env.step(action)
+            time.sleep(0.2)
+
+            env.step(2)
+            agent.opponent_action(2)
+            # pondering alone gathered enough visits to find the counter move
+            assert agent.plan(iterations_budget=1) == 1
+
+    def test_invalid(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=False)
+        with self.assertRaises(ValueError):
+            MCTS(env, ponder=True, keep_subtree=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+from collections import Counter
+from unittest import TestCase
+
+import numpy as np
+
+from src.ai.random_stream import RandomStream
+
+
+class TestRandomStream(TestCase):
+
+    def test_order(self):
+        # the prefetched draws are served in the order of the generator, across the refills of the buffer
+        stream = RandomStream.from_seed(0, buffer_size=7)
+        draws = [stream.random() for _ in range(20)]
+        assert draws == np.random.default_rng(0).random(21)[:20].tolist()
+
+    def test_choice(self):
+        stream = RandomStream.from_seed(0, buffer_size=100)
+        counts = Counter(stream.choice('abc') for _ in range(3000))
+        assert set(counts) == set('abc')
+        assert all(abs(count - 1000) < 100 for count in counts.values())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import random
+import unittest
+from unittest import TestCase
+
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS, Tree
+from src.ai.selection import VectorizedUCB
+from src.tree.array_tree import ArrayTree
+
+
+class TestVectorizedUCB(TestCase):
+
+    @staticmethod
+    def _build_root(backend, stats):
+        tree = backend(list(range(len(stats))), {'name': 'root'})
+        for action, (visits, score) in enumerate(stats):
+            child = tree.insert_node(tree.root.id, action, [], {'name': 'child'})
+            child.visit(visits)
+            child.update_score(score)
+        tree.root.visit(sum(visits for visits, _ in stats))
+        return tree.root
+
+    def test_same_choice_as_select_ucb(self):
+        rng = random.Random(0)
+        for backend in (Tree, ArrayTree):
+            for _ in range(50):
+                stats = [(rng.randint(1, 20), rng.randint(-20, 20)) for _ in range(rng.randint(1, 9))]
+                root = self._build_root(backend, stats)
+                assert VectorizedUCB()(root).action == MCTS.select_ucb(root).action
+
+    def test_ties(self):
+        for backend in (Tree, ArrayTree):
+            root = self._build_root(backend, [(2, 1), (3, 0), (2, 1), (2, 1)])
+            assert VectorizedUCB()(root).action == MCTS.select_ucb(root).action == 0
+
+    def test_unvisited_child(self):
+        root = self._build_root(Tree, [(5, 5), (0, 0), (5, 5)])
+        assert VectorizedUCB()(root).action == 1
+
+    def test_search(self):
+        # the vectorized policy must not change the search, given the same seed
+        roots = []
+        for selection in ('ucb', 'vectorized_ucb'):
+            env = TicTacToeEnv()
+            env.reset(human_first=False)
+            agent = MCTS(env, seed=0, selection=selection)
+            for _ in range(500):
+                agent._plan_iteration()
+            roots.append(agent.tree.root)
+
+        for action, child in roots[0].children.items():
+            assert child.visits == roots[1].children[action].visits
+
+
+if __name__ == '__main__':
+    unittest.main()
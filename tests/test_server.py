@@ -0,0 +1,118 @@
+import asyncio
+import struct
+import unittest
+from unittest import TestCase
+
+from src.constants import DATASIZE
+from src.server import PlanningServer, PlanningClient, FrameError, encode, read_message
+
+
+class TestFraming(TestCase):
+
+    def test_round_trip(self):
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(encode({'op': 'plan', 'session': 3}) + encode({'op': 'close'}))
+            reader.feed_eof()
+            return [await read_message(reader) for _ in range(3)]
+
+        assert asyncio.run(run()) == [{'op': 'plan', 'session': 3}, {'op': 'close'}, None]
+
+    def test_too_long(self):
+        with self.assertRaises(FrameError):
+            encode({'data': 'x' * DATASIZE})
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(struct.pack('>I', DATASIZE + 1))
+            await read_message(reader)
+
+        with self.assertRaises(FrameError):
+            asyncio.run(run())
+
+
+class TestPlanningServer(TestCase):
+
+    @staticmethod
+    def _run(scenario, **kwargs):
+        async def run():
+            server = PlanningServer(port=0, **kwargs)
+            await server.start()
+            client = await PlanningClient.connect(server.host, server.port)
+            try:
+                return await scenario(client)
+            finally:
+                await client.close()
+                await server.close()
+
+        return asyncio.run(run())
+
+    def test_tictactoe(self):
+        async def scenario(client):
+            response = await client.request(op='new', game='tictactoe', options={'human_first': True},
+                                            planner={'seed': 0})
+            session = response['session']
+            assert response['ok'] and response['legal_actions'] == list(range(9))
+
+            for action in (0, 2):
+                response = await client.request(op='move', session=session, action=action)
+                assert response['ok'] and action not in response['legal_actions']
+                response = await client.request(op='plan', session=session, iterations_budget=1000)
+                assert response['ok']
+            # the agent blocks the row
+            assert response['action'] == 1
+
+            response = await client.request(op='move', session=session, action=0)
+            assert not response['ok'] and 'Illegal action' in response['error']
+            assert (await client.request(op='close', session=session))['ok']
+            assert not (await client.request(op='plan', session=session))['ok']
+
+        self._run(scenario)
+
+    def test_sessions(self):
+        async def scenario(client):
+            sessions = []
+            for game in ('hanoi', 'frozenlake'):
+                response = await client.request(op='new', game=game, planner={'seed': 0})
+                assert response['ok']
+                sessions.append(response['session'])
+
+            for session in sessions:
+                response = await client.request(op='plan', session=session, time_budget=0.05)
+                assert response['ok'] and 0 <= response['action'] < 6
+                # no opponent to move
+                assert not (await client.request(op='move', session=session, action=0))['ok']
+
+            assert not (await client.request(op='new', game='chess'))['ok']
+            assert not (await client.request(op='new', game='hanoi', planner={'n_workers': 8}))['ok']
+
+        self._run(scenario, n_workers=2)
+
+    def test_disconnect(self):
+        async def run():
+            server = PlanningServer(port=0)
+            await server.start()
+            try:
+                client = await PlanningClient.connect(server.host, server.port)
+                session = (await client.request(op='new', game='tictactoe', planner={'seed': 0}))['session']
+                await client.close()
+
+                # the session of the closed connection is closed too
+                for _ in range(100):
+                    if session not in server._sessions:
+                        break
+                    await asyncio.sleep(0.01)
+                assert session not in server._sessions
+
+                client = await PlanningClient.connect(server.host, server.port)
+                response = await client.request(op='plan', session=session, iterations_budget=10)
+                assert not response['ok'] and 'Unknown session' in response['error']
+                await client.close()
+            finally:
+                await server.close()
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import unittest
+from unittest import TestCase
+
+from envs.bitboard_tictactoe_env import BitboardTicTacToeEnv
+from envs.hanoi_env import TowersOfHanoiEnv
+from envs.tictactoe_env import TicTacToeEnv
+from src import MCTS
+from src.tree.transposition_tree import TranspositionTree, TranspositionTable
+
+
+class TestStateHash(TestCase):
+
+    def test_tictactoe(self):
+        for env_class in (TicTacToeEnv, BitboardTicTacToeEnv):
+            hashes = []
+            for moves in ((0, 4, 8), (8, 4, 0), (0, 8, 4)):
+                env = env_class()
+                env.reset(human_first=True)
+                initial = env.state_hash()
+                for action in moves:
+                    env.push(action)
+                hashes.append(env.state_hash())
+                for _ in moves:
+                    env.pop()
+                assert env.state_hash() == initial
+
+                for action in moves:
+                    env.step(action)
+                env.load(env.backup())
+                assert env.state_hash() == hashes[-1]
+
+            # the same marks on the same cells, but a different player on 4
+            assert hashes[0] == hashes[1] != hashes[2]
+
+    def test_hanoi(self):
+        env = TowersOfHanoiEnv(num_disks=3)
+        env.reset()
+        initial = env.state_hash()
+        for move in ('AC', 'AB', 'CB'):
+            env.push(env.action_dict[move])
+        assert env.state_hash() == env._compute_hash() != initial
+        for _ in range(3):
+            env.pop()
+        assert env.state_hash() == initial
+
+
+class TestTranspositionTree(TestCase):
+
+    def test_insert_node(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True)
+        tree = TranspositionTree(env.legal_actions, env.node_data())
+
+        leaves = []
+        for moves in ((0, 4, 8), (8, 4, 0)):
+            node = tree.root
+            for action in moves:
+                env.push(action)
+                node = tree.insert_node(node.id, action, env.legal_actions, env.node_data())
+            leaves.append(node)
+            for _ in moves:
+                env.pop()
+
+        assert leaves[0] is leaves[1]
+        assert len(tree) == 6
+        assert tree.n_transpositions == 1
+        assert tree.edge_action(tree.root.children[8].children[4], leaves[0]) == 0
+
+        tree.keep_subtree(tree.root.children[0])
+        # the discarded nodes are reclaimed lazily, the shared leaf is still reachable through its other parent
+        assert len(tree) == 6
+        assert tree.reclaim() == 3
+        assert len(tree) == 3
+        assert leaves[0].parent is tree.root.children[4]
+        assert len(tree._table) == 3
+        assert tree.n_transpositions == 0
+
+    def test_keep_subtree_twice(self):
+        env = TicTacToeEnv()
+        env.reset(human_first=True)
+        tree = TranspositionTree(env.legal_actions, env.node_data())
+        node = tree.root
+        for action in (0, 4):
+            env.push(action)
+            node = tree.insert_node(node.id, action, env.legal_actions, env.node_data())
+        for _ in range(2):
+            env.pop()
+        env.push(8)
+        tree.insert_node(tree.root.id, 8, env.legal_actions, env.node_data())
+
+        # re-rooted twice before the discarded nodes are reclaimed
+        tree.keep_subtree(tree.root.children[0])
+        tree.keep_subtree(node)
+        assert tree.reclaim() == 3
+        assert len(tree) == 1 and tree.root is node and node.is_root
+        assert list(tree._table.values()) == [node]
+
+    def test_counter_opponent(self):
+        for seed in range(10):
+            env = TicTacToeEnv()
+            env.reset(human_first=True, seed=seed)
+            env.step(0)
+            env.step(4)
+            env.step(2)
+
+            agent = MCTS(env, seed=seed, tree_backend='transposition')
+            assert agent.plan(iterations_budget=1000) == 1
+
+    def test_fewer_nodes(self):
+        sizes = []
+        for backend in ('object', 'transposition'):
+            env = TowersOfHanoiEnv(num_disks=4)
+            env.reset()
+            agent = MCTS(env, seed=0, adversarial=False, gamma=0.95, max_depth=100, tree_backend=backend)
+            for _ in range(1000):
+                agent._plan_iteration()
+            sizes.append(len(agent.tree))
+
+        assert sizes[1] < sizes[0] / 2
+
+
+class TestTranspositionTable(TestCase):
+
+    class _Node:
+        def __init__(self, visits):
+            self.visits = visits
+
+    def test_lru(self):
+        table = TranspositionTable(max_size=2)
+        a, b, c = self._Node(1), self._Node(2), self._Node(3)
+        table.put('a', a)
+        table.put('b', b)
+        assert table.get('a') is a
+        table.put('c', c)
+        # 'b' is the least recently used
+        assert 'b' not in table and table.get('b') is None
+        assert table.get('c') is c
+        assert (table.hits, table.misses, table.evictions) == (2, 1, 1)
+
+    def test_least_visited(self):
+        table = TranspositionTable(max_size=2, eviction='least_visited')
+        a, b, c = self._Node(1), self._Node(2), self._Node(3)
+        table.put('a', a)
+        table.put('b', b)
+        table.get('a')
+        table.put('c', c)
+        assert list(table.keys()) == ['b', 'c']
+        assert table.statistics()['evictions'] == 1
+
+    def test_least_visited_updates(self):
+        table = TranspositionTable(max_size=3, eviction='least_visited')
+        nodes = {key: self._Node(0) for key in 'abcdef'}
+        for key in 'abc':
+            table.put(key, nodes[key])
+        # the visits change after the insertion
+        nodes['a'].visits = 5
+        nodes['b'].visits = 2
+        nodes['c'].visits = 3
+        table.put('d', nodes['d'])
+        assert set(table.keys()) == {'a', 'c', 'd'}
+        table.remove('d')
+        table.put('e', nodes['e'])
+        nodes['e'].visits = 4
+        table.put('f', nodes['f'])
+        assert set(table.keys()) == {'a', 'e', 'f'}
+
+    def test_discard(self):
+        table = TranspositionTable()
+        a, b = self._Node(1), self._Node(1)
+        table.put('a', a)
+        # the key refers to a newer node of the same state
+        table.discard('a', b)
+        assert table.get('a') is a
+        table.discard('a', a)
+        assert len(table) == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
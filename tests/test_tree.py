@@ -24,7 +24,10 @@ class TestTree(TestCase):
         _ = tree.insert_node(child2.id, 9, [4], {'name': 'child3'})
 
         tree.delete_subtree(child2)
-        assert len(tree._nodes) == 2
+        # the deleted nodes are only counted until they are reclaimed
+        assert len(tree) == 4
+        assert tree.reclaim() == 2
+        assert len(tree) == 2
 
 
     def test_keep_subtree(self):
@@ -34,11 +37,56 @@ class TestTree(TestCase):
         _ = tree.insert_node(child2.id, 9, [4], {'name': 'child3'})
 
         tree.keep_subtree(child1)
+        tree.reclaim()
 
-        assert len(tree._nodes) == 1
+        assert len(tree) == 1
         assert child1 in tree._nodes.values()
         assert tree.root is child1
 
+    def test_prune(self):
+        tree = Tree([1, 2], {'name': 'root'})
+        child1 = tree.insert_node(0, 1, [3, 4], {'name': 'child1'})
+        child2 = tree.insert_node(0, 2, [5], {'name': 'child2'})
+        leaf = tree.insert_node(child1.id, 3, [], {'name': 'leaf1'})
+        _ = tree.insert_node(child2.id, 5, [], {'name': 'leaf2'})
+        child1.visit(1)
+        child2.visit(5)
+
+        # the least visited frontier node is collapsed, but keeps its statistics
+        assert tree.prune(4) == 1
+        assert len(tree) == 4
+        assert child1.is_leaf and child1.visits == 1
+        assert sorted(child1.available_actions) == [3, 4]
+
+        # the deleted node is reused
+        new_node = tree.insert_node(child1.id, 4, [], {'name': 'leaf3'})
+        assert new_node is leaf
+        assert new_node.visits == 0 and new_node.action == 4 and new_node.parent is child1
+
+    def test_lazy_reclaim(self):
+        # a deep chain below the sibling of the new root, deeper than the recursion limit
+        tree = Tree([1, 2], {'name': 'root'})
+        child1 = tree.insert_node(0, 1, [7], {'name': 'child1'})
+        node = tree.insert_node(0, 2, [0], {'name': 'child2'})
+        for i in range(5000):
+            node = tree.insert_node(node.id, 0, [0], {'name': i})
+
+        tree.keep_subtree(child1)
+        # the discarded nodes are only unlinked
+        assert tree.generation == 1
+        assert len(tree) == 5003
+        assert child1.is_root and tree.root is child1
+
+        # and then reclaimed a few at a time by the insertions, reusing their ids
+        ids = set(tree._nodes)
+        child = tree.insert_node(child1.id, 7, [], {'name': 'child3'})
+        assert child.id in ids
+        assert len(tree) == 5003 + 1 - Tree._reclaim_rate
+
+        tree.reclaim()
+        assert len(tree) == 2
+        assert set(tree._nodes) == {child1.id, child.id}
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import unittest
+from unittest import TestCase
+
+from envs.hanoi_env import TowersOfHanoiEnv
+from src import MCTS
+from src.ai.value_cache import ValueCache
+
+
+class TestValueCache(TestCase):
+
+    def test_cache(self):
+        cache = ValueCache(max_size=2, min_samples=2)
+        cache.update('a', 1.)
+        assert cache.estimate('a') is None
+        cache.update('a', 2.)
+        assert cache.estimate('a') == 1.5
+        # a batch of returns
+        cache.update('b', 4., n=4)
+        assert cache.peek('b') == 1.
+
+        cache.update('c', 0.)
+        assert len(cache) == 2 and cache.evictions == 1
+        # 'a' was the least recently used state
+        assert cache.peek('a') is None and cache.peek('b') == 1.
+        assert cache.truncate('b') == 1. and cache.truncate('c') is None
+        assert cache.statistics() == {'size': 2, 'max_size': 2, 'hits': 1, 'misses': 1, 'truncations': 1,
+                                      'evictions': 1, 'hit_rate': 0.5}
+
+    def test_planner(self):
+        env = TowersOfHanoiEnv(num_disks=3)
+        env.reset()
+        agent = MCTS(env, seed=0, adversarial=False, max_depth=100, value_cache_size=10, value_cache_samples=4)
+        agent._search(iterations_budget=500, time_budget=float('inf'))
+
+        statistics = agent.value_cache.statistics()
+        assert statistics['size'] == 10 and statistics['evictions'] > 0
+        assert statistics['hits'] > 0 and statistics['truncations'] > 0
+        # every iteration that doesn't end in a terminal node looks up the cache
+        assert statistics['hits'] + statistics['misses'] <= 500
+        assert agent.tree.root.visits == 500
+
+    def test_state_hash(self):
+        class Env(TowersOfHanoiEnv):
+            supports_state_hash = False
+
+        with self.assertRaises(ValueError):
+            MCTS(Env(), value_cache_size=10)
+
+
+if __name__ == '__main__':
+    unittest.main()